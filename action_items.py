@@ -0,0 +1,230 @@
+# action_items.py
+"""Action-item event store for governance metrics.
+
+Every governance meeting (QBR, technical working group, audit, VPT) raises action items. The store
+holds one row per action item as parallel NumPy arrays: CDMO code, meeting, opened day, due day,
+and closed day (-1 while open). The rows are built from an event log of 'Opened' and 'Closed'
+events keyed on 'Action ID'. Closure rate, days-to-close percentiles, overdue counts and cadence
+gaps are computed per CDMO with bincount / lexsort passes, never a groupby per rerun.
+
+Meetings are also binned into monthly counts per CDMO as they arrive, so the cadence heatmap reads
+O(CDMOs x months) cells whatever the length of the history. append() folds in new events
+incrementally: a repeated Opened event is ignored, and a Closed event updates its action in place.
+"""
+import threading
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+ACTION_COLUMNS = ['Action ID', 'Meeting ID', 'CDMO', 'Meeting Type', 'Event', 'Date', 'Due Date']
+EVENTS = ('Opened', 'Closed')
+DEFAULT_DUE_DAYS = 30  # Due date given to derived actions, per the governance charter's 30-day follow-up.
+GAP_WINDOW_MONTHS = 12  # Cadence gaps are counted over this many trailing months.
+SUMMARY_COLUMNS = ['CDMO', 'Actions', 'Closed', 'Open', 'Overdue', 'Closure Rate (%)', 'Median Days to Close', 'P90 Days to Close']
+
+def _days(values):
+    return pd.to_datetime(pd.Series(values)).to_numpy('datetime64[D]').astype(np.int64)
+
+def meeting_ids(gov_df):
+    """The frame's 'Meeting ID' column, or positional IDs for stores written before it existed."""
+    if 'Meeting ID' in gov_df.columns:
+        return gov_df['Meeting ID'].to_numpy(dtype=object)
+    return np.array([f"MTG-{i:06d}" for i in range(1, len(gov_df) + 1)], dtype=object)
+
+def actions_from_meetings(gov_df, as_of, seed=0):
+    """Action events equivalent to per-meeting counts (see utils.generate_governance_data).
+
+    Each meeting opens 'Actions Generated' items due DEFAULT_DUE_DAYS later. The first 'Actions
+    Closed' of them close after a seeded 5-60 day lag, capped at as_of.
+    """
+    generated = gov_df['Actions Generated'].to_numpy(dtype=np.int64)
+    closed = np.minimum(gov_df['Actions Closed'].to_numpy(dtype=np.int64), generated)
+    meeting = np.repeat(np.arange(len(gov_df)), generated)
+    rank = np.arange(generated.sum()) - np.repeat(np.cumsum(generated) - generated, generated)
+    opened = _days(gov_df['Date'])[meeting]
+    ids = meeting_ids(gov_df)
+    opened_events = pd.DataFrame({
+        'Action ID': ids[meeting] + '-A' + pd.Series(rank + 1).astype(str).str.zfill(2).to_numpy(dtype=object),
+        'Meeting ID': ids[meeting], 'CDMO': gov_df['CDMO'].to_numpy()[meeting], 'Meeting Type': gov_df['Meeting Type'].to_numpy()[meeting],
+        'Event': 'Opened', 'Date': pd.to_datetime(opened, unit='D'), 'Due Date': pd.to_datetime(opened + DEFAULT_DUE_DAYS, unit='D'),
+    })
+    is_closed = rank < closed[meeting]
+    lag = np.random.default_rng(seed).integers(5, 61, is_closed.sum())
+    closed_day = np.minimum(opened[is_closed] + lag, _days([as_of])[0])
+    closed_events = opened_events[is_closed].assign(Event='Closed', Date=pd.to_datetime(closed_day, unit='D'), **{'Due Date': pd.NaT})
+    return pd.concat([opened_events, closed_events], ignore_index=True)[ACTION_COLUMNS]
+
+class ActionStore:
+    """Thread-safe action-item arrays plus per-CDMO monthly meeting bins."""
+
+    def __init__(self):
+        self.cdmos = pd.Index([], dtype=object)
+        self.action_ids = pd.Index([], dtype=object)
+        self.meeting = np.array([], dtype=object)
+        self.meeting_type = np.array([], dtype=object)
+        self.cdmo_code = np.array([], dtype=np.int64)
+        self.opened = np.array([], dtype=np.int64)
+        self.due = np.array([], dtype=np.int64)
+        self.closed = np.array([], dtype=np.int64)
+        self._meeting_bins = Counter()  # (CDMO, month as months since the epoch) -> meetings
+        self._meeting_ids = set()
+        self._last_meeting = {}  # CDMO -> latest meeting day
+        self._pending_closes = {}  # Action ID -> closed day, for a Closed event seen before its Opened event.
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @classmethod
+    def from_events(cls, events, meetings=None):
+        store = cls()
+        if meetings is not None:
+            store.add_meetings(meetings)
+        store.append(events)
+        return store
+
+    def __len__(self):
+        return len(self.action_ids)
+
+    def _codes(self, cdmos):
+        new = pd.Index(pd.unique(cdmos)).difference(self.cdmos)
+        if len(new):
+            self.cdmos = self.cdmos.append(new)
+        return self.cdmos.get_indexer(cdmos).astype(np.int64)
+
+    # --- Ingestion ---
+    def add_meetings(self, gov_df):
+        """Bins meetings into per-CDMO monthly counts; returns how many were new."""
+        ids = meeting_ids(gov_df)
+        with self._lock:
+            new = np.array([m not in self._meeting_ids for m in ids], dtype=bool)
+            if not new.any():
+                return 0
+            days = _days(gov_df['Date'])[new]
+            batch = pd.DataFrame({'CDMO': gov_df['CDMO'].to_numpy()[new], 'Month': days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64), 'Day': days})
+            for (cdmo, month), n in batch.groupby(['CDMO', 'Month'], sort=False).size().items():
+                self._meeting_bins[(cdmo, month)] += n
+            for cdmo, day in batch.groupby('CDMO', sort=False)['Day'].max().items():
+                self._last_meeting[cdmo] = max(self._last_meeting.get(cdmo, day), day)
+            self._meeting_ids.update(ids[new])
+            self._codes(batch['CDMO'].to_numpy())
+            self.version += 1
+        return int(new.sum())
+
+    def append(self, events):
+        """Folds Opened / Closed events (ACTION_COLUMNS) into the store; returns how many changed it."""
+        missing = set(ACTION_COLUMNS) - set(events.columns)
+        if missing:
+            raise ValueError(f"Action events are missing column(s): {', '.join(sorted(missing))}")
+        unknown = set(events['Event'].unique()) - set(EVENTS)
+        if unknown:
+            raise ValueError(f"Unknown action event(s): {', '.join(map(str, sorted(unknown)))}")
+        with self._lock:
+            opened = events[events['Event'] == 'Opened'].drop_duplicates('Action ID', keep='last')
+            opened = opened[~opened['Action ID'].isin(self.action_ids)]
+            if not opened.empty:
+                due = opened['Due Date'].fillna(pd.to_datetime(opened['Date']) + pd.Timedelta(days=DEFAULT_DUE_DAYS))
+                self.action_ids = self.action_ids.append(pd.Index(opened['Action ID'].to_numpy(dtype=object)))
+                self.meeting = np.concatenate([self.meeting, opened['Meeting ID'].to_numpy(dtype=object)])
+                self.meeting_type = np.concatenate([self.meeting_type, opened['Meeting Type'].to_numpy(dtype=object)])
+                self.cdmo_code = np.concatenate([self.cdmo_code, self._codes(opened['CDMO'].to_numpy(dtype=object))])
+                self.opened = np.concatenate([self.opened, _days(opened['Date'])])
+                self.due = np.concatenate([self.due, _days(due)])
+                self.closed = np.concatenate([self.closed, np.full(len(opened), -1, dtype=np.int64)])
+            closes = events[events['Event'] == 'Closed']
+            pending = pd.DataFrame({'Action ID': list(self._pending_closes), 'Day': list(self._pending_closes.values())}, columns=['Action ID', 'Day'])
+            closes = pd.concat([pending, pd.DataFrame({'Action ID': closes['Action ID'].to_numpy(dtype=object), 'Day': _days(closes['Date'])})], ignore_index=True).astype({'Day': np.int64})
+            loc = self.action_ids.get_indexer(closes['Action ID'].to_numpy(dtype=object)) if len(self.action_ids) else np.full(len(closes), -1)
+            found = loc >= 0
+            # Closing events are idempotent: an action keeps its latest close date.
+            changed = found & (self.closed[np.where(found, loc, 0)] != closes['Day'].to_numpy()) if len(self.action_ids) else found
+            np.maximum.at(self.closed, loc[found], closes['Day'].to_numpy()[found])
+            self._pending_closes = dict(zip(closes['Action ID'][~found], closes['Day'][~found]))
+            n_changed = len(opened) + int(changed.sum())
+            if n_changed:
+                self.version += 1
+        return n_changed
+
+    # --- Queries (vectorized over all actions) ---
+    def _arrays(self):
+        """A consistent view of the action arrays (append() replaces them one at a time)."""
+        with self._lock:
+            return self.cdmos, self.cdmo_code, self.opened, self.due, self.closed
+
+    def days_to_close(self, cdmo=None):
+        """Days from opening to closure of every closed action (one CDMO, or the network)."""
+        cdmos, codes, opened, _, closed = self._arrays()
+        mask = closed >= 0
+        if cdmo is not None:
+            mask &= codes == cdmos.get_indexer([cdmo])[0]
+        return closed[mask] - opened[mask]
+
+    def totals(self, as_of):
+        """Network actions, closed, open, overdue, closure rate and mean / median days to close."""
+        as_of = _days([as_of])[0]
+        _, _, opened, due, closed_day = self._arrays()
+        closed = closed_day >= 0
+        days = closed_day[closed] - opened[closed]
+        return {
+            'meetings': len(self._meeting_ids), 'actions': len(closed), 'closed': int(closed.sum()), 'open': int((~closed).sum()),
+            'overdue': int((~closed & (due < as_of)).sum()),
+            'closure_rate': closed.mean() * 100 if len(closed) else 100.0,
+            'mean_days_to_close': days.mean() if len(days) else float('nan'), 'median_days_to_close': float(np.median(days)) if len(days) else float('nan'),
+        }
+
+    def summary(self, as_of):
+        """One row per CDMO with SUMMARY_COLUMNS (nearest-rank median / P90 days to close)."""
+        as_of = _days([as_of])[0]
+        cdmos, cdmo_code, opened, due, closed_day = self._arrays()
+        n = len(cdmos)
+        closed = closed_day >= 0
+        actions = np.bincount(cdmo_code, minlength=n)
+        n_closed = np.bincount(cdmo_code[closed], minlength=n)
+        overdue = np.bincount(cdmo_code[~closed & (due < as_of)], minlength=n)
+        # Percentiles per CDMO from one lexsort: closed actions grouped by CDMO, days ascending within each.
+        codes, days = cdmo_code[closed], closed_day[closed] - opened[closed]
+        order = np.lexsort((days, codes))
+        days = days[order]
+        starts = np.searchsorted(codes[order], np.arange(n))
+        def rank(q):
+            idx = starts + np.floor(q * np.maximum(n_closed - 1, 0)).astype(np.int64)
+            return np.where(n_closed > 0, days[np.minimum(idx, max(len(days) - 1, 0))] if len(days) else 0, np.nan)
+        return pd.DataFrame({
+            'CDMO': cdmos, 'Actions': actions, 'Closed': n_closed, 'Open': actions - n_closed, 'Overdue': overdue,
+            'Closure Rate (%)': np.where(actions > 0, n_closed / np.maximum(actions, 1) * 100, np.nan),
+            'Median Days to Close': rank(0.5), 'P90 Days to Close': rank(0.9),
+        })[SUMMARY_COLUMNS]
+
+    def overdue(self, as_of):
+        """Open actions past their due date, most overdue first."""
+        as_of = _days([as_of])[0]
+        with self._lock:
+            idx = np.flatnonzero((self.closed < 0) & (self.due < as_of))
+            ids, cdmos, meeting, meeting_type = self.action_ids[idx], self.cdmos[self.cdmo_code[idx]], self.meeting[idx], self.meeting_type[idx]
+            opened, due = self.opened[idx], self.due[idx]
+        order = np.argsort(due, kind='stable')
+        return pd.DataFrame({
+            'Action ID': ids, 'CDMO': cdmos, 'Meeting ID': meeting, 'Meeting Type': meeting_type,
+            'Opened': pd.to_datetime(opened, unit='D'), 'Due Date': pd.to_datetime(due, unit='D'), 'Days Overdue': as_of - due,
+        }).iloc[order].reset_index(drop=True)
+
+    def cadence(self):
+        """Pre-binned meetings per CDMO and month ('YearMonth' as YYYY-MM)."""
+        with self._lock:
+            cells = [(cdmo, month, n) for (cdmo, month), n in self._meeting_bins.items()]
+        frame = pd.DataFrame(cells, columns=['CDMO', 'Month', 'counts'])
+        frame['YearMonth'] = frame['Month'].to_numpy(dtype=np.int64).astype('datetime64[M]').astype(str)
+        return frame.sort_values(['Month', 'CDMO'], ignore_index=True)[['CDMO', 'YearMonth', 'counts']]
+
+    def cadence_gaps(self, as_of, months=GAP_WINDOW_MONTHS):
+        """Per CDMO: last meeting, days since it, and how many of the trailing months had no meeting."""
+        as_of_day = _days([as_of])[0]
+        last_month = np.datetime64(int(as_of_day), 'D').astype('datetime64[M]').astype(np.int64)
+        window = range(last_month - months + 1, last_month + 1)
+        with self._lock:
+            last = dict(self._last_meeting)
+            active = Counter(cdmo for (cdmo, month), n in self._meeting_bins.items() if month in window and n > 0)
+        cdmos = list(last)
+        last_day = np.array([last[c] for c in cdmos], dtype=np.int64)
+        return pd.DataFrame({
+            'CDMO': cdmos, 'Last Engagement': pd.to_datetime(last_day, unit='D'), 'Days Since Last': as_of_day - last_day,
+            f'Months Without Engagement (last {months})': [months - active[c] for c in cdmos],
+        }).sort_values('Days Since Last', ascending=False, ignore_index=True)
@@ -4,17 +4,63 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils import generate_cdmo_data, generate_master_schedule
+from data_access import COMMAND_CENTER_RISKS, COMMAND_CENTER_SCHEDULE, load_cdmo_data, load_master_schedule, load_risk_register, get_cycle_time_limits, get_scorecard, get_figure_cache, get_impact_graph
+from metrics import cycle_time_variance, right_first_time
+import perf
+import freshness
+import warmup
 
 st.set_page_config(
     page_title="External Manufacturing Command Center | Avidity",
     page_icon="https://www.aviditybiosciences.com/wp-content/uploads/2022/02/cropped-Avidity-Favicon-32x32.png",
     layout="wide"
 )
+perf.begin("Command Center")
+warmup.start()  # Warms the other pages' imports, figures and datasets in the background (once per process).
+
+# --- Figure builders (served from the shared figure cache while their inputs are unchanged; see figure_cache.py) ---
+QUADRANT_COLUMNS = ['CDMO', 'On-Time Delivery (%)', 'Quality Score', 'Batches YTD', 'Avg. Yield (%)']
+MAX_BUBBLE_PX = 50  # Diameter of the busiest CDMO's bubble; the others scale by area, whatever the batch counts.
+
+def quadrant_figure(scores):
+    avg_otd = scores['On-Time Delivery (%)'].mean()
+    avg_quality = scores['Quality Score'].mean()
+    x_range = [scores['On-Time Delivery (%)'].min() - 5, 102]
+    y_range = [scores['Quality Score'].min() - 5, 102]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=scores['On-Time Delivery (%)'], y=scores['Quality Score'],
+        text=scores['CDMO'], mode='markers+text',
+        marker=dict(size=scores['Batches YTD'], sizemode='area', sizeref=2 * max(scores['Batches YTD'].max(), 1) / MAX_BUBBLE_PX ** 2, sizemin=4, color=scores['Avg. Yield (%)'], colorscale='Viridis', showscale=True, colorbar=dict(title='Avg. Yield')),
+        textposition="top center", textfont=dict(size=12)
+    ))
+    fig.add_vline(x=avg_otd, line_dash="dash", line_color="grey")
+    fig.add_hline(y=avg_quality, line_dash="dash", line_color="grey")
+    fig.add_annotation(x=x_range[1], y=y_range[1], text="<b>Strategic Partners</b><br>Reliable & High Quality", showarrow=False, xanchor='right', yanchor='top', font=dict(color='green'))
+    fig.add_annotation(x=x_range[0], y=y_range[1], text="<b>Quality Focus</b><br>High Quality, Delivery Risk", showarrow=False, xanchor='left', yanchor='top', font=dict(color='orange'))
+    fig.add_annotation(x=x_range[0], y=y_range[0], text="<b>High Concern</b><br>Performance Plans Needed", showarrow=False, xanchor='left', yanchor='bottom', font=dict(color='red'))
+    fig.add_annotation(x=x_range[1], y=y_range[0], text="<b>Inconsistent</b><br>Reliable, Quality Varies", showarrow=False, xanchor='right', yanchor='bottom', font=dict(color='orange'))
+    fig.update_layout(height=450, xaxis_title="On-Time Delivery (%)", yaxis_title="Quality Score (Composite)", plot_bgcolor='rgba(0,0,0,0)', margin=dict(t=20, b=40, l=40, r=20), xaxis=dict(range=x_range), yaxis=dict(range=y_range), showlegend=False)
+    return fig
+
+def treemap_figure(batch_counts):
+    fig = px.treemap(
+        batch_counts,
+        path=[px.Constant("All Programs"), 'Program', 'CDMO', 'Status'], values='Batches',
+        title="Batch Distribution Across Portfolio",
+        color_discrete_map={
+            '(?)':'#2ca02c', 'DM1':'#003F87', 'DMD':'#00AEEF', 'FSHD':'#8DC63F',
+            'Catalent Pharma':'#F37021', 'WuXi Biologics':'#662D91',
+            'At Risk':'red', 'Failed':'maroon'
+            }
+    )
+    fig.update_layout(height=450, margin = dict(t=50, l=25, r=25, b=25))
+    return fig
 
 # --- Data Loading ---
-cdmo_df = generate_cdmo_data()
-schedule_df = generate_master_schedule()
+cdmo_df = load_cdmo_data()
+schedule_df = load_master_schedule(columns=COMMAND_CENTER_SCHEDULE)
+figures = get_figure_cache()
 
 # --- Header ---
 st.image("https://www.aviditybiosciences.com/wp-content/uploads/2024/02/Avidity-logo-1.svg", width=250)
@@ -23,16 +69,15 @@ st.markdown("### Strategic & Technical Oversight of Avidity's Global CDMO Networ
 
 # --- TECHNICAL KPIs ---
 st.header("Portfolio Performance: Key Technical Indicators")
-total_batches = len(schedule_df)
-schedule_df['Cycle Time Variance (Days)'] = schedule_df['Actual Cycle Time (Days)'] - schedule_df['Planned Cycle Time (Days)']
-avg_cycle_time_variance = schedule_df['Cycle Time Variance (Days)'].mean()
-shipped_batches = schedule_df[schedule_df['Status'] == 'Shipped']
-right_first_time = (1 - (shipped_batches['Deviation ID'].notna().sum() / len(shipped_batches))) * 100 if not shipped_batches.empty else 100
-active_cdmos = cdmo_df[cdmo_df['Status'] == 'Active'].shape[0]
+with perf.span("KPI block"):
+    total_batches = len(schedule_df)
+    avg_cycle_time_variance = cycle_time_variance(schedule_df).mean()
+    rft_pct = right_first_time(schedule_df)
+    active_cdmos = cdmo_df[cdmo_df['Status'] == 'Active'].shape[0]
 
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Active CDMOs", active_cdmos, help="Number of currently active manufacturing partners.")
-col2.metric("Right First Time (RFT)", f"{right_first_time:.1f}%", help="Percentage of completed batches shipped without a deviation.")
+col2.metric("Right First Time (RFT)", f"{rft_pct:.1f}%", help="Percentage of completed batches shipped without a deviation.")
 col3.metric("Avg. Cycle Time Variance", f"{avg_cycle_time_variance:.1f} Days", help="Positive value indicates batches are taking longer than planned.", delta_color="inverse")
 col4.metric("Batches At Risk / Failed", schedule_df[schedule_df['Status'].isin(['At Risk', 'Failed'])].shape[0], help="Total count of batches currently at risk or failed.")
 st.divider()
@@ -43,30 +88,15 @@ col_quad, col_treemap = st.columns(2)
 
 with col_quad:
     st.subheader("CDMO Performance Quadrant")
-    avg_otd = cdmo_df['Avg. On-Time Delivery (%)'].mean()
-    avg_quality = cdmo_df['Quality Score (1-100)'].mean()
-    x_range = [cdmo_df['Avg. On-Time Delivery (%)'].min() - 5, 102]
-    y_range = [cdmo_df['Quality Score (1-100)'].min() - 5, 102]
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=cdmo_df['Avg. On-Time Delivery (%)'], y=cdmo_df['Quality Score (1-100)'],
-        text=cdmo_df['CDMO Name'], mode='markers+text',
-        marker=dict(size=cdmo_df['Batches YTD'] * 2.5, color=cdmo_df['Avg. Yield (%)'], colorscale='Viridis', showscale=True, colorbar=dict(title='Avg. Yield')),
-        textposition="top center", textfont=dict(size=12)
-    ))
-    fig.add_vline(x=avg_otd, line_dash="dash", line_color="grey")
-    fig.add_hline(y=avg_quality, line_dash="dash", line_color="grey")
-    fig.add_annotation(x=x_range[1], y=y_range[1], text="<b>Strategic Partners</b><br>Reliable & High Quality", showarrow=False, xanchor='right', yanchor='top', font=dict(color='green'))
-    fig.add_annotation(x=x_range[0], y=y_range[1], text="<b>Quality Focus</b><br>High Quality, Delivery Risk", showarrow=False, xanchor='left', yanchor='top', font=dict(color='orange'))
-    fig.add_annotation(x=x_range[0], y=y_range[0], text="<b>High Concern</b><br>Performance Plans Needed", showarrow=False, xanchor='left', yanchor='bottom', font=dict(color='red'))
-    fig.add_annotation(x=x_range[1], y=y_range[0], text="<b>Inconsistent</b><br>Reliable, Quality Varies", showarrow=False, xanchor='right', yanchor='bottom', font=dict(color='orange'))
-    fig.update_layout(height=450, xaxis_title="On-Time Delivery (%)", yaxis_title="Quality Score (Composite)", plot_bgcolor='rgba(0,0,0,0)', margin=dict(t=20, b=40, l=40, r=20), xaxis=dict(range=x_range), yaxis=dict(range=y_range), showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    with perf.span("Quadrant figure", 'figure'):
+        # Same snapshot as the Drilldown scorecards, so each partner's OTD, quality and yield agree across views.
+        fig = figures.figure(quadrant_figure, get_scorecard().summary[QUADRANT_COLUMNS])
+    with perf.span("Quadrant figure", 'render'):
+        st.plotly_chart(fig, use_container_width=True)
 
     with st.expander("Methodology & Actionability: Performance Quadrant"):
         st.markdown("""
-        **Methodology:** This is a 2x2 matrix, a powerful business analysis tool for strategic segmentation. It plots each CDMO based on two critical performance dimensions: operational reliability (X-axis) and a composite quality score (Y-axis). Additional dimensions are encoded using bubble size (production volume) and color (average process yield). The quadrant lines are dynamically placed at the portfolio's mean performance, allowing for relative assessment.
+        **Methodology:** This is a 2x2 matrix, a powerful business analysis tool for strategic segmentation. It plots each CDMO based on two critical performance dimensions: operational reliability (X-axis, latest quarter's on-time delivery) and a composite quality score (Y-axis, the mean of right-first-time and Cpk attainment against the 1.33 target). Additional dimensions are encoded using bubble size (production volume) and color (average process yield). The quadrant lines are dynamically placed at the portfolio's mean performance, allowing for relative assessment.
 
         **Significance & Insights:**
         - **Top-Right (Strategic Partners):** High reliability and quality. These are your best partners.
@@ -83,18 +113,11 @@ with col_quad:
 
 with col_treemap:
     st.subheader("Production Volume by Program & CDMO")
-    fig = px.treemap(
-        schedule_df,
-        path=[px.Constant("All Programs"), 'Program', 'CDMO', 'Status'],
-        title="Batch Distribution Across Portfolio",
-        color_discrete_map={
-            '(?)':'#2ca02c', 'DM1':'#003F87', 'DMD':'#00AEEF', 'FSHD':'#8DC63F',
-            'Catalent Pharma':'#F37021', 'WuXi Biologics':'#662D91',
-            'At Risk':'red', 'Failed':'maroon'
-            }
-    )
-    fig.update_layout(height=450, margin = dict(t=50, l=25, r=25, b=25))
-    st.plotly_chart(fig, use_container_width=True)
+    with perf.span("Treemap", 'figure'):
+        batch_counts = schedule_df.groupby(['Program', 'CDMO', 'Status']).size().reset_index(name='Batches')
+        fig = figures.figure(treemap_figure, batch_counts)
+    with perf.span("Treemap", 'render'):
+        st.plotly_chart(fig, use_container_width=True)
 
     with st.expander("Methodology & Actionability: Treemap"):
         st.markdown("""
@@ -106,3 +129,72 @@ with col_treemap:
         - **Action:** If a large rectangle representing a key program contains significant red or maroon sub-rectangles (At Risk/Failed), this is a critical supply risk requiring immediate escalation and the formation of a dedicated task force.
         - **Action:** Use this to justify resource allocation. The largest program areas should have the most robust oversight and support.
         """)
+
+st.divider()
+
+# --- Network Process Stability ---
+st.header("Network Process Stability: Batch Cycle Time")
+with perf.span("Stability limits"):
+    stability_df = get_cycle_time_limits().to_frame().dropna(subset=['MR Bar'])
+    stability_df['Out of Control'] = (stability_df['Latest'] > stability_df['UCL']) | (stability_df['Latest'] < stability_df['LCL'])
+stab_col1, stab_col2 = st.columns(2)
+stab_col1.metric("CDMO x Product Series Monitored", len(stability_df), help="Series with at least two completed batches, so that a moving range exists.")
+stab_col2.metric("Latest Batch Outside XmR Limits", int(stability_df['Out of Control'].sum()), help="Series whose most recent cycle time falls outside its own control limits.", delta_color="inverse")
+
+with perf.span("Stability figure", 'figure'):
+    fig = go.Figure()
+    for product, product_df in stability_df.groupby('Product'):
+        fig.add_trace(go.Scatter(
+            x=product_df['CDMO'], y=product_df['Mean'], mode='markers', name=product,
+            error_y=dict(type='data', symmetric=False, array=product_df['UCL'] - product_df['Mean'], arrayminus=product_df['Mean'] - product_df['LCL']),
+            customdata=product_df[['Batches', 'UCL', 'LCL', 'Latest']], hovertemplate='%{x}<br>Mean: %{y:.1f}d<br>UCL: %{customdata[1]:.1f}d | LCL: %{customdata[2]:.1f}d<br>Latest: %{customdata[3]:.0f}d (%{customdata[0]} batches)<extra></extra>'
+        ))
+    out_of_control = stability_df[stability_df['Out of Control']]
+    fig.add_trace(go.Scatter(x=out_of_control['CDMO'], y=out_of_control['Latest'], mode='markers', marker=dict(color='red', size=12, symbol='x'), name='Latest Batch Out of Control'))
+    fig.update_layout(height=450, yaxis_title="Cycle Time (Days)", scattermode='group', plot_bgcolor='rgba(0,0,0,0)', margin=dict(t=20, b=40, l=40, r=20), legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+with perf.span("Stability figure", 'render'):
+    st.plotly_chart(fig, use_container_width=True)
+
+with st.expander("Methodology & Actionability: Network Stability"):
+    st.markdown("""
+    **Methodology:** Each marker is the mean cycle time of one product at one CDMO; the whiskers span its XmR (individuals) control limits, Mean ± 2.66 × average moving range of consecutive batches. Limits are maintained as running statistics and update as each batch completes.
+
+    **Significance & Insights:** Wide whiskers mean an unpredictable process, even when the mean looks good. A red ✕ marks a series whose latest batch falls outside its own limits, a signal of a special cause rather than routine variation.
+
+    **Managerial Actionability:**
+    - **Action:** Investigate every red ✕ with the CDMO before the next batch starts.
+    - **Action:** Compare whisker widths for the same product across CDMOs to find the most predictable site for future volume.
+    """)
+
+st.divider()
+
+# --- Program Impact (impact graph, see impact_graph.py) ---
+st.header("Program Impact: Open Deviations & Risks")
+impact_program = st.selectbox("Program", sorted(schedule_df['Program'].dropna().unique()), key='impact_program')
+with perf.span("Program impact"):
+    impact = get_impact_graph().impact(program=impact_program, record_type='Deviation')
+imp_col1, imp_col2, imp_col3, imp_col4 = st.columns(4)
+imp_col1.metric("Batches", f"{len(impact['batch']):,}", help=f"Batches of {impact_program} across {len(impact['cdmo'])} CDMO(s).")
+imp_col2.metric("Open Deviations", f"{len(impact['record']):,}", help="Open deviations impacting these batches, or recorded as their latest deviation.")
+imp_col3.metric("Open Risks", f"{len(impact['risk']):,}", help="Open risks at the CDMOs running these batches, network-wide risks included.")
+imp_col4.metric("Mitigation Projects", f"{len(impact['project']):,}", help="Open OpEx projects the mitigation plans of those risks reference.")
+if len(impact['risk']):
+    with perf.span("Program impact risks"):
+        impact_risks = load_risk_register(columns=COMMAND_CENTER_RISKS)
+        impact_risks = impact_risks[impact_risks['Risk ID'].isin(impact['risk'])].nlargest(10, 'Risk Score')
+    st.dataframe(impact_risks, use_container_width=True, hide_index=True)
+    st.caption(f"Top {len(impact_risks)} of {len(impact['risk']):,} open risks by score.")
+
+with st.expander("Methodology & Actionability: Program Impact"):
+    st.markdown("""
+    **Methodology:** Batches, quality records, risks and OpEx projects are held in one relationship graph. A deviation links to the batch it impacts, a batch to its CDMO and its latest deviation, a risk to its CDMO, and a risk to each OpEx project its mitigation plan names. Selecting a program follows those links from its batches; saved edits to statuses are folded into the graph on the next rerun.
+
+    **Significance & Insights:** The counts show how much open quality and supply risk sits behind one program, across every partner that manufactures it.
+
+    **Managerial Actionability:**
+    - **Action:** Review the highest-scoring risks with the program team before the next batch release decision.
+    - **Action:** A program carrying open deviations at several CDMOs points to a shared cause (material, process or method transfer) rather than one site.
+    """)
+
+freshness.panel()
+perf.panel()
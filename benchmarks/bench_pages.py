@@ -0,0 +1,203 @@
+# benchmarks/bench_pages.py
+"""Headless page render benchmarks on Streamlit's AppTest harness.
+
+Runs app.py and every script under pages/ at several synthetic data sizes and records, per page:
+cold wall time (empty caches), warm rerun time, peak traced memory of a cold run, and the build and
+st.plotly_chart time of every figure. Results can be saved as a baseline and later runs compared
+against it; the script exits non-zero when a metric regresses beyond the tolerance.
+
+    python benchmarks/bench_pages.py --sizes sample small --update-baseline
+    python benchmarks/bench_pages.py --sizes sample small            # compare with the baseline
+
+Everything runs offline: synthetic stores are generated locally under benchmarks/.data/.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import plotly.graph_objects as go
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+import data_access
+from storage import DATA_DIR_ENV, has_dataset
+from synthetic import write_synthetic_store
+
+SIZES = {
+    'sample': None,  # The built-in utils.py literals.
+    'small': dict(n_cdmos=20, n_batches=5_000, n_quality=20_000, n_tasks=200),
+    'medium': dict(n_cdmos=50, n_batches=50_000, n_quality=200_000, n_tasks=2_000),
+    'large': dict(n_cdmos=200, n_batches=500_000, n_quality=2_000_000, n_tasks=10_000),
+}
+DATA_ROOT = os.path.join(ROOT, 'benchmarks', '.data')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+COMPARED_METRICS = ('cold_s', 'warm_s', 'peak_mb', 'interaction_s')
+
+def page_scripts():
+    pages = sorted(os.path.join('pages', p) for p in os.listdir(os.path.join(ROOT, 'pages')) if p.endswith('.py'))
+    return ['app.py', *pages]
+
+def _switch_cdmo(at):
+    """Drilldown interaction: pick the last CDMO in the sidebar selector."""
+    selector = at.sidebar.selectbox[0]
+    return selector.select(selector.options[-1])
+
+INTERACTIONS = {os.path.join('pages', 'A_CDMO_Drilldown.py'): _switch_cdmo}
+
+# --- Figure timing hooks ---
+class FigureTimer:
+    """Times each figure from construction to st.plotly_chart, and the st.plotly_chart call itself."""
+
+    def __init__(self):
+        self.created = {}
+        self.records = []
+
+    @contextmanager
+    def installed(self):
+        original_init, original_chart = go.Figure.__init__, st.plotly_chart
+        timer = self
+
+        def timed_init(fig, *args, **kwargs):
+            timer.created.setdefault(id(fig), time.perf_counter())
+            original_init(fig, *args, **kwargs)
+
+        def timed_chart(figure_or_data, *args, **kwargs):
+            started = time.perf_counter()
+            result = original_chart(figure_or_data, *args, **kwargs)
+            finished = time.perf_counter()
+            created = timer.created.pop(id(figure_or_data), started)
+            title = getattr(getattr(figure_or_data, 'layout', None), 'title', None)
+            timer.records.append({'figure': f"#{len(timer.records) + 1} {getattr(title, 'text', None) or ''}".strip(), 'build_s': started - created, 'chart_s': finished - started})
+            return result
+
+        go.Figure.__init__, st.plotly_chart = timed_init, timed_chart
+        try:
+            yield self
+        finally:
+            go.Figure.__init__, st.plotly_chart = original_init, original_chart
+
+def _run(script, timeout):
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout)
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(f"{script} raised: {at.exception[0].message}")
+    return at, elapsed
+
+def bench_page(script, timeout, repeat=3, measure_memory=True):
+    """Median cold / warm / interaction times over repeat runs, figure timings of the first cold run."""
+    cold, warm, interactions, figures = [], [], [], None
+    for _ in range(repeat):
+        data_access.invalidate()
+        with FigureTimer().installed() as timer:
+            at, elapsed = _run(script, timeout)
+        cold.append(elapsed)
+        figures = figures if figures is not None else timer.records
+        started = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - started)
+        interaction = INTERACTIONS.get(script)
+        if interaction:
+            started = time.perf_counter()
+            interaction(at).run()
+            interactions.append(time.perf_counter() - started)
+    result = {'cold_s': statistics.median(cold), 'warm_s': statistics.median(warm), 'figures': figures}
+    if interactions:
+        result['interaction_s'] = statistics.median(interactions)
+    if measure_memory:  # A separate run: tracing slows execution and would distort the timings.
+        data_access.invalidate()
+        tracemalloc.start()
+        try:
+            _run(script, timeout)
+            result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result
+
+def prepare_size(size, seed):
+    """Points the data layer at the store for a size, generating it on first use."""
+    scale = SIZES[size]
+    if scale is None:
+        os.environ.pop(DATA_DIR_ENV, None)
+        return
+    root = os.path.join(DATA_ROOT, f"{size}-{seed}")
+    if not has_dataset('schedule', root):
+        print(f"Generating {size} store in {root} ...", flush=True)
+        write_synthetic_store(root, seed=seed, **scale)
+    os.environ[DATA_DIR_ENV] = root
+
+def compare(results, baseline, tolerance, min_delta_s, min_delta_mb):
+    """Lists (size, page, metric, baseline, current) for every regression beyond tolerance."""
+    regressions = []
+    for size, pages in results.items():
+        for page, metrics in pages.items():
+            reference = baseline.get(size, {}).get(page, {})
+            for metric in COMPARED_METRICS:
+                if metric not in metrics or metric not in reference:
+                    continue
+                floor = min_delta_mb if metric == 'peak_mb' else min_delta_s
+                if metrics[metric] > reference[metric] * (1 + tolerance) and metrics[metric] - reference[metric] > floor:
+                    regressions.append((size, page, metric, reference[metric], metrics[metric]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every page headlessly at several data sizes.")
+    parser.add_argument('--sizes', nargs='+', default=['sample', 'small'], choices=list(SIZES))
+    parser.add_argument('--pages', nargs='+', help="Subset of page scripts (default: all).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per page; timings are medians.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced cold run (faster).")
+    parser.add_argument('--output', help="Write full results (including per-figure timings) to this JSON file.")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed relative slowdown before a metric counts as a regression.")
+    parser.add_argument('--min-delta-s', type=float, default=0.1)
+    parser.add_argument('--min-delta-mb', type=float, default=5.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # AppTest runs in bare mode; its warnings would drown the report.
+
+    results = {}
+    for size in args.sizes:
+        prepare_size(size, args.seed)
+        results[size] = {}
+        for script in args.pages or page_scripts():
+            metrics = bench_page(script, args.timeout, args.repeat, not args.no_memory)
+            results[size][script] = metrics
+            slowest = max(metrics['figures'], key=lambda f: f['build_s'] + f['chart_s'], default=None)
+            print(f"{size:<8}{script:<40}cold {metrics['cold_s']:7.3f}s  warm {metrics['warm_s']:7.3f}s"
+                  + (f"  interaction {metrics['interaction_s']:7.3f}s" if 'interaction_s' in metrics else '')
+                  + (f"  peak {metrics['peak_mb']:8.1f}MB" if 'peak_mb' in metrics else '')
+                  + (f"  slowest figure {slowest['figure']!r} {slowest['build_s'] + slowest['chart_s']:.3f}s" if slowest else ''), flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    summary = {size: {page: {k: v for k, v in m.items() if k in COMPARED_METRICS} for page, m in pages.items()} for size, pages in results.items()}
+    if args.update_baseline:
+        baseline = json.load(open(args.baseline)) if os.path.exists(args.baseline) else {}
+        baseline.update(summary)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --update-baseline first.")
+        return 0
+    regressions = compare(summary, json.load(open(args.baseline)), args.tolerance, args.min_delta_s, args.min_delta_mb)
+    for size, page, metric, before, after in regressions:
+        print(f"REGRESSION {size} {page} {metric}: {before:.3f} -> {after:.3f}")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# benchmarks/bench_sessions.py
+"""Concurrent-session load test: many AppTest sessions clicking through every page at once.
+
+Each simulated session opens app.py, switches through every script under pages/ and, on the
+Drilldown, picks a CDMO of its own, so sessions ask for different partitions. Sessions run on
+a thread pool in one process, as a Streamlit server runs them, and share its caches. Every rerun
+is timed. The report gives p50, p95 and max rerun latency per page and overall, and the memory
+each session adds. That memory figure is the resident-set growth while all sessions are held
+open, divided by the number of sessions. It is measured after one warm-up session has filled the
+shared caches, so it counts what each session holds itself, not the shared datasets.
+
+    python benchmarks/bench_sessions.py --sessions 200 --size small
+    python benchmarks/bench_sessions.py --sessions 50 --concurrency 10 --output sessions.json
+
+The exit code is non-zero if any session raised, or if p95 exceeds --max-p95-s when it is given.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.runtime import Runtime
+from streamlit.runtime.pages_manager import PagesManager
+from streamlit.runtime.scriptrunner import magic
+from streamlit.testing.v1 import AppTest, app_test
+from streamlit.testing.v1.util import patch_config_options
+import data_access
+from bench_pages import SIZES, page_scripts, prepare_size
+
+DRILLDOWN = os.path.join('pages', 'A_CDMO_Drilldown.py')
+
+def rss_mb():
+    """Current resident set size (Linux /proc), else the peak reported by getrusage."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return float('nan')
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]  # Nearest rank.
+
+@contextmanager
+def concurrent_apptest():
+    """Lets AppTest sessions run side by side in one process.
+
+    AppTest is written for one session at a time. Each run:
+    - sets global.appTest and then restores it;
+    - installs a mock Runtime and then clears it;
+    - resets the pages/ directory flag;
+    - parses the script with ast, which is not thread-safe in Python 3.11.
+    Here global.appTest stays on, the last mock Runtime stays reachable from runs still in flight,
+    the reset lands on a subclass instead of the flag the runner reads, and parsing is serialized.
+    The pages themselves run concurrently.
+    """
+    original_instance, original_magic = Runtime.__dict__['instance'], magic.add_magic
+    PagesManager.uses_pages_directory = os.path.isdir(os.path.join(ROOT, 'pages'))
+    app_test.PagesManager = type('PagesManager', (PagesManager,), {})
+    parse_lock, last = threading.Lock(), []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        return cls._instance or (last[0] if last else original_instance.__func__(cls))
+
+    def add_magic(code, script_path):
+        with parse_lock:
+            return original_magic(code, script_path)
+
+    Runtime.instance, magic.add_magic = classmethod(instance), add_magic
+    try:
+        with patch_config_options({'global.appTest': True}):
+            yield
+    finally:
+        Runtime.instance, magic.add_magic, app_test.PagesManager = original_instance, original_magic, PagesManager
+
+def run_session(number, scripts, timeout):
+    """One user's click-through; returns (the AppTest, kept so its state stays alive, [(page, seconds)], [errors])."""
+    timings, errors = [], []
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=timeout)
+
+    def rerun(page, action):
+        started = time.perf_counter()
+        action().run()
+        timings.append((page, time.perf_counter() - started))
+        errors.extend(f"session {number} {page}: {e.message}" for e in at.exception)
+
+    for script in scripts:
+        rerun(script, (lambda: at) if script == 'app.py' else (lambda: at.switch_page(script)))
+        if script == DRILLDOWN and not at.exception:
+            if not at.sidebar.selectbox:
+                errors.append(f"session {number} {script}: no CDMO selector rendered ({len(at.main.children)} main elements)")
+                continue
+            selector = at.sidebar.selectbox[0]
+            rerun(f"{script} (select CDMO)", lambda: selector.select(selector.options[number % len(selector.options)]))
+    return at, timings, errors
+
+def load_test(n_sessions, concurrency, timeout):
+    scripts = page_scripts()
+    data_access.invalidate()
+    started = time.perf_counter()
+    run_session(0, scripts, timeout)  # Warm-up: fills the shared caches, so the sessions below measure only themselves.
+    warmup_s = time.perf_counter() - started
+    gc.collect()
+    baseline_mb = rss_mb()
+    started = time.perf_counter()
+    with concurrent_apptest(), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        sessions = list(pool.map(lambda n: run_session(n, scripts, timeout), range(1, n_sessions + 1)))
+    wall_s = time.perf_counter() - started
+    gc.collect()
+    per_session_mb = (rss_mb() - baseline_mb) / n_sessions  # Measured while every session is still referenced.
+    timings = [t for _, session_timings, _ in sessions for t in session_timings]
+    by_page = {}
+    for page, seconds in timings:
+        by_page.setdefault(page, []).append(seconds)
+    summarize = lambda values: {'runs': len(values), 'p50_s': statistics.median(values), 'p95_s': percentile(values, 95), 'max_s': max(values)}
+    return {
+        'sessions': n_sessions, 'concurrency': concurrency, 'warmup_s': warmup_s, 'wall_s': wall_s,
+        'reruns_per_s': len(timings) / wall_s, 'baseline_mb': baseline_mb, 'mb_per_session': per_session_mb,
+        'overall': summarize([seconds for _, seconds in timings]),
+        'pages': {page: summarize(values) for page, values in by_page.items()},
+        'errors': [error for _, _, session_errors in sessions for error in session_errors],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent sessions clicking through every page.")
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, help="Sessions running at once (default: all of them).")
+    parser.add_argument('--size', default='sample', choices=list(SIZES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600, help="Per-rerun timeout in seconds.")
+    parser.add_argument('--max-p95-s', type=float, help="Fail when the overall p95 rerun latency exceeds this.")
+    parser.add_argument('--output', help="Write the full report to this JSON file.")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # AppTest runs in bare mode; its warnings would drown the report.
+
+    prepare_size(args.size, args.seed)
+    report = load_test(args.sessions, args.concurrency or args.sessions, args.timeout)
+    print(f"{report['sessions']} sessions ({report['concurrency']} at once) on '{args.size}' data: "
+          f"{report['wall_s']:.1f}s wall, {report['reruns_per_s']:.1f} reruns/s, warm-up {report['warmup_s']:.1f}s")
+    print(f"Memory: {report['baseline_mb']:.0f} MB after warm-up, {report['mb_per_session']:.2f} MB per session")
+    print(f"{'Page':<48}{'runs':>6}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+    for page, stats in [*report['pages'].items(), ('overall', report['overall'])]:
+        print(f"{page:<48}{stats['runs']:>6}{stats['p50_s']:>9.3f}{stats['p95_s']:>9.3f}{stats['max_s']:>9.3f}")
+    for error in report['errors'][:20]:
+        print(f"ERROR {error}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    too_slow = args.max_p95_s is not None and report['overall']['p95_s'] > args.max_p95_s
+    if too_slow:
+        print(f"p95 rerun latency {report['overall']['p95_s']:.3f}s exceeds {args.max_p95_s:.3f}s")
+    return 1 if report['errors'] or too_slow else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
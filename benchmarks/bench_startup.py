@@ -0,0 +1,89 @@
+# benchmarks/bench_startup.py
+"""Cold-start report: import time and time to first render for app.py and every page.
+
+Each page is measured in a fresh interpreter, twice: 'cold' (nothing imported or cached, as on the
+first visit after a deploy) and 'warm' (after warmup.warm(), as when the server was started with
+python warmup.py). Time to first render is the page's import time plus its first run in the cold
+case, and only the first run in the warm case, since the warm-up imported everything at boot.
+
+    python benchmarks/bench_startup.py [--data-dir DIR] [--output startup.json]
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def page_scripts():
+    pages = sorted(os.path.join('pages', p) for p in os.listdir(os.path.join(ROOT, 'pages')) if p.endswith('.py'))
+    return ['app.py', *pages]
+
+def measure(script, warm):
+    """Runs in the child interpreter: times the page's imports, the optional warm-up and two runs."""
+    import logging
+    logging.disable(logging.WARNING)
+    path = os.path.join(ROOT, script)
+    tree = ast.parse(open(path).read())
+    imports = ast.Module([node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))], type_ignores=[])
+    result = {}
+    if warm:
+        import warmup
+        started = time.perf_counter()
+        warmup.warm()
+        result['warmup_s'] = time.perf_counter() - started
+    started = time.perf_counter()
+    exec(compile(imports, path, 'exec'), {})
+    result['import_s'] = time.perf_counter() - started
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(path, default_timeout=600)
+    started = time.perf_counter()
+    at.run()
+    result['first_run_s'] = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(f"{script} raised: {at.exception[0].message}")
+    started = time.perf_counter()
+    at.run()
+    result['rerun_s'] = time.perf_counter() - started
+    result['first_render_s'] = result['first_run_s'] + (0.0 if warm else result['import_s'])
+    return result
+
+def run_child(script, warm, env):
+    args = [sys.executable, os.path.abspath(__file__), '--child', script] + (['--warm'] if warm else [])
+    out = subprocess.run(args, env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time and time to first render per page, cold and warmed.")
+    parser.add_argument('--data-dir', help="Store written by synthetic.py (default: the built-in sample data).")
+    parser.add_argument('--pages', nargs='+', help="Subset of page scripts (default: all).")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.child, args.warm)))
+        return 0
+
+    env = dict(os.environ)
+    env.pop('AVITY_DATA_DIR', None)
+    if args.data_dir:
+        env['AVITY_DATA_DIR'] = os.path.abspath(args.data_dir)
+    results = {}
+    print(f"{'page':<40}{'import':>9}{'cold first':>12}{'cold TTFR':>11}{'warm TTFR':>11}{'rerun':>9}{'warm-up':>9}")
+    for script in args.pages or page_scripts():
+        cold, warm = run_child(script, False, env), run_child(script, True, env)
+        results[script] = {'cold': cold, 'warm': warm}
+        print(f"{script:<40}{cold['import_s']:>8.2f}s{cold['first_run_s']:>11.2f}s{cold['first_render_s']:>10.2f}s"
+              f"{warm['first_render_s']:>10.2f}s{cold['rerun_s']:>8.2f}s{warm['warmup_s']:>8.2f}s", flush=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+# capacity.py
+"""Suite capacity and conflict index over the master production schedule.
+
+Batches occupy a resource (CDMO x 'Suite') from 'Start Date' up to 'End Date'. Every array here is
+sorted by (resource, start), and each resource is one contiguous slice of it. Resource-offset keys
+(code * KEY_STRIDE + day) let a single np.searchsorted over the whole array locate a day within
+one resource:
+- running() uses a prefix maximum of end days (an augmented sorted-interval sweep) to find
+  overlapping batches;
+- earliest_slot() searches each suite's merged busy blocks through a sparse table of the gaps
+  between them;
+- utilization() works from cumulative busy days.
+Each of these queries is O(log n) per suite plus the size of its answer. Overlaps within a suite
+are found once, at build time, by conflicts().
+"""
+import numpy as np
+import pandas as pd
+
+RESOURCE_COLUMN = 'Suite'
+UNASSIGNED = 'Unassigned'  # Suite of batches in stores written before suites were recorded.
+KEY_STRIDE = 1 << 32  # Larger than any day number, so resource-offset keys never interleave.
+MAX_CONFLICT_PAIRS = 200_000  # Pairs kept for listing; a store without suites overlaps almost everywhere.
+CONFLICT_COLUMNS = ['CDMO', 'Suite', 'Batch ID', 'Conflicting Batch', 'Overlap Start', 'Overlap End', 'Overlap (Days)']
+
+def _days(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy('datetime64[D]').astype(np.int64)
+
+def _date(day):
+    return pd.Timestamp(int(day), unit='D')
+
+def _segment_max(values, segments):
+    """Running maximum of values restarting at every segment (segments sorted ascending)."""
+    return np.maximum.accumulate(values + segments * KEY_STRIDE) - segments * KEY_STRIDE
+
+def _ranges(starts, ends):
+    counts = ends - starts
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+class _SparseMax:
+    """Range-maximum table answering 'first index >= i whose value >= x' in O(log n)."""
+
+    def __init__(self, values):
+        self.levels = [np.asarray(values)]
+        width = 1
+        while 2 * width <= len(values):
+            prev = self.levels[-1]
+            self.levels.append(np.maximum(prev[:-width], prev[width:]))
+            width *= 2
+
+    def first_at_least(self, i, x, stop):
+        """Smallest j in [i, stop) with values[j] >= x, or -1; i and stop are arrays (one query each)."""
+        i, stop = np.array(i, dtype=np.int64), np.asarray(stop)
+        for k in range(len(self.levels) - 1, -1, -1):
+            level = self.levels[k]
+            step = (i + (1 << k) <= stop) & (level[np.minimum(i, len(level) - 1)] < x) if len(level) else np.zeros_like(i, dtype=bool)
+            i += step << k
+        found = (i < stop) & (self.levels[0][np.minimum(i, len(self.levels[0]) - 1)] >= x) if len(self.levels[0]) else np.zeros_like(i, dtype=bool)
+        return np.where(found, i, -1)
+
+class CapacityIndex:
+    """Immutable interval index of batch occupancy per CDMO suite."""
+
+    def __init__(self, schedule_df, resource=RESOURCE_COLUMN):
+        df = schedule_df.reset_index(drop=True)
+        if resource not in df.columns:
+            df = df.assign(**{resource: UNASSIGNED})
+        self.frame = df
+        starts, ends = _days(df['Start Date']), _days(df['End Date'])
+        ends = np.maximum(ends, starts)
+        self.resources = pd.MultiIndex.from_arrays([df['CDMO'], df[resource]]).unique().sort_values()
+        codes = self.resources.get_indexer(pd.MultiIndex.from_arrays([df['CDMO'], df[resource]]))
+        order = np.lexsort((starts, codes))
+        self._rows, self._res, self._starts, self._ends = order, codes[order], starts[order], ends[order]
+        self._keys = self._res * KEY_STRIDE + self._starts
+        self._bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.resources)))])
+        self._max_end = _segment_max(self._ends, self._res)
+        self._cdmo_of = self.resources.get_level_values(0)
+        self._sorted_starts, self._sorted_ends = np.sort(starts), np.sort(ends)
+        self._build_blocks()
+        self._conflicts = self._find_conflicts()
+
+    def _build_blocks(self):
+        """Merges each suite's overlapping batches into disjoint busy blocks."""
+        prev_max = np.concatenate([[np.iinfo(np.int64).min], self._max_end[:-1]])
+        new = (self._starts > prev_max) | np.concatenate([[True], self._res[1:] != self._res[:-1]])
+        first = np.flatnonzero(new)
+        self._block_res = self._res[first]
+        self._block_start = self._starts[first]
+        self._block_end = np.maximum.reduceat(self._ends, first) if len(first) else first
+        self._block_keys = self._block_res * KEY_STRIDE + self._block_start
+        self._block_bounds = np.concatenate([[0], np.cumsum(np.bincount(self._block_res, minlength=len(self.resources)))])
+        self._busy_cum = np.concatenate([[0], np.cumsum(self._block_end - self._block_start)])
+        # Gap before each block; -1 marks the first block of a suite (its gap is open-ended).
+        gaps = np.empty(len(first), dtype=np.int64)
+        gaps[1:] = self._block_start[1:] - self._block_end[:-1]
+        gaps[self._block_bounds[:-1][np.diff(self._block_bounds) > 0]] = -1
+        self._gaps = _SparseMax(gaps)
+
+    def _find_conflicts(self):
+        """Every pair of batches in one suite whose occupancy overlaps (at most MAX_CONFLICT_PAIRS, see conflict_count)."""
+        later = np.searchsorted(self._keys, self._res * KEY_STRIDE + self._ends, side='left')
+        first = np.arange(len(self._keys))
+        counts = np.maximum(later - first - 1, 0)
+        self.conflict_count = int(counts.sum())
+        if self.conflict_count > MAX_CONFLICT_PAIRS:  # Keep the pairs of the latest-starting batches.
+            latest = np.argsort(-self._starts, kind='stable')
+            counts[latest[np.cumsum(counts[latest]) > MAX_CONFLICT_PAIRS]] = 0
+        a = np.repeat(first, counts)
+        b = _ranges(first + 1, first + 1 + counts)
+        overlap_start, overlap_end = self._starts[b], np.minimum(self._ends[a], self._ends[b])
+        rows_a, rows_b = self._rows[a], self._rows[b]
+        return pd.DataFrame({
+            'CDMO': self._cdmo_of[self._res[a]], 'Suite': self.resources.get_level_values(1)[self._res[a]],
+            'Batch ID': self.frame['Batch ID'].to_numpy()[rows_a], 'Conflicting Batch': self.frame['Batch ID'].to_numpy()[rows_b],
+            'Overlap Start': pd.to_datetime(overlap_start, unit='D'), 'Overlap End': pd.to_datetime(overlap_end, unit='D'),
+            'Overlap (Days)': overlap_end - overlap_start,
+        }, columns=CONFLICT_COLUMNS)
+
+    # --- Queries ---
+    def suites(self, cdmo):
+        return list(self.resources[self._cdmo_of == cdmo].get_level_values(1))
+
+    def _codes(self, cdmo, suite=None):
+        if suite is not None:
+            code = self.resources.get_indexer([(cdmo, suite)])[0]
+            return [] if code < 0 else [code]
+        return np.flatnonzero(self._cdmo_of == cdmo)
+
+    def running(self, cdmo, start, end, suite=None):
+        """Batches occupying any suite of cdmo (or one suite) at some point in [start, end]."""
+        start, end = _days([start])[0], _days([end])[0]
+        hits = []
+        for code in self._codes(cdmo, suite):
+            lo, hi = self._bounds[code], self._bounds[code + 1]
+            # Batches from `first` on may still be running at start; all of them start by end.
+            first = lo + np.searchsorted(self._max_end[lo:hi], start, side='left')
+            last = np.searchsorted(self._keys, code * KEY_STRIDE + end, side='right')
+            candidates = np.arange(first, last)
+            hits.append(candidates[self._ends[candidates] >= start])
+        rows = self._rows[np.concatenate(hits)] if hits else np.array([], dtype=np.intp)
+        return self.frame.iloc[rows].sort_values('Start Date', kind='stable')
+
+    def _slots(self, codes, days, after):
+        """First day from `after` on with `days` free days, for every resource code at once."""
+        lo, hi = self._block_bounds[codes], self._block_bounds[codes + 1]
+        ends = self._block_res * KEY_STRIDE + self._block_end  # Sorted too: blocks are disjoint within a suite.
+        j = np.searchsorted(ends, codes * KEY_STRIDE + after, side='right')  # First block still busy after `after`.
+        open_now = (j == hi) | (self._block_start[np.minimum(j, len(ends) - 1)] - after >= days)
+        # Otherwise free from the end of block j on: the first later gap long enough, else after the last block.
+        k = self._gaps.first_at_least(j + 1, days, hi)
+        later = np.where(k >= 0, self._block_end[np.maximum(k - 1, 0)], self._block_end[np.maximum(hi - 1, 0)])
+        return np.where(open_now, after, later)
+
+    def earliest_slot(self, cdmo, days, after, suite=None):
+        """(start date, suite) of the earliest window of `days` free days from `after` on, or None if cdmo has no suites."""
+        codes = np.asarray(self._codes(cdmo, suite), dtype=np.int64)
+        if not len(codes):
+            return None
+        slots = self._slots(codes, days, _days([after])[0])
+        best = slots.argmin()
+        return _date(slots[best]), self.resources[codes[best]][1]
+
+    def earliest_slots(self, days, after):
+        """Earliest slot of `days` free days from `after` on for every CDMO: CDMO, Suite, Slot Start, Wait (Days)."""
+        after = _days([after])[0]
+        slots = pd.DataFrame({'CDMO': self._cdmo_of, 'Suite': self.resources.get_level_values(1), 'Slot': self._slots(np.arange(len(self.resources)), days, after)})
+        best = slots.loc[slots.groupby('CDMO', sort=False)['Slot'].idxmin()]
+        return pd.DataFrame({
+            'CDMO': best['CDMO'].to_numpy(), 'Suite': best['Suite'].to_numpy(),
+            'Slot Start': pd.to_datetime(best['Slot'].to_numpy(), unit='D'), 'Wait (Days)': best['Slot'].to_numpy() - after,
+        }).sort_values(['Slot Start', 'CDMO'], ignore_index=True)
+
+    def busy_days(self, codes, days):
+        """Busy suite-days before each of days (a sorted array) for every resource code: (codes x days)."""
+        codes = np.asarray(codes)[:, None]
+        j = np.searchsorted(self._block_keys, codes * KEY_STRIDE + days[None, :], side='right')
+        lo = self._block_bounds[codes]
+        busy = self._busy_cum[j] - self._busy_cum[lo]
+        last = np.maximum(j - 1, 0)
+        overrun = np.where(j > lo, np.maximum(self._block_end[last] - days[None, :], 0), 0)
+        return busy - overrun
+
+    def utilization(self, start, end, freq='MS'):
+        """Share of suite-days occupied per CDMO and period between start and end (CDMO x period frame)."""
+        edges = pd.date_range(pd.Timestamp(start).to_period(freq[0]).start_time, end, freq=freq)
+        edges = edges.append(pd.DatetimeIndex([edges[-1] + pd.tseries.frequencies.to_offset(freq)])) if len(edges) else edges
+        days = edges.to_numpy('datetime64[D]').astype(np.int64)
+        busy = np.diff(self.busy_days(np.arange(len(self.resources)), days), axis=1)
+        capacity = np.diff(days)[None, :]
+        per_cdmo = pd.DataFrame(busy, index=self._cdmo_of).groupby(level=0).sum()
+        suites = pd.Series(1, index=self._cdmo_of).groupby(level=0).sum()
+        share = per_cdmo.to_numpy() / (capacity * suites.reindex(per_cdmo.index).to_numpy()[:, None])
+        return pd.DataFrame(share, index=per_cdmo.index, columns=edges[:-1])
+
+    def count_running(self, day):
+        """Batches running anywhere in the network on day: started by then, minus those already ended."""
+        day = _days([day])[0]
+        return int(np.searchsorted(self._sorted_starts, day, side='right') - np.searchsorted(self._sorted_ends, day, side='left'))
+
+    def occupancy(self, start, end):
+        """Share of all suite-days in the network occupied between start and end."""
+        days = _days([start, end])
+        busy = np.diff(self.busy_days(np.arange(len(self.resources)), days), axis=1).sum()
+        return busy / max(len(self.resources) * (days[1] - days[0]), 1)
+
+    def conflicts(self, cdmo=None):
+        """Overlapping batch pairs within a suite, as found when the index was built."""
+        return self._conflicts if cdmo is None else self._conflicts[self._conflicts['CDMO'] == cdmo]
@@ -0,0 +1,58 @@
+# cdmo_index.py
+"""Per-CDMO partition index over the CDMO-scoped datasets.
+
+Each dataset is split once by its CDMO column and the network-wide rows ('All' / 'Global') are
+folded into every partition, so switching the selected CDMO is a dictionary lookup instead of a
+boolean scan over the full tables. Rows keep their original order inside each partition.
+"""
+import numpy as np
+import pandas as pd
+from storage import CDMO_COLUMNS, NETWORK_WIDE_CDMOS
+
+class CDMOIndex:
+    """Immutable mapping of dataset name -> CDMO -> partition frame."""
+
+    def __init__(self, datasets):
+        self._partitions = {}
+        self._empty = {}
+        for name, df in datasets.items():
+            cdmo_col = CDMO_COLUMNS.get(name)
+            if cdmo_col is None:
+                raise ValueError(f"Dataset '{name}' has no CDMO column to partition on.")
+            # One stable sort by CDMO, then every partition is a contiguous slice of the sorted frame.
+            codes, cdmos = pd.factorize(df[cdmo_col])
+            codes[codes < 0] = len(cdmos)  # Rows without a CDMO sort last and belong to no partition.
+            order = np.argsort(codes, kind='stable')
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(cdmos) + 1))])
+            ordered = df.take(order)
+            shared_codes = [code for code, cdmo in enumerate(cdmos) if cdmo in NETWORK_WIDE_CDMOS]
+            shared = np.concatenate([np.arange(bounds[c], bounds[c + 1]) for c in shared_codes]) if shared_codes else np.array([], dtype=np.intp)
+            partitions = {}
+            for code, cdmo in enumerate(cdmos):
+                if code in shared_codes:
+                    continue
+                rows = np.arange(bounds[code], bounds[code + 1])
+                if len(shared):  # Fold in network-wide rows, restoring the original row order.
+                    rows = np.concatenate([rows, shared])
+                    rows = rows[np.argsort(order[rows], kind='stable')]
+                    partitions[cdmo] = ordered.take(rows)
+                else:
+                    partitions[cdmo] = ordered.iloc[bounds[code]:bounds[code + 1]]
+            self._partitions[name] = partitions
+            self._empty[name] = ordered.take(np.sort(shared))  # A CDMO with no rows of its own still sees network-wide rows.
+
+    @property
+    def datasets(self):
+        return list(self._partitions)
+
+    def cdmos(self, name):
+        return list(self._partitions[name])
+
+    def get(self, name, cdmo):
+        """The dataset's rows for one CDMO plus the network-wide rows (a shallow, caller-owned copy)."""
+        partition = self._partitions[name].get(cdmo)
+        return (self._empty[name] if partition is None else partition).copy(deep=False)
+
+    def partition(self, cdmo):
+        """Every indexed dataset for one CDMO."""
+        return {name: self.get(name, cdmo) for name in self._partitions}
@@ -0,0 +1,162 @@
+# control_limits.py
+"""Running XmR (individuals / moving range) control limits for batch cycle times.
+
+network_limits() computes limits for every series (by default CDMO x Product) in one grouped pass
+over the master schedule. ControlLimitService is seeded from that same pass and keeps the
+statistics as running sums so a batch completion updates its series in O(1), optionally over a rolling window of recent batches, and
+recalculate() starts a new phase (e.g. after a process change) from which limits are rebuilt.
+"""
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+E2 = 2.66  # 3 / d2 for moving ranges of two.
+VALUE_COL = 'Actual Cycle Time (Days)'
+ORDER_COL = 'End Date'
+DEFAULT_KEYS = ('CDMO', 'Product')
+LIMIT_COLUMNS = ['Batches', 'Mean', 'MR Bar', 'UCL', 'LCL', 'Latest']
+
+def completed_batches(schedule_df, by=DEFAULT_KEYS):
+    """Batches with an actual cycle time, in completion order within each series."""
+    done = schedule_df.dropna(subset=[VALUE_COL])
+    return done.sort_values([*by, ORDER_COL], kind='stable')
+
+def _grouped_limits(schedule_df, by, window=None, phase_starts=None):
+    """(batches counted, XmR statistics per series indexed by by) for network_limits() and the service seed."""
+    done = completed_batches(schedule_df, by)
+    if phase_starts:
+        starts = pd.DataFrame([(*(key if isinstance(key, tuple) else (key,)), pd.Timestamp(start)) for key, start in phase_starts.items()], columns=[*by, '_phase_start'])
+        done = done.merge(starts, on=by, how='left')
+        done = done[done['_phase_start'].isna() | (pd.to_datetime(done[ORDER_COL]) >= done['_phase_start'])]
+    if window:
+        done = done.groupby(by, sort=False, observed=True).tail(window)
+    values = done[VALUE_COL]
+    moving_range = values.groupby([done[c] for c in by], sort=False, observed=True).diff().abs()
+    grouped = done.assign(_mr=moving_range).groupby(by, sort=True, observed=True)
+    return done, grouped.agg(Batches=(VALUE_COL, 'size'), Mean=(VALUE_COL, 'mean'), **{'MR Bar': ('_mr', 'mean')}, Latest=(VALUE_COL, 'last'))
+
+def network_limits(schedule_df, by=DEFAULT_KEYS, window=None, phase_starts=None):
+    """XmR limits for every series in one grouped pass.
+
+    window keeps only each series' most recent batches; phase_starts maps a series key (a tuple
+    matching by) to the date its current phase began, and earlier batches are ignored.
+    """
+    _, limits = _grouped_limits(schedule_df, list(by), window, phase_starts)
+    limits['UCL'] = limits['Mean'] + E2 * limits['MR Bar']
+    limits['LCL'] = limits['Mean'] - E2 * limits['MR Bar']
+    return limits[LIMIT_COLUMNS].reset_index()
+
+class XmRAccumulator:
+    """O(1) running mean and average moving range for one series, optionally over a rolling window."""
+    __slots__ = ('window', 'values', 'ranges', 'value_sum', 'range_sum', 'count', 'range_count', 'last')
+
+    def __init__(self, window=None):
+        if window is not None and window < 2:
+            raise ValueError("A rolling window needs at least two batches to form a moving range.")
+        self.window = window
+        self.values = deque(maxlen=window) if window else None
+        self.ranges = deque(maxlen=window - 1) if window else None
+        self.value_sum = self.range_sum = 0.0
+        self.count = self.range_count = 0
+        self.last = None
+
+    def update(self, value):
+        value = float(value)
+        if self.last is not None:
+            moving_range = abs(value - self.last)
+            if self.ranges is not None:
+                if len(self.ranges) == self.ranges.maxlen:
+                    self.range_sum -= self.ranges[0]  # The deque drops it on append.
+                self.ranges.append(moving_range)
+            self.range_sum += moving_range
+            self.range_count += 1
+        if self.values is not None:
+            if len(self.values) == self.window:
+                self.value_sum -= self.values[0]
+            self.values.append(value)
+        self.value_sum += value
+        self.count += 1
+        self.last = value
+
+    @classmethod
+    def seeded(cls, n, mean, mr_bar, last, window=None, recent=None):
+        """The state after n values with this mean, average moving range and last value.
+
+        A windowed accumulator is replayed from recent, the window's values (at most window of them).
+        """
+        accumulator = cls(window)
+        if window:
+            for value in recent:
+                accumulator.update(value)
+            return accumulator
+        accumulator.count, accumulator.range_count = int(n), max(int(n) - 1, 0)
+        accumulator.value_sum = float(mean) * n
+        accumulator.range_sum = float(mr_bar) * (n - 1) if n > 1 else 0.0
+        accumulator.last = float(last)
+        return accumulator
+
+    @property
+    def n(self):
+        return len(self.values) if self.window else self.count
+
+    @property
+    def n_ranges(self):
+        return len(self.ranges) if self.window else self.range_count
+
+    def limits(self):
+        n, n_ranges = self.n, self.n_ranges
+        mean = self.value_sum / n if n else np.nan
+        mr_bar = self.range_sum / n_ranges if n_ranges else np.nan
+        return {'Batches': n, 'Mean': mean, 'MR Bar': mr_bar, 'UCL': mean + E2 * mr_bar, 'LCL': mean - E2 * mr_bar, 'Latest': self.last}
+
+class ControlLimitService:
+    """Thread-safe registry of XmR accumulators keyed by series, with phase (recalculation) points."""
+
+    def __init__(self, by=DEFAULT_KEYS, window=None):
+        self.by = tuple(by)
+        self.window = window
+        self._series = {}
+        self._phase_starts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_schedule(cls, schedule_df, by=DEFAULT_KEYS, window=None):
+        """Seeds every series from the completed batches of a schedule, in the grouped pass of network_limits()."""
+        service = cls(by, window)
+        done, limits = _grouped_limits(schedule_df, list(by), window)
+        recent = done.groupby(list(by), sort=True, observed=True)[VALUE_COL].agg(list) if window else None
+        for key, n, mean, mr_bar, last in zip(limits.index, limits['Batches'], limits['Mean'], limits['MR Bar'], limits['Latest']):
+            service._series[key] = XmRAccumulator.seeded(n, mean, mr_bar, last, window, recent[key] if window else None)
+        return service
+
+    def _key(self, key):
+        return tuple(key) if len(self.by) > 1 else (key[0] if isinstance(key, tuple) else key)
+
+    def update(self, key, value):
+        """Records one completed batch for a series in O(1)."""
+        key = self._key(key)
+        with self._lock:
+            self._series.setdefault(key, XmRAccumulator(self.window)).update(value)
+
+    def recalculate(self, key, phase_start=None):
+        """Starts a new phase for a series: limits are rebuilt from batches completed after this point."""
+        key = self._key(key)
+        with self._lock:
+            self._series[key] = XmRAccumulator(self.window)
+            self._phase_starts[key] = phase_start or pd.Timestamp.today().normalize()
+
+    def phase_starts(self):
+        with self._lock:
+            return dict(self._phase_starts)
+
+    def limits(self, key):
+        with self._lock:
+            accumulator = self._series.get(self._key(key))
+            return accumulator.limits() if accumulator else None
+
+    def to_frame(self):
+        """Current limits of every series, one row each."""
+        with self._lock:
+            rows = [(*(key if len(self.by) > 1 else (key,)), *accumulator.limits().values()) for key, accumulator in self._series.items()]
+        return pd.DataFrame(rows, columns=[*self.by, *LIMIT_COLUMNS]).sort_values(list(self.by), ignore_index=True)
@@ -0,0 +1,198 @@
+# critical_path.py
+"""Critical path method (CPM) scheduling over the tech transfer task dependency graph.
+
+Tasks are levelled once by longest path from a root, so every dependency runs from a lower level
+to a higher one. Each level is then scheduled in one vectorized step: a forward pass gives early
+start and early finish, and a backward pass from the project finish gives late start and late
+finish. A task starts no earlier than its planned 'Start Date' and lasts its actual duration once
+known (its planned duration until then); total float is late minus early start, and zero-float
+tasks form the critical path. update_duration() reschedules only the tasks downstream (early
+dates) and upstream (late dates) of the changed task.
+"""
+import heapq
+import numpy as np
+import pandas as pd
+
+DEPENDENCY_COLUMN = 'Predecessors'  # Comma-separated Task IDs that must finish before the task starts.
+SCHEDULE_COLUMNS = ['Early Start', 'Early Finish', 'Late Start', 'Late Finish', 'Total Float (Days)', 'Critical']
+
+def parse_dependencies(task_ids, predecessors):
+    """(predecessor, successor) positional index arrays from a column of comma-separated Task IDs."""
+    pairs = pd.Series(predecessors, dtype=object).fillna('').str.split(',').explode().str.strip()
+    pairs = pairs[pairs != '']
+    position = pd.Index(task_ids)
+    if not position.is_unique:
+        raise ValueError("Task IDs must be unique to resolve dependencies.")
+    src = position.get_indexer(pairs.to_numpy())
+    if (src < 0).any():
+        unknown = sorted(set(pairs[src < 0]))
+        raise ValueError(f"Unknown predecessor task(s): {', '.join(unknown[:10])}")
+    return src.astype(np.intp), pairs.index.to_numpy(dtype=np.intp)
+
+def _ranges(starts, ends):
+    """Concatenation of arange(start, end) for every pair, without a Python loop."""
+    counts = ends - starts
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+def _group_by(keys, values, n_groups=None):
+    """values split into one array per key 0..n_groups-1 (keys are small non-negative integers)."""
+    n_groups = int(keys.max(initial=-1)) + 1 if n_groups is None else n_groups
+    order = np.argsort(keys, kind='stable')
+    bounds = np.searchsorted(keys[order], np.arange(n_groups + 1))
+    return [values[order[bounds[g]:bounds[g + 1]]] for g in range(n_groups)]
+
+def _days(dates):
+    return (pd.to_datetime(pd.Series(dates)).to_numpy('datetime64[D]')).astype(np.int64)
+
+class CriticalPath:
+    """Early / late dates, float and critical tasks for one task graph (dates as integer days)."""
+
+    def __init__(self, task_ids, durations, src, dst, not_before, planned_durations=None):
+        self.task_ids = pd.Index(task_ids)
+        n = len(self.task_ids)
+        self.durations = np.asarray(durations, dtype=np.int64).copy()
+        self.not_before = np.asarray(not_before, dtype=np.int64)
+        self.src, self.dst = np.asarray(src, dtype=np.intp), np.asarray(dst, dtype=np.intp)
+        # Adjacency in CSR form for the incremental passes.
+        order = np.argsort(self.src, kind='stable')
+        self._succ, self._succ_ptr = self.dst[order], np.concatenate([[0], np.cumsum(np.bincount(self.src, minlength=n))])
+        order = np.argsort(self.dst, kind='stable')
+        self._pred, self._pred_ptr = self.src[order], np.concatenate([[0], np.cumsum(np.bincount(self.dst, minlength=n))])
+        self.level = self._levels()
+        self._rank = np.empty(n, dtype=np.intp)
+        self._rank[np.argsort(self.level, kind='stable')] = np.arange(n)  # A topological order.
+        self._level_nodes = _group_by(self.level, np.arange(n))
+        self._forward_edges = _group_by(self.level[self.dst], np.arange(len(self.dst)), len(self._level_nodes))
+        self._backward_edges = _group_by(self.level[self.src], np.arange(len(self.src)), len(self._level_nodes))
+        planned = self.durations if planned_durations is None else np.asarray(planned_durations, dtype=np.int64)
+        self.planned_finish_day = int(self._forward(planned)[1].max(initial=0)) if n else 0
+        self.es, self.ef = self._forward(self.durations)
+        self._backward()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Schedule for a tech transfer frame; tasks without a 'Predecessors' column are independent."""
+        if DEPENDENCY_COLUMN in df.columns:
+            src, dst = parse_dependencies(df['Task ID'], df[DEPENDENCY_COLUMN])
+        else:
+            src = dst = np.array([], dtype=np.intp)
+        planned = df['Planned Duration (Days)'].to_numpy(dtype=np.int64)
+        actual = df['Actual Duration (Days)'].fillna(df['Planned Duration (Days)']).to_numpy(dtype=np.int64)
+        return cls(df['Task ID'], actual, src, dst, _days(df['Start Date']), planned)
+
+    def _levels(self):
+        """Longest-path depth of every task (Kahn's algorithm, one frontier at a time); raises on cycles."""
+        n = len(self.task_ids)
+        indegree = np.bincount(self.dst, minlength=n)
+        level = np.zeros(n, dtype=np.intp)
+        frontier = np.flatnonzero(indegree == 0)
+        seen, depth = len(frontier), 0
+        while len(frontier):
+            succ = self._succ[_ranges(self._succ_ptr[frontier], self._succ_ptr[frontier + 1])]
+            np.subtract.at(indegree, succ, 1)
+            frontier = np.unique(succ[indegree[succ] == 0])
+            depth += 1
+            level[frontier] = depth
+            seen += len(frontier)
+        if seen < n:
+            cyclic = self.task_ids[indegree > 0]
+            raise ValueError(f"Task dependencies contain a cycle through: {', '.join(map(str, cyclic[:10]))}")
+        return level
+
+    # --- Full passes (vectorized per level) ---
+    def _forward(self, durations):
+        es = self.not_before.copy()
+        ef = np.empty_like(es)
+        for nodes, edges in zip(self._level_nodes, self._forward_edges):
+            np.maximum.at(es, self.dst[edges], ef[self.src[edges]])
+            ef[nodes] = es[nodes] + durations[nodes]
+        return es, ef
+
+    def _backward(self):
+        self.finish_day = int(self.ef.max(initial=0))
+        self.lf = np.full_like(self.ef, self.finish_day)
+        self.ls = np.empty_like(self.ef)
+        for nodes, edges in zip(reversed(self._level_nodes), reversed(self._backward_edges)):
+            np.minimum.at(self.lf, self.src[edges], self.ls[self.dst[edges]])
+            self.ls[nodes] = self.lf[nodes] - self.durations[nodes]
+
+    # --- Incremental update ---
+    def update_duration(self, task_id, days):
+        """Sets one task's duration and reschedules the affected tasks; returns how many tasks moved."""
+        i = self.task_ids.get_loc(task_id)
+        days = int(days)
+        if days == self.durations[i]:
+            return 0
+        self.durations[i] = days
+        moved = {i}
+        # Forward: early dates only change downstream, in topological order, until a task is unaffected.
+        self.ef[i] = self.es[i] + days
+        heap = [(self._rank[s], s) for s in self._succ[self._succ_ptr[i]:self._succ_ptr[i + 1]]]
+        heapq.heapify(heap)
+        queued = {s for _, s in heap}
+        while heap:
+            _, s = heapq.heappop(heap)
+            preds = self._pred[self._pred_ptr[s]:self._pred_ptr[s + 1]]
+            es = max(self.not_before[s], self.ef[preds].max())
+            if es == self.es[s]:
+                continue
+            self.es[s], self.ef[s] = es, es + self.durations[s]
+            moved.add(s)
+            for t in self._succ[self._succ_ptr[s]:self._succ_ptr[s + 1]]:
+                if t not in queued:
+                    queued.add(t)
+                    heapq.heappush(heap, (self._rank[t], t))
+        if self.ef.max(initial=0) != self.finish_day:
+            self._backward()  # The project finish moved, so every late date shifts.
+            return len(self.task_ids)
+        # Backward: late dates only change upstream of the task (its late finish is unchanged).
+        self.ls[i] = self.lf[i] - days
+        heap = [(-self._rank[p], p) for p in self._pred[self._pred_ptr[i]:self._pred_ptr[i + 1]]]
+        heapq.heapify(heap)
+        queued = {p for _, p in heap}
+        while heap:
+            _, p = heapq.heappop(heap)
+            lf = min(self.finish_day, self.ls[self._succ[self._succ_ptr[p]:self._succ_ptr[p + 1]]].min())
+            if lf == self.lf[p]:
+                continue
+            self.lf[p], self.ls[p] = lf, lf - self.durations[p]
+            moved.add(p)
+            for q in self._pred[self._pred_ptr[p]:self._pred_ptr[p + 1]]:
+                if q not in queued:
+                    queued.add(q)
+                    heapq.heappush(heap, (-self._rank[q], q))
+        return len(moved)
+
+    def copy(self):
+        """Independent schedule sharing the (immutable) graph, for what-if updates."""
+        clone = object.__new__(CriticalPath)
+        clone.__dict__.update(self.__dict__)
+        for name in ('durations', 'es', 'ef', 'ls', 'lf'):
+            setattr(clone, name, getattr(self, name).copy())
+        return clone
+
+    # --- Results ---
+    @property
+    def finish(self):
+        return pd.Timestamp(self.finish_day, unit='D')
+
+    @property
+    def planned_finish(self):
+        """Project finish with every task at its planned duration."""
+        return pd.Timestamp(self.planned_finish_day, unit='D')
+
+    @property
+    def total_float(self):
+        return self.ls - self.es
+
+    @property
+    def critical(self):
+        return self.total_float <= 0
+
+    def frame(self):
+        """One row per task, in input order, with SCHEDULE_COLUMNS."""
+        as_dates = lambda days: pd.to_datetime(days, unit='D')
+        return pd.DataFrame({
+            'Early Start': as_dates(self.es), 'Early Finish': as_dates(self.ef), 'Late Start': as_dates(self.ls), 'Late Finish': as_dates(self.lf),
+            'Total Float (Days)': self.total_float, 'Critical': self.critical,
+        }, index=self.task_ids)
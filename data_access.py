@@ -0,0 +1,328 @@
+# data_access.py
+"""Cached data-access layer in front of the utils.py generators.
+
+Pages read every dataset through the load_* functions below instead of calling the generators
+directly (which read from the Parquet store when one is configured). Results are memoized across
+reruns and sessions and keyed on the as-of date, because the schedule and quality generators build
+their dates relative to today.
+
+Each dataset is held once per server process (st.cache_resource), not pickled and copied into
+every session as st.cache_data would. The feed-backed datasets (schedule, quality, budget,
+governance, OpEx) are never fetched during a rerun: they are read from the last good snapshot of a
+background refresh scheduler (see refresh.py), and caches built from them are keyed on its
+snapshot versions. Loaders hand out shallow views of the shared frames: with
+pandas copy-on-write, a page that adds a column or writes a value into its view copies only what
+it touches, and the shared frame and other sessions' views never see the change.
+"""
+import streamlit as st
+from datetime import date
+from functools import partial
+from utils import (
+    generate_cdmo_data, generate_risk_register, generate_tech_transfer_data,
+    generate_spc_data, generate_spend_ledger, generate_action_items
+)
+from spc import run_spc
+from control_limits import ControlLimitService, VALUE_COL, ORDER_COL
+from cdmo_index import CDMOIndex
+from spend_ledger import SpendLedger
+from critical_path import CriticalPath
+from capacity import CapacityIndex
+from quality_feed import QualityStream, feed_dir
+from action_items import ActionStore
+import scorecard
+from edit_journal import EditJournal, journal_path
+from figure_cache import FigureCache
+from impact_graph import ImpactGraph, SOURCE_COLUMNS as IMPACT_COLUMNS
+from eac_forecast import DEFAULT_SCENARIOS, forecast
+from refresh import RefreshScheduler, default_sources, intervals as refresh_intervals
+from storage import store_version, select
+from perf import timed
+
+DATA_TTL_SECONDS = 60 * 60  # Upper bound on staleness; the as-of key already rolls over at midnight.
+
+# --- Background-refreshed sources (see refresh.py) ---
+_SCHEDULED = ('schedule', 'quality', 'budget', 'governance', 'opex')
+
+# One scheduler per process; clearing it (invalidate) stops its refresh thread.
+@st.cache_resource(show_spinner=False, on_release=RefreshScheduler.stop)
+def _scheduler():
+    return RefreshScheduler(default_sources(), refresh_intervals()).start()
+
+def _frame(name, columns=None, cdmo=None):
+    """A scheduled dataset's last good snapshot, projected as its generator would (see storage.select)."""
+    return select(_scheduler().snapshot(name), name, columns, cdmo)
+
+def _data_version(*sources):
+    """Store stamp plus the snapshot versions of the scheduled sources a cache is built from.
+
+    Versions restart when the scheduler is recreated (invalidate), so its token is part of the key too.
+    """
+    scheduler = _scheduler()
+    return store_version(), scheduler.token, tuple(scheduler.version(name) for name in sources)
+
+# --- Memoized generators (as_of is part of the cache key only; frames are shared, see _view) ---
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _cdmo_data(as_of, columns, cdmo): return generate_cdmo_data(columns, cdmo)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _master_schedule(version, columns, cdmo, _snapshot): return select(_snapshot, 'schedule', columns, cdmo)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _quality_data(version, columns, cdmo, _snapshot): return select(_snapshot, 'quality', columns, cdmo)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _risk_register(as_of, columns, cdmo): return generate_risk_register(columns, cdmo)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _budget_data(version, columns, cdmo, _snapshot): return select(_snapshot, 'budget', columns, cdmo)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _governance_data(version, columns, cdmo, _snapshot): return select(_snapshot, 'governance', columns, cdmo)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _op_ex_data(version, columns, cdmo, _snapshot): return select(_snapshot, 'opex', columns, cdmo)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _tech_transfer_data(as_of, columns): return generate_tech_transfer_data(columns)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _spc_data(as_of, batch_id, parameter): return generate_spc_data(batch_id, parameter)
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _spc_analysis(as_of, batch_ids, parameters): return run_spc(batch_ids, parameters)
+
+# Shared, mutable service (not copied per session): batch completions update it in place.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _cycle_time_limits(as_of, data_version):
+    return ControlLimitService.from_schedule(_frame('schedule', ['CDMO', 'Product', ORDER_COL, VALUE_COL]))
+
+# Partitioned once per data version; max_entries=1 drops the previous index when the data changes.
+_INDEXED_GENERATORS = {
+    'cdmo': generate_cdmo_data, 'schedule': partial(_frame, 'schedule'), 'quality': partial(_frame, 'quality'), 'risk': generate_risk_register,
+    'budget': partial(_frame, 'budget'), 'governance': partial(_frame, 'governance'), 'opex': partial(_frame, 'opex'),
+}
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _cdmo_index(as_of, data_version):
+    return CDMOIndex({name: generator() for name, generator in _INDEXED_GENERATORS.items()})
+
+# Shared rollup cube over the spend ledger; new lines are folded in with record_spend_lines().
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _spend_ledger(as_of, data_version):
+    return SpendLedger.from_lines(generate_spend_ledger(budget_df=_frame('budget')))
+
+# Keyed on the ledger version too, so appended spend lines re-run the simulation.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, show_spinner=False)
+def _eac_forecast(as_of, data_version, ledger_version, year, scenarios):
+    schedule = _frame('schedule', ['CDMO', 'Status', 'End Date', 'Cost per Batch ($K)'])
+    return forecast(_spend_ledger(as_of, _data_version('budget')), schedule, year, as_of, scenarios)
+
+# Shared CPM schedule; actual durations are folded in incrementally with record_task_duration().
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _critical_path(as_of, data_version):
+    return CriticalPath.from_frame(generate_tech_transfer_data())
+
+# Interval index over suite occupancy, built once per data version.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _capacity_index(as_of, data_version):
+    return CapacityIndex(_frame('schedule'))
+
+# Action-item arrays and pre-binned meeting cadence; new events are folded in with record_action_events().
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _action_store(as_of, data_version):
+    gov_df = _frame('governance')
+    return ActionStore.from_events(generate_action_items(gov_df=gov_df), gov_df)
+
+# Every CDMO's scorecard, read from the versioned snapshot (see scorecard.py) or built across a process pool.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _scorecard(as_of, data_version):
+    cdmo_df, schedule_df = generate_cdmo_data(scorecard.MASTER_COLUMNS), _frame('schedule', scorecard.SCHEDULE_COLUMNS)
+    prepared, root = scorecard.prepare(cdmo_df, schedule_df), scorecard.snapshot_dir()
+    snapshot = scorecard.load_snapshot(root, prepared[0]) if root else None
+    if snapshot is None:
+        snapshot = scorecard.build(cdmo_df, schedule_df, prepared=prepared)
+        if root:
+            scorecard.write_snapshot(snapshot, root)
+    return snapshot
+
+# Shared overlay of the data editors' saved cells; not date-keyed, since edits outlive the daily data refresh.
+@st.cache_resource(show_spinner=False)
+def _edit_journal(path):
+    return EditJournal(path)
+
+# Running quality aggregates, seeded from the snapshot and topped up from the feed on every rerun.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _quality_stream(as_of, data_version):
+    return QualityStream(feed_dir()).seed(_frame('quality'))
+
+# Links between batches, quality records, risks and OpEx projects; changes are folded in with record_impact_changes().
+_IMPACT_GENERATORS = {'schedule': partial(_frame, 'schedule'), 'quality': partial(_frame, 'quality'), 'risk': generate_risk_register, 'opex': partial(_frame, 'opex')}
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=1, show_spinner=False)
+def _impact_graph(as_of, data_version):
+    return ImpactGraph.from_frames(**{name: generator(IMPACT_COLUMNS[name]) for name, generator in _IMPACT_GENERATORS.items()})
+
+# Built chart JSON shared by every session; entries are keyed on their inputs, so it needs no date key.
+@st.cache_resource(show_spinner=False)
+def _figure_cache():
+    return FigureCache()
+
+_DATASETS = {
+    'cdmo': _cdmo_data, 'schedule': _master_schedule, 'quality': _quality_data, 'risk': _risk_register,
+    'budget': _budget_data, 'governance': _governance_data, 'opex': _op_ex_data, 'tech_transfer': _tech_transfer_data,
+    'scorecard': _scorecard, 'spc': _spc_data, 'spc_analysis': _spc_analysis,
+    'cycle_time_limits': _cycle_time_limits, 'cdmo_index': _cdmo_index, 'spend_ledger': _spend_ledger, 'eac_forecast': _eac_forecast,
+    'critical_path': _critical_path, 'capacity_index': _capacity_index,
+    'quality_stream': _quality_stream, 'action_store': _action_store, 'impact_graph': _impact_graph,
+    'edit_journal': _edit_journal, 'figure_cache': _figure_cache, 'refresh_scheduler': _scheduler,
+}
+
+# --- Public loaders ---
+# columns projects the frame and cdmo keeps one partner plus its network-wide rows; both are
+# pushed down to the Parquet store when one is configured (see storage.py). Calls are timed as
+# 'data' spans when perf recording is enabled (see perf.py).
+def _key(columns): return tuple(columns) if columns else None
+
+# Column sets the pages project; a projection is its own cache entry, so warmup.py warms each one listed here.
+COMMAND_CENTER_SCHEDULE = ['Program', 'CDMO', 'Status', 'Planned Cycle Time (Days)', 'Actual Cycle Time (Days)', 'Deviation ID']
+COMMAND_CENTER_RISKS = ['Risk ID', 'CDMO', 'Description', 'Risk Score', 'Mitigation Strategy', 'Mitigation Status']
+FINANCIAL_SCHEDULE = ['Program', 'Status', 'End Date', 'Yield (%)', 'Cost per Batch ($K)']
+PAGE_PROJECTIONS = (('load_master_schedule', COMMAND_CENTER_SCHEDULE), ('load_risk_register', COMMAND_CENTER_RISKS),
+                    ('load_master_schedule', FINANCIAL_SCHEDULE))
+
+_memo_versions = {}  # Memo name -> the data version its entries were built from.
+
+def _evict_stale(memo, version):
+    """Clears memo when version moves on, so superseded entries are not pinned until their TTL runs out."""
+    if _memo_versions.get(memo.__name__) != version:
+        _memo_versions[memo.__name__] = version
+        memo.clear()
+
+def _scheduled(memo, name, columns, cdmo):
+    scheduler = _scheduler()
+    version, snapshot = scheduler.versioned(name)
+    _evict_stale(memo, (scheduler.token, version))
+    return _view(memo((scheduler.token, version), _key(columns), cdmo, snapshot))
+
+def _view(df):
+    """Per-caller view of a shared frame; writes to it copy the touched columns instead of changing the original."""
+    return df.copy(deep=False)
+
+@timed('data')
+def load_cdmo_data(columns=None, cdmo=None): return _view(_cdmo_data(date.today(), _key(columns), cdmo))
+@timed('data')
+def load_master_schedule(columns=None, cdmo=None): return _scheduled(_master_schedule, 'schedule', columns, cdmo)
+@timed('data')
+def load_quality_data(columns=None, cdmo=None): return _scheduled(_quality_data, 'quality', columns, cdmo)
+@timed('data')
+def load_risk_register(columns=None, cdmo=None): return _view(_risk_register(date.today(), _key(columns), cdmo))
+@timed('data')
+def load_budget_data(columns=None, cdmo=None): return _scheduled(_budget_data, 'budget', columns, cdmo)
+@timed('data')
+def load_governance_data(columns=None, cdmo=None): return _scheduled(_governance_data, 'governance', columns, cdmo)
+@timed('data')
+def load_op_ex_data(columns=None, cdmo=None): return _scheduled(_op_ex_data, 'opex', columns, cdmo)
+@timed('data')
+def load_tech_transfer_data(columns=None): return _view(_tech_transfer_data(date.today(), _key(columns)))
+@timed('data')
+def load_cdmo_kpis(cdmo_name): return get_scorecard().kpis(cdmo_name)
+@timed('data')
+def load_cpk_data(cdmo_name): return get_scorecard().cpk(cdmo_name)
+@timed('data')
+def load_spc_data(batch_id, parameter='Oligo Concentration'): return _view(_spc_data(date.today(), batch_id, parameter))
+@timed('data')
+def load_spc_analysis(batch_ids, parameters): return tuple(map(_view, _spc_analysis(date.today(), tuple(batch_ids), tuple(parameters))))
+@timed('data')
+def get_cycle_time_limits(): return _cycle_time_limits(date.today(), _data_version('schedule'))
+@timed('data')
+def get_cdmo_index(): return _cdmo_index(date.today(), _data_version(*_SCHEDULED))
+@timed('data')
+def get_spend_ledger(): return _spend_ledger(date.today(), _data_version('budget'))
+
+def record_batch_completion(cdmo, product, cycle_time_days):
+    """Folds a newly completed batch into the running cycle-time limits in O(1)."""
+    get_cycle_time_limits().update((cdmo, product), cycle_time_days)
+
+@timed('data')
+def load_eac_forecast(year, scenarios=DEFAULT_SCENARIOS):
+    as_of, version, ledger_version = date.today(), _data_version('schedule', 'budget'), get_spend_ledger().version
+    _evict_stale(_eac_forecast, (as_of, version, ledger_version))  # Keeps every year and scenario count of the current inputs only.
+    return _view(_eac_forecast(as_of, version, ledger_version, year, scenarios))
+
+@timed('data')
+def get_critical_path(): return _critical_path(date.today(), _data_version())
+
+@timed('data')
+def get_capacity_index(): return _capacity_index(date.today(), _data_version('schedule'))
+
+@timed('data')
+def get_scorecard(): return _scorecard(date.today(), _data_version('schedule'))
+
+@timed('data')
+def get_action_store(): return _action_store(date.today(), _data_version('governance'))
+
+def record_action_events(events):
+    """Folds action item Opened / Closed events (see action_items.ACTION_COLUMNS) into the shared store; returns how many changed it."""
+    return get_action_store().append(events)
+
+def record_meetings(gov_df):
+    """Adds governance meetings to the pre-binned cadence counts; returns how many were new."""
+    return get_action_store().add_meetings(gov_df)
+
+@timed('data')
+def get_edit_journal():
+    """The shared edit journal, after folding in edits other sessions or processes have committed."""
+    journal = _edit_journal(journal_path())
+    journal.refresh()
+    return journal
+
+def record_edits(dataset, keys, edited_rows, session=None):
+    """Persists the changed cells of a data_editor delta (see edit_journal.EditJournal.record); returns how many were written."""
+    return _edit_journal(journal_path()).record(dataset, keys, edited_rows, session)
+
+@timed('data')
+def get_quality_stream():
+    """The shared quality aggregates, after ingesting anything new in the feed directory (AVITY_QUALITY_FEED)."""
+    stream = _quality_stream(date.today(), _data_version('quality'))
+    stream.poll()
+    return stream
+
+@timed('data')
+def get_impact_graph():
+    """The shared impact graph, with data editor edits saved since it last synced (by any session) folded in."""
+    graph = _impact_graph(date.today(), _data_version('schedule', 'quality', 'opex'))
+    journal = _edit_journal(journal_path())
+    journal.refresh()
+    if graph.synced.get('edits') != journal.version:
+        for dataset in ('quality', 'risk'):
+            graph.upsert_cells(dataset, journal.edits(dataset))
+        graph.synced['edits'] = journal.version
+    return graph
+
+def record_impact_changes(dataset, records):
+    """Folds added or changed schedule / quality / risk / opex records into the impact graph; returns how many."""
+    return get_impact_graph().upsert(dataset, records)
+
+def data_freshness():
+    """Per-source refresh status of the scheduled datasets (see refresh.RefreshScheduler.status)."""
+    return _scheduler().status()
+
+def get_figure_cache():
+    """The process-wide figure cache (see figure_cache.FigureCache.figure)."""
+    return _figure_cache()
+
+def record_task_duration(task_id, days):
+    """Sets a task's actual duration and reschedules only the tasks it affects; returns how many moved."""
+    return get_critical_path().update_duration(task_id, days)
+
+def record_spend_lines(lines):
+    """Folds newly posted ledger lines (see spend_ledger.LEDGER_COLUMNS) into the shared cube; returns how many were new."""
+    return get_spend_ledger().append(lines)
+
+def invalidate(*names):
+    """Drops the cached copies of the named datasets (all datasets when called without names)."""
+    unknown = set(names) - set(_DATASETS)
+    if unknown:
+        raise KeyError(f"Unknown dataset(s): {', '.join(sorted(unknown))}")
+    for name in names or _DATASETS:
+        _DATASETS[name].clear()
@@ -0,0 +1,93 @@
+# downsample.py
+"""Point reduction for long chart series.
+
+A Plotly trace sends every point to the browser, so a batch with hundreds of thousands of
+in-process measurements freezes the client. downsample() reduces a frame to about max_points rows:
+
+- 'lttb' (Largest-Triangle-Three-Buckets) keeps, per bucket, the point that spans the largest
+  triangle with the previously kept point and the next bucket's mean; the line keeps its visual shape.
+- 'minmax' keeps each bucket's lowest and highest value; every excursion survives, at twice the points.
+
+Rows flagged in keep (out-of-spec or rule-violating points) are kept on top of the budget. When
+more rows are flagged than max_points, as in a sustained shift where every point breaks a run rule,
+each run of consecutive flagged rows keeps its first and last row, so every excursion still shows
+where it starts and ends. Series at or under max_points are returned unchanged.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 2_000
+METHODS = ('lttb', 'minmax')
+
+def _bucket_edges(n, n_buckets):
+    """Start positions of n_buckets near-equal buckets over rows 1..n-2 (the first and last rows are kept apart), plus n-1."""
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+def lttb_indices(y, n_out, x=None):
+    """Positions of the n_out points LTTB keeps from y (x defaults to the row position)."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    edges = _bucket_edges(n, n_out - 2)
+    sizes = np.diff(edges)
+    # Mean of every bucket, then the last point as the "next bucket" of the final one.
+    next_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / sizes, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / sizes, y[-1])[1:]
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+def minmax_indices(y, n_out):
+    """Positions of each bucket's minimum and maximum (about n_out points in all), plus the first and last rows."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    n_buckets = (n_out - 2) // 2
+    size = -(-(n - 2) // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n - 2] = y[1:n - 1]
+    padded = padded.reshape(n_buckets, size)
+    valid = ~np.isnan(padded).all(axis=1)
+    starts = 1 + np.arange(n_buckets)[valid] * size
+    rows = padded[valid]
+    return np.unique(np.concatenate([[0, n - 1], starts + np.nanargmin(rows, axis=1), starts + np.nanargmax(rows, axis=1)]))
+
+def run_ends(mask):
+    """mask reduced to the first and last row of each run of consecutive True rows."""
+    mask = np.asarray(mask, dtype=bool)
+    padded = np.concatenate([[False], mask, [False]])
+    return mask & (~padded[:-2] | ~padded[2:])
+
+def downsample(df, y, x=None, keep=None, max_points=MAX_POINTS, method='lttb'):
+    """(rows of df to plot, number of rows elided).
+
+    y (and x, when numeric) name the columns the shape is judged on; keep is a boolean mask (array
+    or column name) of rows that must be plotted (see the module docstring for the run rule). Row
+    order is preserved.
+    """
+    n = len(df)
+    if n <= max_points:
+        return df, 0
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    keep_mask = np.zeros(n, dtype=bool) if keep is None else np.asarray(df[keep] if isinstance(keep, str) else keep, dtype=bool)
+    if keep_mask.sum() > max_points:
+        keep_mask = run_ends(keep_mask)
+    budget = max(max_points - int(keep_mask.sum()), max_points // 2)
+    values = df[y].to_numpy(dtype=float)
+    if method == 'lttb':
+        xs = df[x].to_numpy() if x is not None and pd.api.types.is_numeric_dtype(df[x]) else None
+        sampled = lttb_indices(values, budget, xs)
+    else:
+        sampled = minmax_indices(values, budget)
+    keep_mask[sampled] = True
+    return df.iloc[np.flatnonzero(keep_mask)], n - int(keep_mask.sum())
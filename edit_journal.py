@@ -0,0 +1,215 @@
+# edit_journal.py
+"""Persistent cell-level write-back for the Drilldown's data editors.
+
+Edits from st.data_editor (its edited_rows delta) are appended to a JSONL journal, one line per
+changed cell: dataset, record key, column, value, session and time. A save appends only the
+changed cells; it never rewrites or reloads the table. Each process keeps an overlay of the latest
+value per (dataset, key, column) and applies it to a partition with one isin() pass. refresh() tails
+the journal from the last byte read, so edits committed by other sessions or server processes show
+up on the next rerun.
+
+Once the journal passes COMPACT_LINES lines, compact() rewrites it as one line per live cell. It
+holds an exclusive flock on a sidecar lock file; appends hold the same lock for the length of one
+write(). Every append reopens the journal, so a write can never land in a file that compaction
+has already replaced. Each journal file starts with a header line naming its generation; a reader
+that finds a new header rebuilds its overlay from the top (inode numbers can be reused, so they
+cannot tell a compacted file from the old one).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from storage import data_dir
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: appends stay atomic per process, compaction is not coordinated across processes.
+    fcntl = None
+
+JOURNAL_ENV = 'AVITY_EDIT_JOURNAL'
+COMPACT_LINES = 100_000
+# Column that identifies a record in each editable dataset.
+KEY_COLUMNS = {'quality': 'Record ID', 'risk': 'Risk ID'}
+
+def journal_path():
+    """AVITY_EDIT_JOURNAL, else edits.jsonl in the data store (or the repo's data/ directory)."""
+    return os.environ.get(JOURNAL_ENV) or os.path.join(data_dir() or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'), 'edits.jsonl')
+
+def _json_value(value):
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return None if value is not None and pd.isna(value) else value
+
+def _coerce(column, values):
+    """values (as stored in JSON) converted to the dtype of the column they are written into."""
+    values = pd.Series(values, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return pd.to_datetime(values, errors='coerce').to_numpy()
+    if pd.api.types.is_bool_dtype(column):
+        return values.astype(bool).to_numpy()
+    if pd.api.types.is_numeric_dtype(column):
+        return pd.to_numeric(values, errors='coerce').to_numpy()
+    sample = column.dropna()
+    if len(sample) and isinstance(sample.iloc[0], date):  # Object columns of datetime.date, as the generators emit.
+        return pd.to_datetime(values, errors='coerce').dt.date.to_numpy(dtype=object)
+    return values.to_numpy()
+
+class EditJournal:
+    """Append-only cell edit log with an in-memory overlay of the latest value per cell."""
+
+    def __init__(self, path):
+        self.path = path
+        self._overlay = {}  # dataset -> key -> {column: value}
+        self._header, self._offset, self._lines, self._live = None, 0, 0, 0
+        self._lock = threading.Lock()
+        self.version = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.refresh()
+
+    @contextmanager
+    def _file_lock(self, exclusive=True):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _fold(self, entries):
+        for entry in entries:
+            cells = self._overlay.setdefault(entry['dataset'], {}).setdefault(entry['key'], {})
+            self._live += entry['column'] not in cells
+            cells[entry['column']] = entry['value']
+        self._lines += len(entries)
+
+    @staticmethod
+    def _new_header():
+        return (json.dumps({'journal': uuid.uuid4().hex, 'created': time.time()}) + '\n').encode('utf-8')
+
+    # --- Reading ---
+    def refresh(self):
+        """Folds in edits appended since the last read (by any process); returns how many were new."""
+        with self._lock:
+            try:
+                f = open(self.path, 'rb')
+            except FileNotFoundError:
+                return 0
+            with f:
+                header = f.readline()
+                if not header.endswith(b'\n'):  # Being created right now.
+                    return 0
+                if header != self._header:  # A new file (first read, or compacted since the last one).
+                    self._overlay, self._header, self._offset, self._lines, self._live = {}, header, len(header), 0, 0
+                size = os.fstat(f.fileno()).st_size
+                if size == self._offset:
+                    return 0
+                f.seek(self._offset)
+                chunk = f.read(size - self._offset)
+            end = chunk.rfind(b'\n') + 1  # A line still being written is read on the next refresh.
+            self._offset += end
+            entries = []
+            for line in chunk[:end].splitlines():
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+            self._fold(entries)
+            if entries:
+                self.version += 1
+            return len(entries)
+
+    def edits(self, dataset):
+        """Latest edited values for the dataset: key -> {column: value}."""
+        with self._lock:
+            return {key: dict(cells) for key, cells in self._overlay.get(dataset, {}).items()}
+
+    def apply(self, dataset, df):
+        """df with the journal's edits applied to its rows (df itself is not modified; unedited frames are returned as is)."""
+        key_column = KEY_COLUMNS[dataset]
+        edits = self.edits(dataset)
+        if not edits or df.empty:
+            return df
+        rows = np.flatnonzero(df[key_column].isin(edits).to_numpy())
+        if not len(rows):
+            return df
+        df = df.copy()
+        keys = df[key_column].to_numpy()[rows]
+        by_column = {}
+        for row, key in zip(rows, keys):
+            for column, value in edits[key].items():
+                if column in df.columns and column != key_column:
+                    by_column.setdefault(column, ([], []))
+                    by_column[column][0].append(row)
+                    by_column[column][1].append(value)
+        for column, (positions, values) in by_column.items():
+            coerced = _coerce(df[column], values)
+            if pd.api.types.is_numeric_dtype(df[column]) and df[column].dtype != coerced.dtype:
+                df[column] = df[column].astype(np.result_type(df[column].dtype, coerced.dtype))  # e.g. an int column given a fractional edit.
+            elif isinstance(df[column].dtype, pd.CategoricalDtype):  # Typed columns (see schema.py) only take known categories.
+                new = pd.Index(pd.unique(coerced[pd.notna(coerced)])).difference(df[column].cat.categories)
+                if len(new):
+                    df[column] = df[column].cat.add_categories(new)
+            df.iloc[positions, df.columns.get_loc(column)] = coerced
+        return df
+
+    # --- Writing ---
+    def record(self, dataset, keys, edited_rows, session=None):
+        """Appends the changed cells of a data_editor edited_rows delta ({row position: {column: value}}).
+
+        keys are the record keys of the displayed rows, by position. Cells that already hold the
+        edited value are skipped, so the cumulative delta the widget reports can be passed on every
+        change. Returns the number of cells written.
+        """
+        keys = np.asarray(keys, dtype=object)
+        now = time.time()
+        with self._lock:
+            current = self._overlay.get(dataset, {})
+            entries = []
+            for row, cells in edited_rows.items():
+                key = _json_value(keys[int(row)])
+                for column, value in cells.items():
+                    value = _json_value(value)
+                    if current.get(key, {}).get(column, object()) != value:
+                        entries.append({'dataset': dataset, 'key': key, 'column': column, 'value': value, 'session': session, 'ts': now})
+        if not entries:
+            return 0
+        payload = ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+        with self._file_lock():
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    payload = self._new_header() + payload
+                os.write(fd, payload)  # One write per save: other readers see all of its cells or none.
+            finally:
+                os.close(fd)
+        self.refresh()  # Folds in this save and anything other processes appended before it.
+        if self._lines > COMPACT_LINES and self._lines > 2 * self._live:
+            self.compact()
+        return len(entries)
+
+    def compact(self):
+        """Rewrites the journal as one line per live cell; returns the number of lines kept."""
+        with self._file_lock():
+            self.refresh()  # Everything appended before the lock is in the overlay.
+            with self._lock:
+                entries = [{'dataset': dataset, 'key': key, 'column': column, 'value': value, 'session': 'compaction', 'ts': time.time()}
+                           for dataset, records in self._overlay.items() for key, cells in records.items() for column, value in cells.items()]
+            tmp = f'{self.path}.{uuid.uuid4().hex}.tmp'
+            with open(tmp, 'w') as f:
+                f.write(self._new_header().decode('utf-8'))
+                f.writelines(json.dumps(entry) + '\n' for entry in entries)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        self.refresh()  # Re-reads the compacted file from the top (new header).
+        return len(entries)
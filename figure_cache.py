@@ -0,0 +1,121 @@
+# figure_cache.py
+"""Process-wide cache of built Plotly figures, keyed by a fingerprint of what they are drawn from.
+
+Building a figure (Plotly Express grouping, trace validation, annotations) costs far more than
+handing a finished one to st.plotly_chart. FigureCache.figure(build, *inputs, **params) fingerprints
+the builder (its file, name and bytecode) and its inputs (frames by content, other values by repr),
+and on a hit returns the stored figure JSON rehydrated without re-validation; on a miss it calls
+build(*inputs, **params) and stores the result's JSON. A builder must depend on its arguments only: anything it reads from
+elsewhere is not part of the key.
+
+Entries are serialized JSON strings held in LRU order under a byte budget (AVITY_FIGURE_CACHE_MB,
+64 MB by default), so the cache's footprint is bounded however many CDMOs and filters are viewed.
+One instance is shared by every session of the server process (see data_access.get_figure_cache).
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+MAX_MB_ENV = 'AVITY_FIGURE_CACHE_MB'
+DEFAULT_MAX_MB = 64
+
+def budget_bytes():
+    return int(float(os.environ.get(MAX_MB_ENV) or DEFAULT_MAX_MB) * 2**20)
+
+def _update(digest, part):
+    if isinstance(part, (pd.DataFrame, pd.Series)):
+        frame = part.to_frame() if isinstance(part, pd.Series) else part
+        digest.update(repr((type(part).__name__, list(frame.columns), [str(t) for t in frame.dtypes])).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    elif isinstance(part, np.ndarray):
+        digest.update(repr((part.dtype.str, part.shape)).encode())
+        digest.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, (list, tuple)):
+        digest.update(f'{type(part).__name__}{len(part)}'.encode())
+        for item in part:
+            _update(digest, item)
+    elif isinstance(part, dict):
+        digest.update(f'dict{len(part)}'.encode())
+        for key in sorted(part, key=repr):
+            _update(digest, key)
+            _update(digest, part[key])
+    else:
+        digest.update(repr(part).encode())
+    digest.update(b'\x00')
+
+def _code_parts(code):
+    """Bytecode and constants of a function, nested code objects included (their repr carries an address)."""
+    return code.co_filename, code.co_code, tuple(_code_parts(c) if hasattr(c, 'co_code') else c for c in code.co_consts)
+
+def fingerprint(*parts):
+    """Content hash of frames, arrays and plain values (nested lists, tuples and dicts included)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        _update(digest, part)
+    return digest.hexdigest()
+
+class FigureCache:
+    """LRU map of fingerprint -> figure JSON, bounded by the total size of the stored JSON."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else budget_bytes()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return spec
+
+    def put(self, key, spec):
+        size = sys.getsizeof(spec)
+        if size > self.max_bytes:  # Would evict everything else and still not fit.
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= sys.getsizeof(old)
+            self._entries[key] = spec
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+    def figure(self, build, *inputs, **params):
+        """build(*inputs, **params), or the figure a previous call with the same inputs produced."""
+        # Page scripts all run as __main__ and are re-executed on every rerun: file and bytecode identify a builder.
+        key = fingerprint(build.__qualname__, _code_parts(build.__code__), inputs, params)
+        spec = self.get(key)
+        if spec is not None:
+            return go.Figure(json.loads(spec), _validate=False)  # Was validated when it was built.
+        fig = build(*inputs, **params)
+        self.put(key, pio.to_json(fig, validate=False))
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'Figures': len(self), 'MB': self.bytes / 2**20, 'Hits': self.hits, 'Misses': self.misses,
+                'Hit Rate (%)': 100 * self.hits / lookups if lookups else 0.0, 'Evictions': self.evictions}
@@ -0,0 +1,38 @@
+# freshness.py
+"""Sidebar panel showing how fresh each background-refreshed dataset is (see refresh.py).
+
+Pages read the last good snapshot of every source, so what they show can lag the feeds by up to a
+refresh interval, or more when a feed is failing. The panel's label gives the age of the oldest
+snapshot; inside, a table lists each source's state, last check, last change and fetch latency,
+and a warning names any source that is stale or failing and the time of the snapshot shown.
+"""
+import pandas as pd
+import streamlit as st
+from data_access import data_freshness
+
+STATE_ICONS = {'fresh': '🟢', 'refreshing': '🔄', 'loading': '⏳', 'stale': '🟠', 'failing': '🔴'}
+
+def _age(seconds):
+    if seconds is None or pd.isna(seconds):
+        return "not loaded"
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    return f"{seconds / 60:.0f} min" if seconds < 5400 else f"{seconds / 3600:.1f} h"
+
+def panel():
+    """Shows per-source freshness timestamps and refresh latency in the sidebar."""
+    status = data_freshness()
+    with st.sidebar.expander(f"Data freshness: oldest {_age(status['Age (s)'].max())} ago"):
+        table = status.assign(State=status['State'].map(lambda state: f"{STATE_ICONS.get(state, '')} {state}"))
+        st.dataframe(table[['Source', 'State', 'Last Checked', 'Last Changed', 'Latency (ms)', 'Interval (s)']], hide_index=True,
+                     column_config={
+                         'Last Checked': st.column_config.DatetimeColumn(format="HH:mm:ss"),
+                         'Last Changed': st.column_config.DatetimeColumn(format="MMM D, HH:mm:ss"),
+                         'Latency (ms)': st.column_config.NumberColumn(format="%.0f"),
+                         'Interval (s)': st.column_config.NumberColumn(format="%.0f"),
+                     })
+        for row in status[status['State'].isin(['stale', 'failing'])].to_dict('records'):
+            checked = row['Last Checked']
+            shown = f"showing the snapshot checked at {checked:%Y-%m-%d %H:%M:%S}" if pd.notna(checked) else "no snapshot loaded yet"
+            st.warning(f"{row['Source']}: {row['State']}, {shown}." + (f" Last error: {row['Last Error']}" if pd.notna(row['Last Error']) else ""))
+        st.caption("Pages read the last good snapshot and never wait on a refresh; each source is re-fetched on its own interval in the background.")
@@ -0,0 +1,135 @@
+# gantt.py
+"""Batched Gantt figure builder for tech transfer plans.
+
+The chart is drawn as a constant number of traces, one per layer (planned bars, progress bars,
+planned-finish milestones), whatever the number of tasks. Above WEBGL_THRESHOLD rows the layers
+switch to WebGL (Scattergl) so the browser stays interactive at 10k tasks, and collapse_phases()
+folds whole phases into one summary row so only the expanded phases are built task by task.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+RISK_COLORS = {'High': '#DC3912', 'Medium': '#FF9900', 'Low': '#109618'}
+RISK_ORDER = ['Low', 'Medium', 'High']
+PLANNED_COLOR = '#E0E0E0'
+CRITICAL_COLOR = 'black'
+WEBGL_THRESHOLD = 2_000
+ROW_HEIGHT = 40
+MAX_CHART_HEIGHT = 4_000
+MS_PER_DAY = 24 * 60 * 60 * 1000  # Bars on a date axis measure their length in milliseconds.
+# Colours are passed as numeric codes on discrete scales: plotly validates colour strings one by one.
+RISK_COLORSCALE = [[i / (len(RISK_ORDER) - 1), RISK_COLORS[risk]] for i, risk in enumerate(RISK_ORDER)]
+OUTLINE_COLORSCALE = [[0, 'DarkSlateGray'], [1, CRITICAL_COLOR]]
+
+def task_phases(df):
+    """Phase label per task, taken from the leading number of its Task ID (TT-3.2 -> 'Phase 3')."""
+    return 'Phase ' + df['Task ID'].str.extract(r'^TT-(\d+)', expand=False).fillna('?')
+
+def collapse_phases(df, expanded=None):
+    """Keeps the tasks of the expanded phases and replaces every other phase with one summary row.
+
+    Summary rows span the phase's earliest start to latest planned finish, carry its duration-weighted
+    progress, its highest risk level and its worst variance, and are critical when any of its tasks is
+    (when df has a 'Critical' column). expanded=None keeps every phase expanded.
+    """
+    phases = task_phases(df)
+    if expanded is None:
+        return df.assign(Phase=phases)
+    keep = phases.isin(expanded)
+    collapsed = df[~keep]
+    collapsed = collapsed.assign(Phase=phases[~keep], _done=collapsed['Planned Duration (Days)'] * collapsed['Progress (%)'],
+                                 _risk=pd.Categorical(collapsed['Risk Level'], categories=RISK_ORDER).codes,
+                                 _critical=collapsed['Critical'] if 'Critical' in df.columns else False)
+    if collapsed.empty:
+        return df[keep].assign(Phase=phases[keep])
+    grouped = collapsed.groupby('Phase', sort=True)
+    summary = grouped.agg(
+        n_tasks=('Task ID', 'size'), start=('Start Date', 'min'), finish=('Finish Date', 'max'),
+        done=('_done', 'sum'), planned=('Planned Duration (Days)', 'sum'), risk=('_risk', 'max'), variance=('Variance (Days)', 'max'),
+        critical=('_critical', 'any'),
+    ).reset_index()
+    summary = pd.DataFrame({
+        'Task ID': summary['Phase'], 'Task': '▸ ' + summary['Phase'] + ' (' + summary['n_tasks'].astype(str) + ' tasks)',
+        'Lead Team': 'Multiple', 'Planned Duration (Days)': (summary['finish'] - summary['start']).dt.days,
+        'Start Date': summary['start'], 'Finish Date': summary['finish'], 'Risk Level': np.array(RISK_ORDER)[summary['risk']],
+        'Progress (%)': (summary['done'] / summary['planned']).round().astype(int), 'Variance (Days)': summary['variance'], 'Phase': summary['Phase'],
+        **({'Critical': summary['critical']} if 'Critical' in df.columns else {}),
+    })
+    return pd.concat([df[keep].assign(Phase=phases[keep]), summary], ignore_index=True).sort_values(['Phase', 'Start Date'], kind='stable', ignore_index=True)
+
+def hover_text(df):
+    """Per-task hover labels, built column-wise."""
+    variance = df['Variance (Days)'].fillna(0).round().astype(int)
+    text = lambda column: df[column].astype(str)  # Lead Team and Risk Level are categoricals (see schema.py).
+    return ('<b>' + text('Task') + '</b><br>Lead Team: ' + text('Lead Team') + '<br>Risk: ' + text('Risk Level')
+            + '<br>Status: ' + df['Progress (%)'].astype(int).astype(str) + '% Complete'
+            + '<br>Planned: ' + df['Start Date'].dt.strftime('%b %d') + ' - ' + df['Finish Date'].dt.strftime('%b %d')
+            + ' (' + df['Planned Duration (Days)'].astype(int).astype(str) + 'd)'
+            + '<br>Variance: ' + np.where(variance >= 0, '+', '') + variance.astype(str) + 'd')
+
+def _segments(starts, ends, labels, text=None):
+    """Interleaves start/end/gap points so a single line trace draws one segment per task."""
+    n = len(starts)
+    # Timestamps, not datetime64 values: those become integer nanoseconds in an object array, which plotly reads as ms.
+    starts, ends = pd.DatetimeIndex(starts).astype(object), pd.DatetimeIndex(ends).astype(object)
+    x = np.empty(3 * n, dtype=object); y = np.empty(3 * n, dtype=object)
+    x[0::3], x[1::3], x[2::3] = starts, ends, None
+    y[0::3], y[1::3], y[2::3] = labels, labels, None
+    if text is None:
+        return x, y, None
+    hover = np.empty(3 * n, dtype=object); hover[0::3], hover[1::3], hover[2::3] = text, text, None
+    return x, y, hover
+
+def build_gantt(df, today=None, critical=None, webgl=None, title='Tech Transfer Project Timeline & Progress'):
+    """Builds the Gantt figure with one trace per layer.
+
+    df needs the tech transfer columns plus 'Variance (Days)'; critical is an optional boolean mask of
+    critical-path tasks, outlined on the chart. webgl=None picks WebGL above WEBGL_THRESHOLD rows.
+    """
+    webgl = len(df) > WEBGL_THRESHOLD if webgl is None else webgl
+    labels = df['Task'].to_numpy()
+    starts = df['Start Date']
+    durations = df['Planned Duration (Days)'].to_numpy(dtype=float)
+    progress = df['Progress (%)'].to_numpy(dtype=float)
+    risk_codes = pd.Categorical(df['Risk Level'], categories=RISK_ORDER).codes
+    hovers = hover_text(df).to_numpy()
+    critical = np.zeros(len(df), dtype=bool) if critical is None else np.asarray(critical, dtype=bool)
+    risk_color = dict(color=risk_codes, colorscale=RISK_COLORSCALE, cmin=0, cmax=len(RISK_ORDER) - 1)
+    outline = dict(color=critical.astype(int), colorscale=OUTLINE_COLORSCALE, cmin=0, cmax=1)
+
+    fig = go.Figure()
+    if webgl:
+        progress_ends = starts + pd.to_timedelta(durations * progress / 100, unit='D')
+        x, y, _ = _segments(starts.to_numpy(), df['Finish Date'].to_numpy(), labels)
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', line=dict(color=PLANNED_COLOR, width=12), hoverinfo='none', name='Planned'))
+        for risk in RISK_ORDER:  # A GL line has a single colour, so the progress layer is split by risk level.
+            mask = (df['Risk Level'] == risk).to_numpy()
+            if mask.any():
+                x, y, hover = _segments(starts.to_numpy()[mask], progress_ends.to_numpy()[mask], labels[mask], hovers[mask])
+                fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', line=dict(color=RISK_COLORS[risk], width=8), hovertext=hover, hoverinfo='text', name=f'{risk} Risk'))
+        milestone = go.Scattergl
+    else:
+        fig.add_trace(go.Bar(x=durations * MS_PER_DAY, y=labels, orientation='h', base=starts, marker_color=PLANNED_COLOR, hoverinfo='none', name='Planned'))
+        fig.add_trace(go.Bar(
+            x=durations * progress / 100 * MS_PER_DAY, y=labels, orientation='h', base=starts,
+            marker=dict(**risk_color, line=dict(**outline, width=np.where(critical, 2, 0))),
+            text=df['Progress (%)'].astype(int).astype(str) + '%', textposition='inside', insidetextanchor='middle',
+            hovertext=hovers, hoverinfo='text', name='Progress'
+        ))
+        milestone = go.Scatter
+    fig.add_trace(milestone(
+        x=df['Finish Date'], y=labels, mode='markers', name='Planned Finish', hoverinfo='none',
+        marker=dict(symbol='diamond', size=np.where(critical, 16, 14), **risk_color, line=dict(**outline, width=np.where(critical, 2, 1)))
+    ))
+
+    today = today or pd.Timestamp.today()
+    fig.add_shape(type='line', x0=today, y0=-0.5, x1=today, y1=len(df)-0.5, line=dict(color='grey', width=2, dash='dash'))
+    fig.add_annotation(x=today, y=len(df)-0.5, text="Today", showarrow=False, xshift=10, yshift=10, font=dict(color="grey"))
+    fig.update_layout(
+        title=title, xaxis_title='Timeline', yaxis_title=None, barmode='overlay', height=min(len(df) * ROW_HEIGHT + 150, MAX_CHART_HEIGHT), showlegend=False,
+        yaxis=dict(autorange="reversed", tickfont=dict(size=12), type='category', categoryorder='array', categoryarray=pd.unique(labels)),
+        xaxis=dict(type='date', tickformat='%b %Y', gridcolor='LightGray'),
+        plot_bgcolor='white', margin=dict(l=10, r=10, t=50, b=50)
+    )
+    return fig
@@ -0,0 +1,289 @@
+# impact_graph.py
+"""Relationship graph across batches, quality records, risks, OpEx projects, CDMOs and programs.
+
+Each record becomes a node with a fixed integer code. Its links are stored as parallel NumPy arrays
+indexed by that code:
+- a batch: its CDMO, its program and its latest deviation ('Deviation ID');
+- a quality record: its CDMO and the batch it impacts ('Batch Impacted');
+- a risk: its CDMO, plus every project its 'Mitigation Strategy' names ('Project OpEx-003');
+- a project: its CDMO.
+A record also keeps the flags that queries filter on: open or closed, active batch, deviation.
+
+A query such as "open deviations and risks touching DM1 batches" or "batches exposed if a CDMO goes
+down" is a few boolean gathers over these arrays. That is O(records) NumPy work with no joins and no
+groupby, a few milliseconds over millions of rows. Risks and projects logged against a network-wide
+CDMO ('All') touch every CDMO.
+
+upsert() folds in changed records by their key. It updates the columns the frame carries and leaves
+the others alone, so a status change is cheap. A link to a record that has not been loaded yet
+(such as a deviation naming a batch outside the store) creates a placeholder node, which queries
+ignore until the record itself arrives. remove() drops records from query results. New IDs go into a
+small side table and are merged into the main index in bulk, so a trickle of new records never
+rebuilds an index over millions of IDs.
+"""
+import re
+import threading
+import numpy as np
+import pandas as pd
+from storage import NETWORK_WIDE_CDMOS
+
+PROJECT_REF = re.compile(r'OpEx-\d+')
+DONE_BATCH_STATUSES = ('Shipped', 'Failed')  # A CDMO outage no longer affects these.
+MERGE_EVERY = 10_000  # New IDs held in the side table before it is merged into the main index.
+
+# dataset -> (node kind, key column)
+SOURCES = {'schedule': ('batch', 'Batch ID'), 'quality': ('record', 'Record ID'), 'risk': ('risk', 'Risk ID'), 'opex': ('project', 'Project ID')}
+# Columns each dataset contributes to the graph.
+SOURCE_COLUMNS = {
+    'schedule': ['Batch ID', 'CDMO', 'Program', 'Status', 'Deviation ID'],
+    'quality': ['Record ID', 'CDMO', 'Type', 'Status', 'Batch Impacted'],
+    'risk': ['Risk ID', 'CDMO', 'Mitigation Strategy', 'Mitigation Status'],
+    'opex': ['Project ID', 'CDMO', 'Status'],
+}
+# node kind -> attribute -> (dtype, fill for placeholders)
+ATTRIBUTES = {
+    'batch': {'cdmo': (np.int32, -1), 'program': (np.int32, -1), 'deviation': (np.int32, -1), 'active': (bool, False)},
+    'record': {'cdmo': (np.int32, -1), 'batch': (np.int32, -1), 'type': (np.int32, -1), 'open': (bool, False)},
+    'risk': {'cdmo': (np.int32, -1), 'open': (bool, False)},
+    'project': {'cdmo': (np.int32, -1), 'open': (bool, False)},
+}
+IMPACT_KINDS = ('batch', 'record', 'risk', 'project')
+
+def _values(series):
+    return series.to_numpy(dtype=object, na_value=None)
+
+def _gather(mask, codes):
+    """mask[codes], False where a code is -1 (no link)."""
+    return np.append(mask, False)[codes]
+
+class _Labels:
+    """Append-only label -> code map for CDMOs, programs and record types."""
+
+    def __init__(self):
+        self.names = pd.Index([], dtype=object)
+
+    def codes(self, values, add=True):
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):  # Typed columns (see schema.py): map the categories only.
+            return np.append(self.codes(values.cat.categories, add), -1).astype(np.int32)[values.cat.codes.to_numpy()]
+        values = np.asarray(values, dtype=object)
+        present = pd.notna(values)
+        if add:
+            new = pd.Index(pd.unique(values[present]), dtype=object).difference(self.names)
+            if len(new):
+                self.names = pd.Index(np.concatenate([self.names.to_numpy(), new.to_numpy()]), dtype=object)
+        codes = np.full(len(values), -1, dtype=np.int32)
+        codes[present] = self.names.get_indexer(values[present])
+        return codes
+
+    def mask(self, names):
+        """Boolean table over the codes, True for the given labels."""
+        mask = np.zeros(len(self.names), dtype=bool)
+        codes = self.codes([names] if isinstance(names, str) else list(names), add=False)
+        mask[codes[codes >= 0]] = True
+        return mask
+
+class _Nodes:
+    """IDs of one node kind, their codes and per-node attribute arrays."""
+
+    def __init__(self, attributes):
+        self._values = np.array([], dtype=object)  # IDs with codes 0 .. len(_values) - 1, and their index
+        self._index = pd.Index(self._values, dtype=object)
+        self._recent = {}  # ID -> code for IDs added since the last merge
+        self._recent_ids = []
+        self.attributes = {name: np.full(0, fill, dtype=dtype) for name, (dtype, fill) in attributes.items()}
+        self._fills = {name: fill for name, (_, fill) in attributes.items()}
+        self.live = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.live)
+
+    def ids(self, codes):
+        n_base = len(self._values)
+        out = np.empty(len(codes), dtype=object)
+        base = codes < n_base
+        out[base] = self._values[codes[base]]
+        out[~base] = [self._recent_ids[c - n_base] for c in codes[~base]]
+        return out
+
+    def codes(self, ids, add=True):
+        """Codes of the IDs (-1 for missing values); unknown IDs are added as placeholders unless add is False."""
+        ids = np.asarray(ids, dtype=object)
+        codes = np.full(len(ids), -1, dtype=np.int64)
+        present = np.flatnonzero(pd.notna(ids))
+        codes[present] = self._index.get_indexer(ids[present]) if len(self._values) else -1
+        missing = present[codes[present] < 0]
+        if len(missing) and self._recent:
+            codes[missing] = [self._recent.get(i, -1) for i in ids[missing]]
+            missing = missing[codes[missing] < 0]
+        if add and len(missing):
+            inverse, new = pd.factorize(ids[missing])
+            start = len(self)
+            codes[missing] = start + inverse
+            for name, values in self.attributes.items():
+                self.attributes[name] = np.concatenate([values, np.full(len(new), self._fills[name], dtype=values.dtype)])
+            self.live = np.concatenate([self.live, np.zeros(len(new), dtype=bool)])
+            if len(self._recent_ids) + len(new) > MERGE_EVERY:  # A bulk load, or a full side table: one index rebuild.
+                self._values = np.concatenate([self._values, np.array(self._recent_ids, dtype=object), np.asarray(new, dtype=object)])
+                self._index = pd.Index(self._values, dtype=object)
+                self._index.get_indexer(self._values[:1])  # Builds the hash table now rather than on the next lookup.
+                self._recent, self._recent_ids = {}, []
+            else:
+                self._recent_ids.extend(new.tolist())
+                self._recent.update(zip(new.tolist(), range(start, start + len(new))))
+        return codes
+
+class ImpactGraph:
+    """Thread-safe entity graph; query results are IDs per node kind."""
+
+    def __init__(self):
+        self.nodes = {kind: _Nodes(attributes) for kind, attributes in ATTRIBUTES.items()}
+        self.labels = {'cdmo': _Labels(), 'program': _Labels(), 'type': _Labels()}
+        self._mitigations = (np.array([], dtype=np.int64), np.array([], dtype=np.int64))  # (risk code, project code) pairs
+        self._lock = threading.Lock()
+        self.version = 0
+        self.synced = {}  # Source -> version last folded in (kept by the caller, see data_access.get_impact_graph).
+
+    @classmethod
+    def from_frames(cls, **datasets):
+        """Graph over the given SOURCES frames, e.g. from_frames(schedule=..., quality=..., risk=..., opex=...)."""
+        graph = cls()
+        for dataset, df in datasets.items():
+            graph.upsert(dataset, df)
+        return graph
+
+    def __len__(self):
+        return sum(int(nodes.live.sum()) for nodes in self.nodes.values())
+
+    # --- Updates ---
+    def _links(self, dataset, df):
+        """attribute -> new values for the columns df carries."""
+        cdmo, links = self.labels['cdmo'], {}
+        if 'CDMO' in df:
+            links['cdmo'] = cdmo.codes(df['CDMO'])
+        if dataset == 'schedule':
+            if 'Program' in df:
+                links['program'] = self.labels['program'].codes(df['Program'])
+            if 'Status' in df:
+                links['active'] = ~df['Status'].isin(DONE_BATCH_STATUSES).to_numpy(dtype=bool)
+            if 'Deviation ID' in df:
+                links['deviation'] = self.nodes['record'].codes(_values(df['Deviation ID']))
+        elif dataset == 'quality':
+            if 'Batch Impacted' in df:
+                links['batch'] = self.nodes['batch'].codes(_values(df['Batch Impacted']))
+            if 'Type' in df:
+                links['type'] = self.labels['type'].codes(df['Type'])
+            if 'Status' in df:
+                links['open'] = (df['Status'] != 'Closed').to_numpy(dtype=bool)
+        elif dataset == 'risk' and 'Mitigation Status' in df:
+            links['open'] = (df['Mitigation Status'] != 'Complete').to_numpy(dtype=bool)
+        elif dataset == 'opex' and 'Status' in df:
+            links['open'] = (df['Status'] != 'Complete').to_numpy(dtype=bool)
+        return links
+
+    def upsert(self, dataset, df):
+        """Adds or updates records of a SOURCES dataset by key; only the columns df carries change. Returns how many."""
+        kind, key = SOURCES[dataset]
+        if key not in df:
+            raise ValueError(f"{dataset} records need a '{key}' column.")
+        df = df[df[key].notna()].drop_duplicates(key, keep='last').reset_index(drop=True)
+        if df.empty:
+            return 0
+        with self._lock:
+            nodes = self.nodes[kind]
+            codes = nodes.codes(_values(df[key]))
+            for name, values in self._links(dataset, df).items():
+                nodes.attributes[name][codes] = values
+            nodes.live[codes] = True
+            if dataset == 'risk' and 'Mitigation Strategy' in df:
+                refs = df['Mitigation Strategy'].str.findall(PROJECT_REF).explode().dropna()
+                risks, projects = self._mitigations
+                keep = ~np.isin(risks, codes)
+                self._mitigations = (np.concatenate([risks[keep], codes[refs.index.to_numpy(dtype=np.int64)]]),
+                                     np.concatenate([projects[keep], self.nodes['project'].codes(refs.to_numpy(dtype=object))]))
+            self.version += 1
+        return len(df)
+
+    def upsert_cells(self, dataset, cells):
+        """upsert() from {key: {column: value}} (the edit journal's form); columns a record did not edit keep their values."""
+        _, key = SOURCES[dataset]
+        by_column = {}
+        for record, columns in cells.items():
+            for column, value in columns.items():
+                if column in SOURCE_COLUMNS[dataset] and column != key:
+                    by_column.setdefault(column, {})[record] = value
+        return sum(self.upsert(dataset, pd.DataFrame({key: list(values), column: list(values.values())})) for column, values in by_column.items())
+
+    def remove(self, dataset, ids):
+        """Drops records from query results (links to them stay, as to any placeholder); returns how many were live."""
+        kind, _ = SOURCES[dataset]
+        with self._lock:
+            nodes = self.nodes[kind]
+            codes = nodes.codes(ids, add=False)
+            codes = codes[codes >= 0]
+            removed = int(nodes.live[codes].sum())
+            nodes.live[codes] = False
+            if removed:
+                self.version += 1
+        return removed
+
+    # --- Queries ---
+    def _batch_mask(self, cdmo=None, program=None, batch_ids=None, active_only=False):
+        batches = self.nodes['batch']
+        mask = batches.live.copy()
+        if cdmo is not None:
+            mask &= _gather(self.labels['cdmo'].mask(cdmo), batches.attributes['cdmo'])
+        if program is not None:
+            mask &= _gather(self.labels['program'].mask(program), batches.attributes['program'])
+        if batch_ids is not None:
+            selected = np.zeros(len(batches), dtype=bool)
+            codes = batches.codes(list(batch_ids), add=False)
+            selected[codes[codes >= 0]] = True
+            mask &= selected
+        if active_only:
+            mask &= batches.attributes['active']
+        return mask
+
+    def impact(self, cdmo=None, program=None, batch_ids=None, active_only=False, open_only=True, record_type=None):
+        """IDs of the selected batches and of everything linked to them, per IMPACT_KINDS.
+
+        Batches are selected by CDMO(s), program(s) and/or IDs (all given filters apply). The result holds:
+        - the quality records impacting those batches, or named as their deviation;
+        - the risks at the CDMOs running them, network-wide risks included;
+        - the OpEx projects those risks' mitigations reference.
+        open_only keeps open records, risks and projects, and record_type one type of quality record.
+        The 'cdmo' and 'program' entries name the CDMOs and programs of the selected batches.
+        """
+        with self._lock:
+            batch = self._batch_mask(cdmo, program, batch_ids, active_only)
+            batches, records, risks, projects = (self.nodes[kind] for kind in IMPACT_KINDS)
+            record = _gather(batch, records.attributes['batch'])
+            record[batches.attributes['deviation'][batch & (batches.attributes['deviation'] >= 0)]] = True
+            record &= records.live
+            if record_type is not None:
+                record &= _gather(self.labels['type'].mask(record_type), records.attributes['type'])
+            cdmos = np.zeros(len(self.labels['cdmo'].names), dtype=bool)
+            cdmos[batches.attributes['cdmo'][batch & (batches.attributes['cdmo'] >= 0)]] = True
+            if cdmos.any():
+                cdmos |= self.labels['cdmo'].mask(NETWORK_WIDE_CDMOS)
+            risk = _gather(cdmos, risks.attributes['cdmo']) & risks.live
+            if open_only:
+                record &= records.attributes['open']
+                risk &= risks.attributes['open']
+            risk_codes, project_codes = self._mitigations
+            project = np.zeros(len(projects), dtype=bool)
+            project[project_codes[risk[risk_codes]]] = True
+            project &= projects.live
+            if open_only:
+                project &= projects.attributes['open']
+            programs = np.unique(batches.attributes['program'][batch])
+            result = {kind: self.nodes[kind].ids(np.flatnonzero(mask)) for kind, mask in zip(IMPACT_KINDS, (batch, record, risk, project))}
+            result['cdmo'] = self.labels['cdmo'].names.to_numpy()[np.flatnonzero(cdmos & ~self.labels['cdmo'].mask(NETWORK_WIDE_CDMOS))]
+            result['program'] = self.labels['program'].names.to_numpy()[programs[programs >= 0]]
+        return result
+
+    def exposure(self, cdmo, open_only=True):
+        """What an outage at the CDMO would touch: its active batches, their programs, open records, risks and projects."""
+        return self.impact(cdmo=cdmo, active_only=True, open_only=open_only)
+
+    def stats(self):
+        return {kind: int(nodes.live.sum()) for kind, nodes in self.nodes.items()} | {'mitigation links': len(self._mitigations[0])}
@@ -0,0 +1,42 @@
+# metrics.py
+"""Vectorized derived columns shared by the page scripts.
+
+Every function takes a whole frame and returns a Series (or scalar) computed on datetime64 and
+float arrays, replacing the row-wise DataFrame.apply(..., axis=1) loops the pages used before.
+See benchmarks/bench_metrics.py for throughput at 1M records.
+"""
+import numpy as np
+import pandas as pd
+
+def _datetime64(values):
+    """Returns values as datetime64 without a copy when they already are (date objects are converted once)."""
+    return values if pd.api.types.is_datetime64_any_dtype(values) else pd.to_datetime(values)
+
+def days_open(df, as_of=None):
+    """Days from 'Open Date' to 'Closed Date', or to as_of (default: today) for records still open."""
+    as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+    opened = _datetime64(df['Open Date'])
+    closed = _datetime64(df['Closed Date']).fillna(as_of)
+    return (closed - opened).dt.days
+
+def actual_finish(df):
+    """'Start Date' plus 'Actual Duration (Days)'; NaT while the actual duration is unknown."""
+    return _datetime64(df['Start Date']) + pd.to_timedelta(df['Actual Duration (Days)'], unit='D')
+
+def finish_variance_days(df, actual_finish_dates=None):
+    """Actual minus planned finish in days (0 for tasks without an actual finish yet)."""
+    actual_finish_dates = actual_finish(df) if actual_finish_dates is None else actual_finish_dates
+    return (actual_finish_dates - _datetime64(df['Finish Date'])).dt.days.fillna(0)
+
+def cycle_time_variance(df):
+    """Actual minus planned batch cycle time in days; NaN for batches that have not completed."""
+    return df['Actual Cycle Time (Days)'] - df['Planned Cycle Time (Days)']
+
+def right_first_time(df):
+    """Percentage of shipped batches that shipped without a deviation (100 when nothing has shipped)."""
+    shipped = (df['Status'] == 'Shipped').to_numpy()
+    n_shipped = shipped.sum()
+    if n_shipped == 0:
+        return 100.0
+    with_deviation = np.count_nonzero(shipped & df['Deviation ID'].notna().to_numpy())
+    return (1 - with_deviation / n_shipped) * 100
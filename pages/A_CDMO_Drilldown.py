@@ -4,19 +4,43 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils import (
-    generate_cdmo_data, generate_master_schedule, generate_spc_data, 
-    generate_quality_data, generate_risk_register, generate_cdmo_kpis, generate_cpk_data
+from data_access import (
+    load_cdmo_data, load_spc_analysis, get_scorecard, get_cycle_time_limits, get_cdmo_index,
+    get_quality_stream, get_edit_journal, record_edits, get_figure_cache, get_impact_graph
 )
-from datetime import date, datetime
+from spc import PARAMETER_SPECS, RULES as SPC_RULES
+from metrics import days_open
+from downsample import downsample, MAX_POINTS
+from datetime import date
+import uuid
+import perf
+import freshness
 
 st.set_page_config(page_title="CDMO Drilldown | Avidity", layout="wide")
+perf.begin("CDMO Drilldown")
+SPC_PARAMETERS = list(PARAMETER_SPECS)
 
-# --- Master Data Loading (once per page load) ---
-cdmo_master_df = generate_cdmo_data()
-schedule_master_df = generate_master_schedule()
-quality_master_df = generate_quality_data()
-risk_master_df = generate_risk_register()
+# --- Figure builders (served from the shared figure cache while their inputs are unchanged; see figure_cache.py) ---
+def cpk_figure(cpk_df):
+    fig = px.bar(cpk_df, x='Cpk Value', y='Parameter', orientation='h', title='Process Capability', text='Cpk Value')
+    fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
+    fig.add_vline(x=1.33, line_dash="dash", line_color="green", annotation_text="Target")
+    fig.add_vline(x=1.0, line_dash="dash", line_color="red")
+    fig.update_layout(height=400, yaxis_title=None, margin=dict(t=40, b=20))
+    return fig
+
+def pareto_figure(pareto_data):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=pareto_data['Category'], y=pareto_data['Count'], name='Count', marker_color='#003F87'))
+    fig.add_trace(go.Scatter(x=pareto_data['Category'], y=pareto_data['Cumulative %'], name='Cumulative %', yaxis='y2', line=dict(color='#F37021')))
+    fig.update_layout(height=400, title_text="Pareto Chart of Deviation Root Causes", yaxis2=dict(title='Cumulative %', overlaying='y', side='right', range=[0, 101]))
+    return fig
+
+# --- Master Data Loading (cached across reruns and sessions) ---
+cdmo_master_df = load_cdmo_data()
+cdmo_index = get_cdmo_index()
+quality_stream = get_quality_stream()
+figures = get_figure_cache()
 
 # --- Sidebar for CDMO Selection ---
 st.sidebar.title("CDMO Selection")
@@ -28,26 +52,37 @@ selected_cdmo = st.sidebar.selectbox(
 
 # --- Header ---
 st.title(f"Technical Drilldown: {selected_cdmo}")
-cdmo_details = cdmo_master_df[cdmo_master_df['CDMO Name'] == selected_cdmo].iloc[0]
+cdmo_details = cdmo_index.get('cdmo', selected_cdmo).iloc[0]
 st.markdown(f"**Location:** {cdmo_details['Location']} | **Expertise:** {cdmo_details['Expertise']}")
 st.divider()
 
 # --- DYNAMIC DATA GENERATION & FILTERING ---
-cdmo_schedule = schedule_master_df[schedule_master_df['CDMO'] == selected_cdmo]
-cdmo_risks = risk_master_df[risk_master_df['CDMO'].isin([selected_cdmo, 'All'])]
-cdmo_quality = quality_master_df[quality_master_df['CDMO'] == selected_cdmo].copy() # Use .copy() to avoid SettingWithCopyWarning
-kpi_df = generate_cdmo_kpis(selected_cdmo)
-cpk_df = generate_cpk_data(selected_cdmo)
-
-# --- START: FIX for KeyError ---
-# Dynamically calculate 'Days Open' for all records
+# Partition lookups on the prebuilt per-CDMO index; risks also include network-wide ('All') rows.
+with perf.span("Partition lookup"):
+    cdmo_schedule = cdmo_index.get('schedule', selected_cdmo)
+    cdmo_risks = cdmo_index.get('risk', selected_cdmo)
+    cdmo_quality = cdmo_index.get('quality', selected_cdmo)
+# Saved data editor cells (see edit_journal.py) are overlaid on the generated records.
+with perf.span("Apply saved edits"):
+    edit_journal = get_edit_journal()
+    cdmo_quality = edit_journal.apply('quality', cdmo_quality)
+    cdmo_risks = edit_journal.apply('risk', cdmo_risks)
+    if not cdmo_risks.empty:
+        cdmo_risks = cdmo_risks.assign(**{'Risk Score': cdmo_risks['Impact'] * cdmo_risks['Probability']})
+
+def save_edits(dataset, widget_key, keys):
+    """data_editor on_change: appends only the cells changed in this session to the edit journal."""
+    session = st.session_state.setdefault('editor_session', uuid.uuid4().hex)
+    record_edits(dataset, keys, st.session_state[widget_key]['edited_rows'], session)
+# Precomputed scorecards (see scorecard.py): switching CDMOs is a lookup, and the values match the home-page quadrant.
+scorecards = get_scorecard()
+kpi_df = scorecards.kpis(selected_cdmo)
+cpk_df = scorecards.cpk(selected_cdmo)
+
+# Dynamically calculate 'Days Open' for all records (dates are datetime64 from load time, see schema.py)
 if not cdmo_quality.empty:
-    cdmo_quality['Open Date'] = pd.to_datetime(cdmo_quality['Open Date'])
-    cdmo_quality['Days Open'] = cdmo_quality.apply(
-        lambda row: (datetime.now() - row['Open Date']).days if pd.isna(row['Closed Date']) else (pd.to_datetime(row['Closed Date']) - row['Open Date']).days,
-        axis=1
-    )
-# --- END: FIX for KeyError ---
+    with perf.span("Days open"):
+        cdmo_quality = cdmo_quality.assign(**{'Days Open': days_open(cdmo_quality)})
 
 # --- Tabbed Layout ---
 tab1, tab2, tab3, tab4 = st.tabs(["📈 Operational Performance", "🔬 Batch Deep Dive", "📋 Quality Systems", "🛡️ Continuity & Mitigation"])
@@ -59,30 +94,41 @@ with tab1:
     kpi_col1.metric("Latest On-Time Delivery", f"{kpi_df['On-Time Delivery (%)'].iloc[-1]:.1f}%")
     kpi_col2.metric("Latest Deviations per Batch", f"{kpi_df['Deviations per Batch'].iloc[-1]:.2f}")
     kpi_col3.metric("Batches in Production", cdmo_schedule[cdmo_schedule['Status'] == 'In Production'].shape[0])
+    st.caption(f"Scorecard snapshot {scorecards.version} · RFT {scorecards.summary.at[selected_cdmo, 'RFT (%)']:.1f}% · Quality score {scorecards.summary.at[selected_cdmo, 'Quality Score']:.1f}")
     st.divider()
     col_hist, col_spc = st.columns(2)
     with col_hist:
         st.subheader("Historical KPI Trends")
-        fig1 = go.Figure()
-        fig1.add_trace(go.Scatter(x=kpi_df['Quarter'], y=kpi_df['On-Time Delivery (%)'], name='On-Time Delivery (%)'))
-        fig1.add_trace(go.Scatter(x=kpi_df['Quarter'], y=kpi_df['Deviations per Batch'], name='Devs per Batch', yaxis='y2'))
-        fig1.update_layout(height=400, title="Quarterly Performance Trends", yaxis=dict(title='On-Time Delivery (%)'), yaxis2=dict(title='Deviations per Batch', overlaying='y', side='right'), legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-        st.plotly_chart(fig1, use_container_width=True)
+        with perf.span("KPI trend figure", 'figure'):
+            # Each series is downsampled on its own shape; short histories are drawn as is.
+            otd_plot, otd_elided = downsample(kpi_df, 'On-Time Delivery (%)')
+            dev_plot, dev_elided = downsample(kpi_df, 'Deviations per Batch')
+            fig1 = go.Figure()
+            fig1.add_trace(go.Scatter(x=otd_plot['Quarter'], y=otd_plot['On-Time Delivery (%)'], name='On-Time Delivery (%)'))
+            fig1.add_trace(go.Scatter(x=dev_plot['Quarter'], y=dev_plot['Deviations per Batch'], name='Devs per Batch', yaxis='y2'))
+            fig1.update_layout(height=400, title="Quarterly Performance Trends", yaxis=dict(title='On-Time Delivery (%)'), yaxis2=dict(title='Deviations per Batch', overlaying='y', side='right'), legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+        with perf.span("KPI trend figure", 'render'):
+            st.plotly_chart(fig1, use_container_width=True)
+        if otd_elided or dev_elided:
+            st.caption(f"{len(kpi_df):,} periods per series; {otd_elided + dev_elided:,} points elided by LTTB downsampling.")
     with col_spc:
         st.subheader("Cycle Time Performance (XmR Chart)")
-        completed_batches = cdmo_schedule.dropna(subset=['Actual Cycle Time (Days)'])
-        if not completed_batches.empty and len(completed_batches) > 1:
-            mean_ct = completed_batches['Actual Cycle Time (Days)'].mean()
-            mr = completed_batches['Actual Cycle Time (Days)'].diff().abs()
-            ucl = mean_ct + 2.66 * mr.mean()
-            lcl = mean_ct - 2.66 * mr.mean()
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=completed_batches['Batch ID'], y=completed_batches['Actual Cycle Time (Days)'], mode='lines+markers', name='Cycle Time'))
-            fig.add_hline(y=mean_ct, line_dash="dash", line_color="green", annotation_text=f"Mean: {mean_ct:.1f}d")
-            fig.add_hline(y=ucl, line_dash="dash", line_color="red", annotation_text="UCL")
-            fig.add_hline(y=lcl, line_dash="dash", line_color="red", annotation_text="LCL")
-            fig.update_layout(height=400, title="Process Stability: Batch Cycle Times", yaxis_title="Days", margin=dict(t=40, b=20))
-            st.plotly_chart(fig, use_container_width=True)
+        # Limits come from the shared running-statistics service (one series per CDMO x Product).
+        ct_products = sorted(cdmo_schedule['Product'].unique())
+        ct_product = st.selectbox("Product", ct_products, key='ct_product') if len(ct_products) > 1 else (ct_products[0] if ct_products else None)
+        completed_batches = cdmo_schedule[cdmo_schedule['Product'] == ct_product].dropna(subset=['Actual Cycle Time (Days)']).sort_values('End Date')
+        ct_limits = get_cycle_time_limits().limits((selected_cdmo, ct_product)) if ct_product else None
+        if ct_limits and ct_limits['Batches'] > 1:
+            mean_ct, ucl, lcl = ct_limits['Mean'], ct_limits['UCL'], ct_limits['LCL']
+            with perf.span("XmR figure", 'figure'):
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=completed_batches['Batch ID'], y=completed_batches['Actual Cycle Time (Days)'], mode='lines+markers', name='Cycle Time'))
+                fig.add_hline(y=mean_ct, line_dash="dash", line_color="green", annotation_text=f"Mean: {mean_ct:.1f}d")
+                fig.add_hline(y=ucl, line_dash="dash", line_color="red", annotation_text="UCL")
+                fig.add_hline(y=lcl, line_dash="dash", line_color="red", annotation_text="LCL")
+                fig.update_layout(height=400, title=f"Process Stability: {ct_product} Batch Cycle Times", yaxis_title="Days", margin=dict(t=40, b=20))
+            with perf.span("XmR figure", 'render'):
+                st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("At least two completed batches are needed to calculate control limits for cycle time.")
 
@@ -92,77 +138,110 @@ with tab2:
     with col_batch:
         st.subheader("Batch-Specific SPC Analysis")
         if not cdmo_schedule.empty:
-            selected_batch = st.selectbox("Select a Batch ID for SPC analysis", cdmo_schedule['Batch ID'])
+            # Every batch x parameter series of this CDMO is analyzed in one cached pass; picking a batch only filters.
+            spc_points, spc_summary = load_spc_analysis(cdmo_schedule['Batch ID'], SPC_PARAMETERS)
+            sel_col1, sel_col2 = st.columns(2)
+            selected_batch = sel_col1.selectbox("Select a Batch ID for SPC analysis", cdmo_schedule['Batch ID'])
+            selected_parameter = sel_col2.selectbox("Parameter", SPC_PARAMETERS)
             if selected_batch:
-                spc_data = generate_spc_data(selected_batch)
-                fig_spc = go.Figure()
-                fig_spc.add_trace(go.Scatter(x=spc_data['Measurement'], y=spc_data['Value'], mode='lines+markers', name='Value', line=dict(color='#003F87')))
-                fig_spc.add_trace(go.Scatter(x=spc_data['Measurement'], y=spc_data['UCL'], mode='lines', name='Control Limit', line=dict(color='orange', dash='dash')))
-                fig_spc.add_trace(go.Scatter(x=spc_data['Measurement'], y=spc_data['LCL'], mode='lines', showlegend=False, line=dict(color='orange', dash='dash')))
-                fig_spc.add_trace(go.Scatter(x=spc_data['Measurement'], y=spc_data['USL'], mode='lines', name='Spec Limit', line=dict(color='red')))
-                fig_spc.add_trace(go.Scatter(x=spc_data['Measurement'], y=spc_data['LSL'], mode='lines', showlegend=False, line=dict(color='red')))
-                oos = spc_data[(spc_data['Value'] > spc_data['USL']) | (spc_data['Value'] < spc_data['LSL'])]
-                if not oos.empty:
-                    fig_spc.add_trace(go.Scatter(x=oos['Measurement'], y=oos['Value'], mode='markers', marker=dict(color='red', size=12, symbol='x'), name='Out of Spec'))
-                fig_spc.update_layout(height=400, title_text=f"Control Chart for {selected_batch}", yaxis_title="Value", legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-                st.plotly_chart(fig_spc, use_container_width=True)
+                spc_data = spc_points[(spc_points['Batch ID'] == selected_batch) & (spc_points['Parameter'] == selected_parameter)]
+                if len(spc_data) > MAX_POINTS:
+                    # Long sensor series: narrowing the window redraws it from the full-resolution points.
+                    first, last = int(spc_data['Measurement'].iloc[0]), int(spc_data['Measurement'].iloc[-1])
+                    spc_window = st.slider("Measurement window", first, last, (first, last), key=f"spc_window_{selected_batch}_{selected_parameter}",
+                                           help=f"Windows of up to {MAX_POINTS:,} measurements are drawn point for point.")
+                    spc_data = spc_data[spc_data['Measurement'].between(*spc_window)]
+                with perf.span("SPC figure", 'figure'):
+                    rule_breaches = spc_data[spc_data['Rule Violations'] != '']
+                    spc_plot, spc_elided = downsample(spc_data, 'Value', 'Measurement', keep=spc_data['Out of Spec'].to_numpy() | (spc_data['Rule Violations'] != '').to_numpy())
+                    fig_spc = go.Figure()
+                    fig_spc.add_trace(go.Scatter(x=spc_plot['Measurement'], y=spc_plot['Value'], mode='lines+markers', name='Value', line=dict(color='#003F87')))
+                    fig_spc.add_trace(go.Scatter(x=spc_plot['Measurement'], y=spc_plot['UCL'], mode='lines', name='Control Limit', line=dict(color='orange', dash='dash')))
+                    fig_spc.add_trace(go.Scatter(x=spc_plot['Measurement'], y=spc_plot['LCL'], mode='lines', showlegend=False, line=dict(color='orange', dash='dash')))
+                    fig_spc.add_trace(go.Scatter(x=spc_plot['Measurement'], y=spc_plot['USL'], mode='lines', name='Spec Limit', line=dict(color='red')))
+                    fig_spc.add_trace(go.Scatter(x=spc_plot['Measurement'], y=spc_plot['LSL'], mode='lines', showlegend=False, line=dict(color='red')))
+                    plotted_breaches = spc_plot[spc_plot['Rule Violations'] != '']
+                    if not plotted_breaches.empty:
+                        fig_spc.add_trace(go.Scatter(x=plotted_breaches['Measurement'], y=plotted_breaches['Value'], mode='markers', marker=dict(color='rgba(0,0,0,0)', size=16, line=dict(color='orange', width=2)), name='Rule Violation', text=plotted_breaches['Rule Violations'], hovertemplate='%{text}<extra></extra>'))
+                    oos = spc_plot[spc_plot['Out of Spec']]
+                    if not oos.empty:
+                        fig_spc.add_trace(go.Scatter(x=oos['Measurement'], y=oos['Value'], mode='markers', marker=dict(color='red', size=12, symbol='x'), name='Out of Spec'))
+                    fig_spc.update_layout(height=400, title_text=f"Control Chart for {selected_batch}", yaxis_title=selected_parameter, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+                with perf.span("SPC figure", 'render'):
+                    st.plotly_chart(fig_spc, use_container_width=True)
+                if spc_elided:
+                    st.caption(f"Showing {len(spc_plot):,} of {len(spc_data):,} measurements: {spc_elided:,} elided by LTTB downsampling. "
+                               "Out-of-spec and rule-violating points are kept (sustained runs by their first and last point); narrow the window for full resolution.")
+                if not rule_breaches.empty:
+                    broken = sorted({code for codes in rule_breaches['Rule Violations'] for code in codes.split(', ')})
+                    st.warning("Run-rule breaches: " + "; ".join(f"**{code}** {SPC_RULES[code]}" for code in broken))
+            with st.expander("SPC Signal Summary: All Batches at This CDMO"):
+                st.dataframe(spc_summary.sort_values(['Rule Violations', 'Out of Spec Points'], ascending=False), use_container_width=True, hide_index=True, column_config={"Cpk": st.column_config.NumberColumn(format="%.2f"), "Mean": st.column_config.NumberColumn(format="%.3f")})
         else:
             st.info("No batches scheduled for this CDMO.")
     with col_cpk:
         st.subheader("Process Capability (Cpk)")
         st.info("Cpk > 1.33 is capable. Cpk < 1.0 is not capable.")
-        fig_cpk = px.bar(cpk_df, x='Cpk Value', y='Parameter', orientation='h', title='Process Capability', text='Cpk Value')
-        fig_cpk.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-        fig_cpk.add_vline(x=1.33, line_dash="dash", line_color="green", annotation_text="Target")
-        fig_cpk.add_vline(x=1.0, line_dash="dash", line_color="red")
-        fig_cpk.update_layout(height=400, yaxis_title=None, margin=dict(t=40, b=20))
-        st.plotly_chart(fig_cpk, use_container_width=True)
+        with perf.span("Cpk figure", 'figure'):
+            fig_cpk = figures.figure(cpk_figure, cpk_df)
+        with perf.span("Cpk figure", 'render'):
+            st.plotly_chart(fig_cpk, use_container_width=True)
 
 with tab3:
     st.header(f"Quality Systems Analysis for {selected_cdmo}")
     st.caption("Analyze quality event trends, root causes, and closure effectiveness.")
 
-    if cdmo_quality.empty:
+    with perf.span("Quality aggregates"):
+        quality_summary = quality_stream.summary(selected_cdmo)
+    if quality_summary['records'] == 0:
         st.success("No open quality records for this CDMO.")
     else:
-        q_kpi1, q_kpi2, q_kpi3 = st.columns(3)
-        open_records = cdmo_quality[cdmo_quality['Status'] != 'Closed']
-        q_kpi1.metric("Open Quality Records", len(open_records))
-        # This line will now work correctly
-        q_kpi2.metric("Avg. Days Open", f"{open_records['Days Open'].mean():.1f}")
-        critical_high = open_records[open_records['Priority'].isin(['Critical', 'High'])]
-        q_kpi3.metric("Open Critical/High Priority", len(critical_high), delta_color="inverse")
+        q_kpi1, q_kpi2, q_kpi3, q_kpi4 = st.columns(4)
+        ageing = quality_stream.ageing(selected_cdmo)
+        q_kpi1.metric("Open Quality Records", quality_summary['open'])
+        q_kpi2.metric("Avg. Days Open", f"{quality_summary['avg_days_open']:.1f}")
+        q_kpi3.metric("Open Critical/High Priority", quality_summary['open_escalated'], delta_color="inverse")
+        q_kpi4.metric("Open > 90 Days", int(ageing.iloc[-1]), delta_color="inverse")
+        if quality_stream.events or quality_stream.rejected:
+            st.caption(f"Includes {quality_stream.events:,} update(s) from the quality feed ({quality_stream.rejected:,} malformed line(s) skipped).")
         st.divider()
 
         q_col1, q_col2 = st.columns(2)
         with q_col1:
             st.subheader("Deviation Root Cause Analysis (Pareto)")
-            deviation_df = cdmo_quality[cdmo_quality['Type'] == 'Deviation'].dropna(subset=['Root Cause Category'])
-            if not deviation_df.empty:
-                pareto_data = deviation_df['Root Cause Category'].value_counts().reset_index()
-                pareto_data.columns = ['Category', 'Count']
-                pareto_data = pareto_data.sort_values(by='Count', ascending=False)
-                pareto_data['Cumulative %'] = (pareto_data['Count'].cumsum() / pareto_data['Count'].sum()) * 100
-                fig_pareto = go.Figure()
-                fig_pareto.add_trace(go.Bar(x=pareto_data['Category'], y=pareto_data['Count'], name='Count', marker_color='#003F87'))
-                fig_pareto.add_trace(go.Scatter(x=pareto_data['Category'], y=pareto_data['Cumulative %'], name='Cumulative %', yaxis='y2', line=dict(color='#F37021')))
-                fig_pareto.update_layout(height=400, title_text="Pareto Chart of Deviation Root Causes", yaxis2=dict(title='Cumulative %', overlaying='y', side='right', range=[0, 101]))
-                st.plotly_chart(fig_pareto, use_container_width=True)
+            pareto_data = quality_stream.pareto(selected_cdmo)
+            if not pareto_data.empty:
+                with perf.span("Pareto", 'figure'):
+                    fig_pareto = figures.figure(pareto_figure, pareto_data)
+                with perf.span("Pareto", 'render'):
+                    st.plotly_chart(fig_pareto, use_container_width=True)
             else:
                 st.info("No deviations with root cause data available.")
             with st.expander("Methodology: Pareto Analysis"):
                 st.markdown("A Pareto chart follows the 80/20 rule, showing that roughly 80% of problems ('Count') come from 20% of causes ('Category'). **Action:** Focus your continuous improvement efforts on the top 1-2 root causes to achieve the greatest impact on reducing deviations.")
         with q_col2:
             st.subheader("Monthly Quality Event Trend")
-            trend_data = cdmo_quality.copy()
-            trend_data['Month'] = pd.to_datetime(trend_data['Open Date']).dt.to_period('M').astype(str)
-            fig_trend = px.histogram(trend_data, x='Month', color='Type', title="Quality Records Opened Over Time", barmode='stack')
-            fig_trend.update_layout(height=400)
-            st.plotly_chart(fig_trend, use_container_width=True)
+            with perf.span("Quality trend figure", 'figure'):
+                trend_data = quality_stream.monthly(selected_cdmo)
+                opened = trend_data[trend_data['Type'] != 'Closed']
+                closed = trend_data[trend_data['Type'] == 'Closed']
+                fig_trend = px.bar(opened, x='Month', y='Records', color='Type', title="Quality Records Opened Over Time", barmode='stack')
+                fig_trend.add_trace(go.Scatter(x=closed['Month'], y=closed['Records'], name='Closed', mode='lines+markers', line=dict(color='#2ca02c')))
+                fig_trend.update_layout(height=400, yaxis_title="Records")
+            with perf.span("Quality trend figure", 'render'):
+                st.plotly_chart(fig_trend, use_container_width=True)
             with st.expander("Methodology: Trend Analysis"):
-                st.markdown("This chart tracks the number and type of new quality records opened each month. **Action:** A rising trend indicates deteriorating quality performance at the CDMO, while a falling trend shows improvement. Use this to assess the effectiveness of implemented CAPAs and improvement initiatives.")
+                st.markdown("This chart tracks the number and type of new quality records opened each month, with the number closed each month as a line. **Action:** A rising trend indicates deteriorating quality performance at the CDMO, while a falling trend shows improvement. Openings that persistently outpace closures mean the backlog is growing. Use this to assess the effectiveness of implemented CAPAs and improvement initiatives.")
+        st.subheader("Open Record Ageing")
+        fig_ageing = px.bar(ageing.rename_axis('Age').reset_index(), x='Age', y='Open Records', text='Open Records', color='Age',
+                            color_discrete_sequence=['#2ca02c', '#ffdd57', '#F37021', '#d62728'])
+        fig_ageing.update_layout(height=300, showlegend=False, xaxis_title=None, margin=dict(t=20, b=20))
+        st.plotly_chart(fig_ageing, use_container_width=True)
     with st.expander("View/Edit Detailed Quality Log"):
-        st.data_editor(cdmo_quality, use_container_width=True, hide_index=True)
+        quality_editor = f"quality_log_{selected_cdmo}"
+        st.data_editor(cdmo_quality, use_container_width=True, hide_index=True, disabled=['Record ID', 'CDMO', 'Days Open'], key=quality_editor,
+                       on_change=save_edits, args=('quality', quality_editor, cdmo_quality['Record ID'].to_numpy()))
+        st.caption("Edits are saved as you make them and are visible to every user on their next refresh.")
 
 with tab4:
     st.header("Business Continuity & Risk Mitigation")
@@ -173,14 +252,35 @@ with tab4:
     bcp_col1.metric("BCP Status", bcp_status)
     if pd.notna(bcp_last_reviewed):
         bcp_col2.metric("BCP Last Reviewed", bcp_last_reviewed.strftime('%Y-%m-%d'))
-        if (date.today() - bcp_last_reviewed).days > 365:
+        if (pd.Timestamp(date.today()) - bcp_last_reviewed).days > 365:
             st.warning("BCP review is overdue. Schedule a review with the CDMO.")
     else:
         bcp_col2.metric("BCP Last Reviewed", "N/A")
     st.divider()
+    st.subheader("Outage Exposure")
+    st.caption(f"What a shutdown at {selected_cdmo} would touch, followed through the impact graph (see impact_graph.py).")
+    with perf.span("Outage exposure"):
+        exposure = get_impact_graph().exposure(selected_cdmo)
+        exposed = cdmo_schedule[cdmo_schedule['Batch ID'].isin(exposure['batch'])]
+    exp_col1, exp_col2, exp_col3, exp_col4 = st.columns(4)
+    exp_col1.metric("Active Batches Exposed", f"{len(exposure['batch']):,}", help="Batches not yet shipped or failed.")
+    exp_col2.metric("Programs Affected", len(exposure['program']), help=", ".join(exposure['program']) or None)
+    exp_col3.metric("Open Quality Records", f"{len(exposure['record']):,}", help="Open deviations, CAPAs and change requests on the exposed batches.")
+    exp_col4.metric("Open Risks", f"{len(exposure['risk']):,}", help="Open risks logged for this CDMO or network-wide.")
+    if not exposed.empty:
+        st.dataframe(exposed[[c for c in ['Batch ID', 'Program', 'Product', 'Status', 'Start Date', 'End Date'] if c in exposed]].sort_values('End Date'), use_container_width=True, hide_index=True)
+    if len(exposure['project']):
+        st.caption(f"Mitigation projects in flight: {', '.join(exposure['project'])}")
+    st.divider()
     st.subheader("Interactive Risk Mitigation Register")
     st.caption("This register tracks all identified risks and their corresponding mitigation plans. Use it to drive risk reduction activities with the VPT.")
     if cdmo_risks.empty:
         st.success(f"No specific risks currently logged for {selected_cdmo}.")
     else:
-        st.data_editor(cdmo_risks, column_config={"Mitigation Status": st.column_config.SelectboxColumn("Status", options=['Planned', 'In Progress', 'Complete', 'On Hold'], required=True), "Risk Score": st.column_config.ProgressColumn("Score", min_value=0, max_value=25, format="%d")}, use_container_width=True, hide_index=True)
+        risk_editor = f"risk_register_{selected_cdmo}"
+        st.data_editor(cdmo_risks, column_config={"Mitigation Status": st.column_config.SelectboxColumn("Status", options=['Planned', 'In Progress', 'Complete', 'On Hold'], required=True), "Risk Score": st.column_config.ProgressColumn("Score", min_value=0, max_value=25, format="%d")}, use_container_width=True, hide_index=True,
+                       disabled=['Risk ID', 'CDMO', 'Risk Score'], key=risk_editor, on_change=save_edits, args=('risk', risk_editor, cdmo_risks['Risk ID'].to_numpy()))
+        st.caption("Edits are saved as you make them; the risk score updates from Impact x Probability.")
+
+freshness.panel()
+perf.panel()
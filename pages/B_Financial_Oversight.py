@@ -4,26 +4,50 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils import generate_budget_data, generate_master_schedule
+from data_access import FINANCIAL_SCHEDULE, get_spend_ledger, load_eac_forecast, load_master_schedule, get_figure_cache
+from eac_forecast import DEFAULT_SCENARIOS, MAX_DRAWS, SCENARIO_OPTIONS, scenario_options
+from trendlines import MAX_MARKERS, TREND_LABELS, add_trend, available_methods, bin_points
 from datetime import date
+import perf
+import freshness
 
 st.set_page_config(page_title="Financial Oversight | Avidity", layout="wide")
+perf.begin("Financial Oversight")
 st.title("💸 Financial & Performance Analytics")
 st.markdown("### Analyzing spend, forecasting, and operational efficiency across the CDMO network.")
 
+# --- Figure builders (served from the shared figure cache while their inputs are unchanged; see figure_cache.py) ---
+def waterfall_figure(total_budget, ytd_actuals, remaining_forecast, year_end_variance):
+    fig = go.Figure(go.Waterfall(
+        orientation="v", measure=["absolute", "relative", "relative", "total"],
+        x=["Annual Budget", "YTD Actuals", "Remaining Forecast", "Projected Year-End Variance"],
+        text=[f"${total_budget:.1f}M", f"-${ytd_actuals:.1f}M", f"-${remaining_forecast:.1f}M", f"${year_end_variance:.1f}M"],
+        y=[total_budget, -ytd_actuals, -remaining_forecast, year_end_variance],
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+        decreasing={"marker": {"color": "#F37021"}},
+        totals={"marker": {"color": "#003F87" if year_end_variance >= 0 else "#DA291C"}}
+    ))
+    fig.update_layout(title="Projected Year-End Financial Position", yaxis_title="Amount ($M)", height=450)
+    return fig
+
 # --- Data Loading and Prep ---
-budget_df = generate_budget_data()
-schedule_df = generate_master_schedule()
+ledger = get_spend_ledger()
+schedule_df = load_master_schedule(columns=FINANCIAL_SCHEDULE)
 today = date.today()
-time_elapsed_pct = (today.month -1) / 12 + today.day / (30*12) # Approximate % of year elapsed
+years = ledger.years()
+fiscal_year = st.selectbox("Fiscal Year", years, index=len(years) - 1)
+time_elapsed_pct = 1.0 if fiscal_year < today.year else (today.month -1) / 12 + today.day / (30*12) # Approximate % of year elapsed
 
 # --- Strategic Financial KPIs ---
 st.header("Portfolio Financial Health")
-total_budget = budget_df['Annual Budget ($M)'].sum()
-total_actuals = budget_df['YTD Actuals ($M)'].sum()
-total_eac = budget_df['Estimate at Completion ($M)'].sum()
-spend_rate_pct = (total_actuals / total_budget) * 100
-avg_cost_per_batch = schedule_df['Cost per Batch ($K)'].mean()
+with perf.span("KPI block"):
+    # Totals come from the ledger's rollup cube (one row per CDMO x Program x Category), not the raw lines.
+    position = ledger.position(fiscal_year)
+    total_budget = position['Annual Budget ($M)'].sum()
+    total_actuals = position['YTD Actuals ($M)'].sum()
+    total_eac = position['Estimate at Completion ($M)'].sum()
+    spend_rate_pct = (total_actuals / total_budget) * 100
+    avg_cost_per_batch = schedule_df['Cost per Batch ($K)'].mean()
 
 kpi1, kpi2, kpi3, kpi4 = st.columns(4)
 kpi1.metric("Annual Budget", f"${total_budget:.1f}M")
@@ -38,50 +62,84 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Forecasted Year-End Variance (Waterfall)")
-    remaining_forecast = budget_df['Remaining Forecast ($M)'].sum()
-    ytd_actuals = budget_df['YTD Actuals ($M)'].sum()
-    year_end_variance = total_budget - total_eac
-    
-    fig_waterfall = go.Figure(go.Waterfall(
-        orientation="v", measure=["absolute", "relative", "relative", "total"],
-        x=["Annual Budget", "YTD Actuals", "Remaining Forecast", "Projected Year-End Variance"],
-        text=[f"${total_budget:.1f}M", f"-${ytd_actuals:.1f}M", f"-${remaining_forecast:.1f}M", f"${year_end_variance:.1f}M"],
-        y=[total_budget, -ytd_actuals, -remaining_forecast, year_end_variance],
-        connector={"line": {"color": "rgb(63, 63, 63)"}},
-        decreasing={"marker": {"color": "#F37021"}},
-        totals={"marker": {"color": "#003F87" if year_end_variance >= 0 else "#DA291C"}}
-    ))
-    fig_waterfall.update_layout(title="Projected Year-End Financial Position", yaxis_title="Amount ($M)", height=450)
-    st.plotly_chart(fig_waterfall, use_container_width=True)
+    with perf.span("Waterfall", 'figure'):
+        remaining_forecast = position['Remaining Forecast ($M)'].sum()
+        fig_waterfall = get_figure_cache().figure(waterfall_figure, total_budget, total_actuals, remaining_forecast, total_budget - total_eac)
+    with perf.span("Waterfall", 'render'):
+        st.plotly_chart(fig_waterfall, use_container_width=True)
     
     with st.expander("Methodology: Variance Waterfall"):
-        st.markdown("This chart shows how the budget is consumed to project the final year-end variance. It starts with the total budget, subtracts money already spent (Actuals), then subtracts money forecasted to be spent, arriving at the final projected surplus or deficit. **Action:** A projected deficit (red total) requires immediate action, such as deferring projects or seeking additional funding.")
+        st.markdown("This chart shows how the budget is consumed to project the final year-end variance. It starts with the total budget, subtracts money already spent (Actuals), then subtracts money forecasted to be spent (the plan for quarters not yet closed, plus whatever of the current quarter's plan has not been invoiced), arriving at the final projected surplus or deficit. **Action:** A projected deficit (red total) requires immediate action, such as deferring projects or seeking additional funding.")
 
 with col2:
     st.subheader("Quarterly Spend vs. Plan")
-    q_data = budget_df.melt(
-        id_vars=['CDMO'], 
-        value_vars=['Q1 Actuals ($M)', 'Q2 Actuals ($M)', 'Q3 Plan ($M)', 'Q4 Plan ($M)'],
-        var_name='Quarter', value_name='Amount ($M)'
-    )
-    q_data['Type'] = q_data['Quarter'].apply(lambda x: 'Actual' if 'Actuals' in x else 'Plan')
-    q_data['Quarter'] = q_data['Quarter'].str.extract(r'(Q\d)')
-    
-    fig_q = px.bar(q_data, x='Quarter', y='Amount ($M)', color='Type', barmode='group', title="Quarterly Spend Cadence", color_discrete_map={'Actual':'#003F87', 'Plan':'#BDBDBD'})
-    fig_q.update_layout(height=450, yaxis_title="Amount ($M)")
-    st.plotly_chart(fig_q, use_container_width=True)
+    with perf.span("Quarterly spend figure", 'figure'):
+        q_data = ledger.quarterly(fiscal_year)
+        fig_q = px.bar(q_data, x='Quarter', y='Amount ($M)', color='Type', barmode='group', title="Quarterly Spend Cadence", color_discrete_map={'Actual':'#003F87', 'Plan':'#BDBDBD'})
+        fig_q.update_layout(height=450, yaxis_title="Amount ($M)")
+    with perf.span("Quarterly spend figure", 'render'):
+        st.plotly_chart(fig_q, use_container_width=True)
 
     with st.expander("Methodology: Spend Cadence"):
-        st.markdown("This chart compares the planned spending cadence against actuals for each quarter. **Action:** Significant deviations from the plan (e.g., spending much more in Q2 than planned) can signal accelerated projects or cost overruns, while spending less can signal delays. This helps refine the accuracy of future financial forecasting.")
+        st.markdown("This chart compares the planned spending cadence against actuals (posted invoices) for each quarter of the selected fiscal year. **Action:** Significant deviations from the plan (e.g., spending much more in Q2 than planned) can signal accelerated projects or cost overruns, while spending less can signal delays. This helps refine the accuracy of future financial forecasting.")
+
+st.subheader("Probabilistic Estimate at Completion")
+# Larger networks are offered fewer scenarios, so every slider step recomputes well under a second (see eac_forecast.py).
+n_partners = position['CDMO'].nunique()
+scenario_choices = scenario_options(n_partners)
+if len(scenario_choices) > 1:
+    scenarios = st.select_slider("Monte Carlo scenarios", options=scenario_choices, value=min(DEFAULT_SCENARIOS, max(scenario_choices)), format_func=lambda n: f"{n:,}")
+else:
+    scenarios = scenario_choices[0]
+eac_df = load_eac_forecast(fiscal_year, scenarios)
+if eac_df.empty:
+    st.info("No ledger lines for this fiscal year.")
+else:
+    network = eac_df.iloc[-1]
+    partners = eac_df.iloc[:-1]
+    m1, m2, m3 = st.columns(3)
+    m1.metric("P50 EAC", f"${network['EAC P50 ($M)']:.1f}M", delta=f"${network['EAC P50 ($M)'] - network['Annual Budget ($M)']:.1f}M vs Budget", delta_color="inverse")
+    m2.metric("P10 - P90 Range", f"${network['EAC P10 ($M)']:.1f}M - ${network['EAC P90 ($M)']:.1f}M")
+    m3.metric("Probability of Budget Overrun", f"{network['Overrun Probability']:.0%}")
+    with perf.span("EAC range figure", 'figure'):
+        # Partners most likely to overrun first; the chart keeps the top 20 for legibility.
+        top = partners.sort_values(['Overrun Probability', 'EAC P90 ($M)'], ascending=False).head(20).iloc[::-1]
+        fig_eac = go.Figure([
+            go.Bar(y=top['CDMO'], x=top['EAC P90 ($M)'] - top['EAC P10 ($M)'], base=top['EAC P10 ($M)'], orientation='h', name='P10 - P90',
+                   marker_color='#BDBDBD', customdata=top['Overrun Probability'], hovertemplate="%{y}: $%{base:.1f}M - $%{x:.1f}M wide<br>Overrun probability %{customdata:.0%}<extra></extra>"),
+            go.Scatter(y=top['CDMO'], x=top['EAC P50 ($M)'], mode='markers', name='P50', marker=dict(color='#003F87', size=10)),
+            go.Scatter(y=top['CDMO'], x=top['Annual Budget ($M)'], mode='markers', name='Budget', marker=dict(color='#DA291C', symbol='line-ns-open', size=16, line_width=3)),
+        ])
+        fig_eac.update_layout(title="Simulated EAC Range vs. Budget by CDMO", xaxis_title="Amount ($M)", height=max(400, 28 * len(top)), legend=dict(orientation="h"))
+    with perf.span("EAC range figure", 'render'):
+        st.plotly_chart(fig_eac, use_container_width=True)
+    if len(partners) > len(top):
+        st.caption(f"Showing the {len(top)} of {len(partners)} CDMOs most likely to overrun their budget.")
+    capped = f" Runs above {MAX_DRAWS:,} scenario x CDMO draws are not offered for {n_partners} CDMOs." if len(scenario_choices) < len(SCENARIO_OPTIONS) else ""
+    st.caption(f"{scenarios:,} scenarios simulated in {eac_df.attrs.get('seconds', 0.0):.2f}s.{capped}")
+
+with st.expander("Methodology: Monte Carlo EAC"):
+    st.markdown("The point EAC above adds the remaining plan to actuals as if the plan will be hit exactly. Here each scenario instead scales every CDMO's remaining forecast by a plan-vs-actual factor drawn from how its closed quarters actually landed against plan (pooled with the network when a partner has little history). It then adds the cost of remaking failed batches: failures among the partner's open batches this year are drawn at its historical failure rate from the master schedule and costed at its average batch cost. P10 / P50 / P90 are the 10th, 50th and 90th percentiles of the simulated year-end spend; the overrun probability is the share of scenarios ending above budget. **Action:** A partner whose budget line sits left of its P50 marker is more likely than not to overrun; a wide bar signals volatile spend that warrants a tighter forecast review.")
 
 st.subheader("Cost Efficiency Analysis")
-cost_df = schedule_df[schedule_df['Status'].isin(['Shipped', 'Awaiting Release', 'Failed'])].copy()
-cost_df['Finish Date'] = pd.to_datetime(cost_df['End Date'])
-fig_cost = px.scatter(
-    cost_df, x='Finish Date', y='Cost per Batch ($K)', color='Program', size='Yield (%)',
-    title="Cost Per Batch vs. Yield Over Time", trendline="ols", trendline_scope="overall"
-)
-st.plotly_chart(fig_cost, use_container_width=True)
+trend_method = st.selectbox("Trendline", available_methods(), format_func=TREND_LABELS.get, help="The statsmodels-based confidence band is loaded only when selected.")
+with perf.span("Cost efficiency figure", 'figure'):
+    cost_df = schedule_df[schedule_df['Status'].isin(['Shipped', 'Awaiting Release', 'Failed'])].rename(columns={'End Date': 'Finish Date'})
+    # Long batch histories are sent as per-program time-bin summaries; the trend is still fitted on every batch.
+    binned = len(cost_df) > MAX_MARKERS
+    plot_df = bin_points(cost_df, 'Finish Date', 'Cost per Batch ($K)', by='Program', extra=['Yield (%)']) if binned else cost_df
+    fig_cost = px.scatter(
+        plot_df, x='Finish Date', y='Cost per Batch ($K)', color='Program', size='Yield (%)',
+        title="Cost Per Batch vs. Yield Over Time", hover_data=['Points', 'Min', 'Max'] if binned else None
+    )
+    add_trend(fig_cost, cost_df['Finish Date'], cost_df['Cost per Batch ($K)'], trend_method)
+with perf.span("Cost efficiency figure", 'render'):
+    st.plotly_chart(fig_cost, use_container_width=True)
+if binned:
+    st.caption(f"{len(cost_df):,} completed batches summarized into {len(plot_df):,} time-bin markers (mean cost per program and bin).")
 
 with st.expander("Methodology: Efficiency Analysis"):
-    st.markdown("This chart plots the cost of each completed batch against its final yield. The size of the bubble represents the yield, providing a multi-dimensional view of efficiency. The black dashed line is an Ordinary Least Squares (OLS) trendline showing the overall cost trend. **Action:** A rising trendline indicates decreasing cost efficiency over time, requiring investigation. High-cost, low-yield batches (bottom left) should be analyzed as case studies for process improvement.")
+    st.markdown("This chart plots the cost of each completed batch against its final yield. The size of the bubble represents the yield, providing a multi-dimensional view of efficiency. The black dashed line is the selected trend across all programs: a straight Ordinary Least Squares (OLS) fit by default, or a rolling mean / LOWESS curve to expose changes in direction. **Action:** A rising trendline indicates decreasing cost efficiency over time, requiring investigation. High-cost, low-yield batches (bottom left) should be analyzed as case studies for process improvement.")
+
+freshness.panel()
+perf.panel()
@@ -2,73 +2,81 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from utils import generate_tech_transfer_data
-from datetime import datetime, timedelta
+from data_access import get_critical_path, load_tech_transfer_data
+from metrics import actual_finish, finish_variance_days
+from gantt import RISK_COLORS, WEBGL_THRESHOLD, build_gantt, collapse_phases, task_phases
+from datetime import datetime
+import perf
+import freshness
 
 st.set_page_config(page_title="Tech Transfer Hub | Avidity", layout="wide")
+perf.begin("Tech Transfer Hub")
 st.title("🚀 Technology Transfer Hub")
 st.markdown("### Managing the end-to-end transfer of Avidity's AOC processes to new CDMO facilities.")
 
 # --- Data Preparation ---
-df = generate_tech_transfer_data()
-df['Actual Finish Date'] = df.apply(
-    lambda row: row['Start Date'] + timedelta(days=row['Actual Duration (Days)']) if pd.notna(row['Actual Duration (Days)']) else pd.NaT,
-    axis=1
-)
-df['Variance (Days)'] = (df['Actual Finish Date'] - df['Finish Date']).dt.days.fillna(0)
+# Derived columns are added to this session's view only; the loaded frame is shared (see data_access.py).
+df = load_tech_transfer_data()
+with perf.span("Finish variance"):
+    finish = actual_finish(df)
+    df = df.assign(**{'Actual Finish Date': finish, 'Variance (Days)': finish_variance_days(df, finish)})
+with perf.span("Critical path"):
+    cpm = get_critical_path()
+    df = df.assign(Critical=pd.Series(cpm.critical, index=cpm.task_ids).reindex(df['Task ID']).fillna(False).to_numpy(dtype=bool))
 
 # --- KPIs ---
 st.header("Project Health: AOC-1044 Transfer to Lonza")
 total_duration = df['Planned Duration (Days)'].sum()
-project_finish_date = max(df['Actual Finish Date'].max(), df['Finish Date'].max())
-schedule_variance = (project_finish_date - df['Finish Date'].max()).days
+# Only slips that push the critical path out move the forecast finish (see critical_path.py).
+schedule_variance = (cpm.finish - cpm.planned_finish).days
 completed_tasks = df['Progress (%)'].eq(100).sum()
 total_tasks = len(df)
 
-kpi1, kpi2, kpi3 = st.columns(3)
+kpi1, kpi2, kpi3, kpi4 = st.columns(4)
 kpi1.metric("Overall Schedule Variance", f"{schedule_variance} Days", delta=f"{schedule_variance} Days vs Plan", delta_color="inverse")
 kpi2.metric("Task Completion", f"{completed_tasks} / {total_tasks}", f"{completed_tasks/total_tasks:.0%} Complete")
 kpi3.metric("Planned Duration", f"{total_duration} Days")
+kpi4.metric("Critical Path", f"{int(df['Critical'].sum())} Tasks", f"Forecast finish {cpm.finish:%b %d, %Y}", delta_color="off")
 st.divider()
 
 # --- Custom Gantt Chart ---
 st.header("Interactive Project Gantt Chart")
-risk_colors = {'High': '#DC3912', 'Medium': '#FF9900', 'Low': '#109618'}
+risk_colors = RISK_COLORS
 
 st.write(f"""
 **Legend:** Task bar and milestone diamond (<span style="color:black;">♦</span>) colors indicate risk level:  
 <span style="background-color:{risk_colors['High']}; padding: 2px 10px; border-radius: 5px; color: white;">High Risk</span>  
 <span style="background-color:{risk_colors['Medium']}; padding: 2px 10px; border_radius: 5px; color: white;">Medium Risk</span>  
-<span style="background-color:{risk_colors['Low']}; padding: 2px 10px; border_radius: 5px; color: white;">Low Risk</span>
+<span style="background-color:{risk_colors['Low']}; padding: 2px 10px; border_radius: 5px; color: white;">Low Risk</span>  
+Critical-path tasks are outlined in black.
 """, unsafe_allow_html=True)
 
-fig = go.Figure()
-
-for i, task in df.iterrows():
-    fig.add_trace(go.Bar(x=[task['Planned Duration (Days)']], y=[task['Task']], orientation='h', base=[task['Start Date']], marker_color='#E0E0E0', hoverinfo='none', showlegend=False))
-    progress_duration = task['Planned Duration (Days)'] * (task['Progress (%)'] / 100)
-    fig.add_trace(go.Bar(
-        x=[progress_duration], y=[task['Task']], orientation='h', base=[task['Start Date']], marker_color=risk_colors[task['Risk Level']],
-        text=f"{task['Progress (%)']}%", textposition='inside', insidetextanchor='middle', showlegend=False,
-        hovertext=(f"<b>{task['Task']}</b><br>Lead Team: {task['Lead Team']}<br>Risk: {task['Risk Level']}<br>Status: {task['Progress (%)']}% Complete<br>Planned: {task['Start Date'].strftime('%b %d')} - {task['Finish Date'].strftime('%b %d')} ({task['Planned Duration (Days)']}d)<br>Variance: {task['Variance (Days)']:+.0f}d"),
-        hoverinfo='text'
-    ))
-
-milestone_colors = df['Risk Level'].map(risk_colors).tolist()
-fig.add_trace(go.Scatter(x=df['Finish Date'], y=df['Task'], mode='markers', marker=dict(symbol='diamond', size=14, color=milestone_colors, line=dict(width=1, color='DarkSlateGray')), name='Planned Finish', hoverinfo='none', showlegend=False))
-
-today = datetime.today()
-fig.add_shape(type='line', x0=today, y0=-0.5, x1=today, y1=len(df)-0.5, line=dict(color='grey', width=2, dash='dash'))
-fig.add_annotation(x=today, y=len(df)-0.5, text="Today", showarrow=False, xshift=10, yshift=10, font=dict(color="grey"))
-
-chart_height = len(df) * 40 + 150
-fig.update_layout(
-    title='Tech Transfer Project Timeline & Progress', xaxis_title='Timeline', yaxis_title=None, barmode='overlay', height=chart_height, showlegend=False,
-    yaxis=dict(autorange="reversed", tickfont=dict(size=12)), xaxis=dict(type='date', tickformat='%b %Y', gridcolor='LightGray'),
-    plot_bgcolor='white', margin=dict(l=10, r=10, t=50, b=50)
+# Large programs start with every phase collapsed to a summary row; only expanded phases are built task by task.
+phases = sorted(task_phases(df).unique())
+expanded_phases = st.multiselect(
+    "Expand phases", phases, default=phases if len(df) <= WEBGL_THRESHOLD else [],
+    help="Collapsed phases are drawn as a single summary bar spanning all of their tasks."
 )
-st.plotly_chart(fig, use_container_width=True)
+with perf.span("Gantt", 'figure'):
+    gantt_df = collapse_phases(df, expanded_phases)
+    fig = build_gantt(gantt_df, today=datetime.today(), critical=gantt_df['Critical'])
+with perf.span("Gantt", 'render'):
+    st.plotly_chart(fig, use_container_width=True)
+
+with st.expander("What-if: change a task's duration"):
+    open_tasks = df.loc[df['Progress (%)'] < 100, 'Task ID']
+    if open_tasks.empty:
+        st.write("Every task is complete.")
+    else:
+        what_if_task = st.selectbox("Task", open_tasks, format_func=dict(zip(df['Task ID'], df['Task'])).get)
+        current_days = int(cpm.durations[cpm.task_ids.get_loc(what_if_task)])
+        what_if_days = st.number_input("Duration (days)", min_value=0, value=current_days, step=1)
+        with perf.span("What-if reschedule"):
+            scenario = cpm.copy()  # The shared schedule is left untouched; only affected tasks are rescheduled.
+            moved = scenario.update_duration(what_if_task, what_if_days)
+        w1, w2 = st.columns(2)
+        w1.metric("Forecast Finish", f"{scenario.finish:%b %d, %Y}", delta=f"{(scenario.finish - cpm.finish).days} Days", delta_color="inverse")
+        w2.metric("Tasks Rescheduled", f"{moved:,}")
 
 with st.expander("Methodology & Actionability: Gantt Chart"):
     st.markdown("""
@@ -79,8 +87,13 @@ with st.expander("Methodology & Actionability: Gantt Chart"):
     - **Colored Foreground Bar:** Represents the actual progress. The length shows how much is complete, and the color indicates the task's inherent risk level.
     - **Colored Diamond (<span style="color:black;">♦</span>):** Marks the planned completion date. Its color also indicates the task's risk level.
     - **Gray Dashed Line:** Indicates today's date for context.
+    - **Black Outline:** Marks tasks on the critical path: the chain of dependent tasks with zero float, computed by the critical path method (CPM) from each task's predecessors. A task starts once all of its predecessors finish (and not before its planned start), and lasts its actual duration once known. Any slip on an outlined task moves the project finish one-for-one; slips elsewhere are absorbed by float until it runs out. The schedule variance KPI is the forecast finish minus the finish the same network gives with planned durations.
     
     **Managerial Actionability:**
     - **Action:** Immediately identify **High Risk** tasks by their red bars and red diamonds. These require the most oversight.
+    - **Action:** Focus expediting effort on critical-path tasks; accelerating a task with float does not bring the finish date forward.
     - **Action:** Pay close attention to any task where the colored progress bar has not yet crossed the "Today" line, especially if it's a high-risk task. This indicates it is behind schedule and requires immediate managerial intervention to get back on track.
     """)
+
+freshness.panel()
+perf.panel()
@@ -1,29 +1,34 @@
 # pages/D_Governance_and_Oversight.py
 
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from utils import generate_governance_data
+from data_access import load_governance_data, get_action_store
+from action_items import DEFAULT_DUE_DAYS
 from datetime import date
+import perf
+import freshness
 
 st.set_page_config(page_title="CDMO Governance | Avidity", layout="wide")
+perf.begin("Governance & Oversight")
 st.title("🤝 CDMO Governance & Oversight")
 st.markdown("### Tracking the cadence and outcomes of all official partner engagements, including QBRs, audits, and technical meetings.")
 
-gov_df = generate_governance_data()
-gov_df['Date'] = pd.to_datetime(gov_df['Date'])
+gov_df = load_governance_data()
+# Action-item level store: closure, days-to-close, overdue and cadence metrics are indexed array passes.
+action_store = get_action_store()
+today = date.today()
 
 st.header("Governance Program Effectiveness")
-total_actions = gov_df['Actions Generated'].sum()
-total_closed = gov_df['Actions Closed'].sum()
-closure_rate = (total_closed / total_actions) * 100 if total_actions > 0 else 100
-avg_days_to_close = 25
+with perf.span("Action totals"):
+    totals = action_store.totals(today)
 
-kpi1, kpi2, kpi3 = st.columns(3)
+kpi1, kpi2, kpi3, kpi4 = st.columns(4)
 kpi1.metric("Total Engagements (YTD)", len(gov_df))
-kpi2.metric("Action Item Closure Rate", f"{closure_rate:.1f}%")
-kpi3.metric("Avg. Days to Close Action", f"{avg_days_to_close} Days")
+kpi2.metric("Action Item Closure Rate", f"{totals['closure_rate']:.1f}%")
+kpi3.metric("Avg. Days to Close Action", f"{totals['mean_days_to_close']:.0f} Days" if totals['closed'] else "n/a", help=f"Median: {totals['median_days_to_close']:.0f} days" if totals['closed'] else None)
+kpi4.metric("Overdue Actions", totals['overdue'], delta_color="inverse")
 st.divider()
 
 st.header("Engagement Analysis")
@@ -31,13 +36,15 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Action Item Funnel")
-    fig = go.Figure(go.Funnel(
-        y = ["Engagements", "Actions Generated", "Actions Closed"],
-        x = [len(gov_df), total_actions, total_closed],
-        textposition = "inside", textinfo = "value+percent previous"
-    ))
-    fig.update_layout(height=400, title="From Meeting to Action to Closure")
-    st.plotly_chart(fig, use_container_width=True)
+    with perf.span("Action funnel", 'figure'):
+        fig = go.Figure(go.Funnel(
+            y = ["Engagements", "Actions Generated", "Actions Closed"],
+            x = [totals['meetings'], totals['actions'], totals['closed']],
+            textposition = "inside", textinfo = "value+percent previous"
+        ))
+        fig.update_layout(height=400, title="From Meeting to Action to Closure")
+    with perf.span("Action funnel", 'render'):
+        st.plotly_chart(fig, use_container_width=True)
 
     with st.expander("Methodology & Actionability: Action Item Funnel"):
         st.markdown("""
@@ -51,11 +58,12 @@ with col1:
 
 with col2:
     st.subheader("Engagement Cadence")
-    gov_df['YearMonth'] = gov_df['Date'].dt.to_period('M').astype(str)
-    engagement_counts = gov_df.groupby(['CDMO', 'YearMonth']).size().reset_index(name='counts')
-    fig = px.density_heatmap(engagement_counts, x="YearMonth", y="CDMO", z="counts", histfunc="sum", color_continuous_scale="Blues", title="Monthly Engagement Frequency per CDMO")
-    fig.update_layout(height=400)
-    st.plotly_chart(fig, use_container_width=True)
+    with perf.span("Cadence heatmap", 'figure'):
+        engagement_counts = action_store.cadence()  # Pre-binned monthly meeting counts per CDMO.
+        fig = px.density_heatmap(engagement_counts, x="YearMonth", y="CDMO", z="counts", histfunc="sum", color_continuous_scale="Blues", title="Monthly Engagement Frequency per CDMO")
+        fig.update_layout(height=400)
+    with perf.span("Cadence heatmap", 'render'):
+        st.plotly_chart(fig, use_container_width=True)
 
     with st.expander("Methodology & Actionability: Cadence Heatmap"):
         st.markdown("""
@@ -65,6 +73,41 @@ with col2:
         - **Action:** Ensure that a consistent schedule of QBRs and technical meetings is maintained for all strategic partners.
         """)
 
+st.header("Action Item Follow-Through")
+col3, col4 = st.columns(2)
+with col3:
+    st.subheader("Days to Close Distribution")
+    with perf.span("Days to close figure", 'figure'):
+        days = action_store.days_to_close()
+        counts = np.bincount(days.clip(min=0)) if len(days) else np.array([], dtype=np.int64)
+        fig = px.bar(x=np.arange(len(counts)), y=counts, labels={'x': 'Days to Close', 'y': 'Actions'}, title="Closed Action Items by Days to Close")
+        fig.add_vline(x=DEFAULT_DUE_DAYS, line_dash="dash", line_color="red", annotation_text="Due")
+        fig.update_layout(height=400)
+    with perf.span("Days to close figure", 'render'):
+        st.plotly_chart(fig, use_container_width=True)
+with col4:
+    st.subheader("Follow-Through by CDMO")
+    with perf.span("Action summary"):
+        action_summary = action_store.summary(today).merge(action_store.cadence_gaps(today), on='CDMO', how='outer')
+    st.dataframe(action_summary.sort_values(['Overdue', 'Closure Rate (%)'], ascending=[False, True]), use_container_width=True, hide_index=True, height=400,
+                 column_config={'Closure Rate (%)': st.column_config.NumberColumn(format="%.1f%%")})
+
+with st.expander(f"Overdue Action Items ({totals['overdue']:,})"):
+    st.dataframe(action_store.overdue(today), use_container_width=True, hide_index=True)
+
+with st.expander("Methodology & Actionability: Action Item Follow-Through"):
+    st.markdown(f"""
+    **Methodology:** Every action item raised in a governance meeting is tracked from its 'Opened' event to its 'Closed' event. Days to close is the time between the two; an action is overdue when it is still open past its due date (by default {DEFAULT_DUE_DAYS} days after the meeting). Cadence gaps count the trailing months with no engagement at all.
+
+    **Significance & Insights:** Closure rate alone hides slow follow-through. A CDMO with a long P90 days-to-close or a growing overdue list is closing actions late, even if it eventually closes them. Months without engagement point to partners drifting out of the governance rhythm.
+
+    **Managerial Actionability:**
+    - **Action:** Take the overdue list for each partner into its next QBR, and schedule a working session with any strategic partner that has gone several months without an engagement.
+    """)
+
 st.header("Official Engagement Log")
 st.caption("A detailed, auditable log of all governance meetings.")
 st.dataframe(gov_df[['Date', 'CDMO', 'Meeting Type', 'Key Topics', 'Actions Generated', 'Actions Closed']], use_container_width=True, hide_index=True)
+
+freshness.panel()
+perf.panel()
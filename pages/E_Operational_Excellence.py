@@ -3,15 +3,18 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils import generate_op_ex_data
+from data_access import load_op_ex_data
+import perf
+import freshness
 
 st.set_page_config(page_title="Operational Excellence | Avidity", layout="wide")
+perf.begin("Operational Excellence")
 
 st.title("⚙️ Operational Excellence Portfolio")
 st.markdown("### Driving and tracking continuous improvement initiatives to enhance manufacturing efficiency, yield, and compliance.")
 
 # --- Data Loading ---
-opex_df = generate_op_ex_data()
+opex_df = load_op_ex_data()
 
 # --- KPIs ---
 st.header("Program Impact & ROI")
@@ -31,33 +34,35 @@ st.divider()
 st.header("Initiative Prioritization Matrix")
 st.caption("Prioritizing projects based on their financial/quality impact and technical feasibility. Bubble size indicates implementation cost.")
 
-fig = px.scatter(
-    opex_df,
-    x="Technical Feasibility (1-5)",
-    y="Financial Impact ($K/yr)",
-    size="Implementation Cost ($K)",
-    color="Status",
-    hover_name="Title",
-    text="Project ID",
-    size_max=60,
-    color_discrete_map={
-        'In Progress': '#00AEEF',
-        'Complete': '#003F87',
-        'Planned': 'grey'
-    }
-)
-# Add quadrants for strategic categorization
-fig.add_vline(x=3.5, line_dash="dash")
-fig.add_hline(y=opex_df["Financial Impact ($K/yr)"].median(), line_dash="dash")
+with perf.span("Prioritization matrix", 'figure'):
+    fig = px.scatter(
+        opex_df,
+        x="Technical Feasibility (1-5)",
+        y="Financial Impact ($K/yr)",
+        size="Implementation Cost ($K)",
+        color="Status",
+        hover_name="Title",
+        text="Project ID",
+        size_max=60,
+        color_discrete_map={
+            'In Progress': '#00AEEF',
+            'Complete': '#003F87',
+            'Planned': 'grey'
+        }
+    )
+    # Add quadrants for strategic categorization
+    fig.add_vline(x=3.5, line_dash="dash")
+    fig.add_hline(y=opex_df["Financial Impact ($K/yr)"].median(), line_dash="dash")
 
-fig.add_annotation(x=4.5, y=opex_df["Financial Impact ($K/yr)"].max(), text="<b>Quick Wins</b>", showarrow=False, font_color="green")
-fig.add_annotation(x=2, y=opex_df["Financial Impact ($K/yr)"].max(), text="<b>Major Projects</b>", showarrow=False, font_color="blue")
-fig.add_annotation(x=4.5, y=opex_df["Financial Impact ($K/yr)"].min(), text="<b>Fill-Ins</b>", showarrow=False, font_color="orange")
-fig.add_annotation(x=2, y=opex_df["Financial Impact ($K/yr)"].min(), text="<b>Re-evaluate</b>", showarrow=False, font_color="red")
+    fig.add_annotation(x=4.5, y=opex_df["Financial Impact ($K/yr)"].max(), text="<b>Quick Wins</b>", showarrow=False, font_color="green")
+    fig.add_annotation(x=2, y=opex_df["Financial Impact ($K/yr)"].max(), text="<b>Major Projects</b>", showarrow=False, font_color="blue")
+    fig.add_annotation(x=4.5, y=opex_df["Financial Impact ($K/yr)"].min(), text="<b>Fill-Ins</b>", showarrow=False, font_color="orange")
+    fig.add_annotation(x=2, y=opex_df["Financial Impact ($K/yr)"].min(), text="<b>Re-evaluate</b>", showarrow=False, font_color="red")
 
-fig.update_traces(textposition='top center')
-fig.update_layout(height=600, title="OpEx Project Portfolio")
-st.plotly_chart(fig, use_container_width=True)
+    fig.update_traces(textposition='top center')
+    fig.update_layout(height=600, title="OpEx Project Portfolio")
+with perf.span("Prioritization matrix", 'render'):
+    st.plotly_chart(fig, use_container_width=True)
 st.divider()
 
 # --- Detailed Project Tracker ---
@@ -72,3 +77,6 @@ st.dataframe(
         "Implementation Cost ($K)": st.column_config.NumberColumn(format="$%dK")
     }
 )
+
+freshness.panel()
+perf.panel()
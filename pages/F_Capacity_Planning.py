@@ -0,0 +1,95 @@
+# pages/F_Capacity_Planning.py
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from data_access import get_capacity_index
+from capacity import UNASSIGNED
+from datetime import date, timedelta
+import perf
+import freshness
+
+st.set_page_config(page_title="Capacity Planning | Avidity", layout="wide")
+perf.begin("Capacity Planning")
+st.title("🏭 Suite Capacity & Schedule Conflicts")
+st.markdown("### Checking suite occupancy across the CDMO network and finding room for new batches.")
+
+# --- Data Loading ---
+index = get_capacity_index()
+today = date.today()
+cdmos = sorted(index.resources.get_level_values(0).unique())
+
+# --- KPIs ---
+st.header("Network Capacity")
+with perf.span("Capacity KPIs"):
+    conflicts = index.conflicts()
+    occupancy_90d = index.occupancy(today, today + timedelta(days=90))
+    running_now = index.count_running(today)
+
+kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+kpi1.metric("Manufacturing Suites", f"{len(index.resources):,}", f"{len(cdmos)} CDMOs", delta_color="off")
+kpi2.metric("Suite Utilization (Next 90 Days)", f"{occupancy_90d:.0%}")
+kpi3.metric("Schedule Conflicts", f"{index.conflict_count:,}", delta=f"{len(conflicts[['CDMO', 'Suite']].drop_duplicates()):,} suites affected", delta_color="off")
+kpi4.metric("Batches Running Today", f"{running_now:,}")
+if UNASSIGNED in index.resources.get_level_values(1):
+    st.warning("This data store has no 'Suite' column, so every CDMO is treated as a single suite. Regenerate it with synthetic.py to check suite-level conflicts.")
+st.divider()
+
+# --- Utilization Heatmap ---
+st.header("Monthly Suite Utilization")
+with perf.span("Utilization heatmap", 'figure'):
+    utilization = index.utilization(today - timedelta(days=180), today + timedelta(days=180))
+    # The busiest partners over the coming quarter first; large networks keep the top 25.
+    upcoming = utilization.loc[:, utilization.columns >= pd.Timestamp(today).to_period('M').start_time].iloc[:, :3].mean(axis=1)
+    shown = utilization.loc[upcoming.sort_values(ascending=False).index[:25]]
+    heat = shown.set_axis(shown.columns.strftime('%Y-%m'), axis=1).rename_axis('CDMO').reset_index().melt(id_vars='CDMO', var_name='Month', value_name='Utilization (%)')
+    heat['Utilization (%)'] = (heat['Utilization (%)'] * 100).round(1)
+    fig_util = px.density_heatmap(heat, x='Month', y='CDMO', z='Utilization (%)', histfunc='sum', color_continuous_scale='RdYlGn_r', range_color=[0, 100], title="Share of Suite-Days Occupied per Month")
+    fig_util.update_layout(height=max(400, 26 * len(shown) + 150), yaxis=dict(categoryorder='array', categoryarray=list(shown.index[::-1])))
+with perf.span("Utilization heatmap", 'render'):
+    st.plotly_chart(fig_util, use_container_width=True)
+if len(utilization) > len(shown):
+    st.caption(f"Showing the {len(shown)} of {len(utilization)} CDMOs with the highest utilization over the next three months.")
+
+with st.expander("Methodology: Suite Utilization"):
+    st.markdown("Each batch occupies its suite from its start date up to its end date. Overlapping batches in a suite are merged into busy blocks, and a cell is the share of the CDMO's suite-days in that month covered by a block. **Action:** Partners running near 100% for the coming months cannot absorb new work or recover from a slipped batch without displacing another; route new demand to partners with headroom.")
+
+# --- Conflicts ---
+st.header("Schedule Conflicts")
+st.caption("Pairs of batches booked into the same suite with overlapping dates, most recent first.")
+with perf.span("Conflict table"):
+    conflict_view = conflicts.sort_values('Overlap Start', ascending=False).head(1000)
+st.dataframe(conflict_view, use_container_width=True, hide_index=True)
+if index.conflict_count > len(conflict_view):
+    st.caption(f"Showing the latest {len(conflict_view):,} of {index.conflict_count:,} conflicts.")
+
+with st.expander("Methodology: Conflict Detection"):
+    st.markdown("Batches are sorted by suite and start date, so every batch that overlaps a given one starts after it and before it ends; one binary search per batch finds them all. **Action:** Resolve each conflict with the CDMO before the overlap start: re-sequence one of the batches, move it to a free suite (see below), or confirm that the suite really runs both campaigns in parallel.")
+
+# --- Queries ---
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("What Is Running")
+    selected_cdmo = st.selectbox("CDMO", cdmos)
+    window = st.date_input("Between", (today - timedelta(days=30), today + timedelta(days=30)))
+    suite = st.selectbox("Suite", ['All suites', *index.suites(selected_cdmo)])
+    if isinstance(window, tuple) and len(window) == 2:
+        with perf.span("Running query"):
+            running = index.running(selected_cdmo, window[0], window[1], suite=None if suite == 'All suites' else suite)
+        st.dataframe(running[[c for c in ['Batch ID', 'Suite', 'Program', 'Status', 'Start Date', 'End Date'] if c in running.columns]], use_container_width=True, hide_index=True)
+        st.caption(f"{len(running):,} batches occupy {selected_cdmo} suites in this window.")
+
+with col2:
+    st.subheader("Find Capacity")
+    slot_days = st.number_input("Campaign length (days)", min_value=1, max_value=365, value=60, step=5)
+    not_before = st.date_input("Not before", today)
+    with perf.span("Slot search"):
+        slots = index.earliest_slots(int(slot_days), not_before)
+    st.dataframe(slots.head(25), use_container_width=True, hide_index=True)
+    st.caption("The earliest start at each CDMO where a suite stays free for the whole campaign, soonest first.")
+
+with st.expander("Methodology: Capacity Queries"):
+    st.markdown("The index keeps every suite's batches sorted by start date alongside a running maximum of their end dates, so finding the batches in a date window is two binary searches per suite. Free capacity is searched over the gaps between each suite's busy blocks with a range-maximum table, so the first gap long enough for a campaign is found in logarithmic time even with 100k+ scheduled batches. **Action:** Use the earliest slot as the realistic start date when committing a new campaign to a partner, and compare it across partners before placing the order.")
+
+freshness.panel()
+perf.panel()
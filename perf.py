@@ -0,0 +1,138 @@
+# perf.py
+"""Lightweight timing spans for the page scripts and an optional sidebar performance panel.
+
+Each page calls begin() at the top and panel() at the bottom, and wraps its hot paths in
+span(name, stage), where stage is one of STAGES: 'data' (loading / generation), 'transform' (pandas),
+'figure' (Plotly construction) or 'render' (st.plotly_chart serialization). Recording is switched on
+with AVITY_PERF=1 or the ?perf=1 query parameter; otherwise begin() installs no recorder and span()
+returns a shared no-op context manager, so a disabled span costs one thread-local lookup. Each
+page's first rerun in the process is always timed (two clock reads) as its time to first render.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+import pandas as pd
+import streamlit as st
+import warmup
+
+PERF_ENV = 'AVITY_PERF'
+STAGES = ('data', 'transform', 'figure', 'render')
+HISTORY = 20  # Reruns kept per session for the panel and the export.
+SPAN_COLUMNS = ['Page', 'Rerun', 'Started', 'Span', 'Stage', 'Depth', 'Start (ms)', 'Duration (ms)', 'Self (ms)']
+
+_NOOP = nullcontext()
+_local = threading.local()  # Streamlit runs each session's script on its own thread.
+_first_renders = {}  # Page -> ms taken by its first rerun in this process.
+
+def enabled():
+    if os.environ.get(PERF_ENV, '').lower() in ('1', 'true', 'yes'):
+        return True
+    return st.query_params.get('perf') == '1'
+
+class Rerun:
+    """The spans recorded during one execution of a page script."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = pd.Timestamp.now()
+        self.total_ms = None
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._child_ms = [0.0]  # Time spent in nested spans, per open span (plus the script root).
+
+    @contextmanager
+    def span(self, name, stage):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}'; expected one of {STAGES}.")
+        depth = len(self._child_ms) - 1
+        self._child_ms.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = (time.perf_counter() - start) * 1e3
+            self_ms = duration - self._child_ms.pop()
+            self._child_ms[-1] += duration
+            self.spans.append({'Span': name, 'Stage': stage, 'Depth': depth, 'Start (ms)': (start - self._t0) * 1e3, 'Duration (ms)': duration, 'Self (ms)': self_ms})
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self._t0) * 1e3
+        self.spans.sort(key=lambda s: s['Start (ms)'])
+
+    def stage_breakdown(self):
+        """Exclusive time per stage; time outside any span is reported as 'other'."""
+        by_stage = {stage: 0.0 for stage in STAGES}
+        for s in self.spans:
+            by_stage[s['Stage']] += s['Self (ms)']
+        by_stage['other'] = max(self.total_ms - sum(by_stage.values()), 0.0)
+        return pd.Series(by_stage, name='Time (ms)')
+
+    def to_dict(self):
+        return {'page': self.page, 'started': self.started.isoformat(), 'total_ms': self.total_ms, 'spans': self.spans}
+
+def begin(page):
+    """Starts recording a rerun of the calling page (a no-op unless perf recording is enabled)."""
+    _local.page, _local.started = page, time.perf_counter()
+    _local.rerun = Rerun(page) if enabled() else None
+
+def first_renders():
+    return dict(_first_renders)
+
+def span(name, stage='transform'):
+    rerun = getattr(_local, 'rerun', None)
+    return _NOOP if rerun is None else rerun.span(name, stage)
+
+def timed(stage):
+    """Decorator form of span(), named after the wrapped function."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            rerun = getattr(_local, 'rerun', None)
+            if rerun is None:
+                return func(*args, **kwargs)
+            with rerun.span(func.__name__, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# --- Export ---
+def to_frame(reruns):
+    """One row per span across reruns, for CSV export and offline analysis."""
+    rows = [{'Page': r.page, 'Rerun': i, 'Started': r.started, **s} for i, r in enumerate(reruns) for s in r.spans]
+    return pd.DataFrame(rows, columns=SPAN_COLUMNS)
+
+def to_json(reruns):
+    return json.dumps([r.to_dict() for r in reruns], indent=2)
+
+def to_csv(reruns):
+    return to_frame(reruns).to_csv(index=False)
+
+# --- Sidebar panel ---
+def panel():
+    """Closes the current rerun and shows its breakdown, plus recent history and exports, in the sidebar."""
+    page = getattr(_local, 'page', None)
+    if page is not None and page not in _first_renders:
+        _first_renders[page] = (time.perf_counter() - _local.started) * 1e3
+    _local.page = None
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return
+    _local.rerun = None
+    rerun.finish()
+    history = st.session_state.setdefault('_perf_history', deque(maxlen=HISTORY))
+    history.append(rerun)
+    with st.sidebar.expander(f"Performance: {rerun.total_ms:,.0f} ms this rerun"):
+        st.bar_chart(rerun.stage_breakdown(), horizontal=True, height=180)
+        spans = pd.DataFrame(rerun.spans, columns=SPAN_COLUMNS[3:]).sort_values('Self (ms)', ascending=False)
+        st.dataframe(spans, hide_index=True, column_config={c: st.column_config.NumberColumn(format="%.1f") for c in SPAN_COLUMNS[-3:]})
+        recent = pd.DataFrame({'Page': [r.page for r in history], 'Total (ms)': [r.total_ms for r in history]})
+        st.caption(f"Last {len(history)} reruns this session: median {recent['Total (ms)'].median():,.0f} ms, max {recent['Total (ms)'].max():,.0f} ms.")
+        startup = ", ".join(f"{step} {value:.2f}s" if isinstance(value, float) else f"{step} {value}" for step, value in warmup.report.items())
+        st.caption(f"Warm-up: {startup or 'not run in this process'}.")
+        st.caption("First render this process: " + ", ".join(f"{name} {ms:,.0f} ms" for name, ms in first_renders().items()))
+        st.download_button("Export JSON", to_json(history), file_name='avity_perf.json', mime='application/json', on_click='ignore')
+        st.download_button("Export CSV", to_csv(history), file_name='avity_perf.csv', mime='text/csv', on_click='ignore')
@@ -0,0 +1,258 @@
+# quality_feed.py
+"""Streaming ingestion of quality records with running per-CDMO aggregates.
+
+QualityStream is seeded once from the quality snapshot. It then tails an append-only drop
+directory of *.jsonl / *.csv files, set with AVITY_QUALITY_FEED; each line is the latest state of
+one deviation, CAPA or change request. Events are upserts keyed on 'Record ID': the record's
+previous contribution is subtracted and the new one added. Replaying a file therefore changes
+nothing, and each event costs O(1) whatever the size of the history.
+
+Per CDMO the stream keeps:
+- root-cause counts for the deviation Pareto;
+- records opened per month and type, and records closed per month;
+- open, open critical/high and the sum of open dates, so the KPIs need no scan;
+- open records per open day, for the ageing buckets.
+The Drilldown's quality tab reads these instead of recounting the full table on every rerun.
+"""
+import csv
+import io
+import json
+import os
+import threading
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from storage import NETWORK_WIDE_CDMOS
+
+FEED_DIR_ENV = 'AVITY_QUALITY_FEED'
+FEED_PATTERNS = ('.jsonl', '.csv')
+REQUIRED_FIELDS = ['Record ID', 'CDMO', 'Type', 'Open Date', 'Priority', 'Status']
+ESCALATED_PRIORITIES = ('Critical', 'High')
+AGE_BUCKETS = [(0, 30, '0-30 Days'), (31, 60, '31-60 Days'), (61, 90, '61-90 Days'), (91, None, '90+ Days')]
+
+def feed_dir():
+    return os.environ.get(FEED_DIR_ENV) or None
+
+def append_events(directory, records, name='events.jsonl'):
+    """Appends records (dicts or a frame) to a JSONL feed file, e.g. from an export job or a test."""
+    rows = records.to_dict('records') if isinstance(records, pd.DataFrame) else list(records)
+    with open(os.path.join(directory, name), 'a') as f:
+        for row in rows:
+            f.write(json.dumps({k: (None if pd.isna(v) else str(v)) for k, v in row.items()}) + '\n')
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _day(value):
+    """Days since the epoch for an ISO date string, date or timestamp (None when missing)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value == '':
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal() - _EPOCH_ORDINAL
+    except ValueError:
+        return int(pd.Timestamp(value).to_datetime64().astype('datetime64[D]').astype(np.int64))
+
+@lru_cache(maxsize=None)
+def _month(day):
+    return str(np.datetime64(day, 'D').astype('datetime64[M]'))
+
+class _Aggregates:
+    """Running counts for one CDMO."""
+    __slots__ = ('root_causes', 'opened', 'closed', 'open_by_day', 'open_count', 'open_escalated', 'open_day_sum', 'records')
+
+    def __init__(self):
+        self.root_causes, self.opened, self.closed, self.open_by_day = Counter(), Counter(), Counter(), Counter()
+        self.open_count = self.open_escalated = self.open_day_sum = self.records = 0
+
+    def add(self, record, sign):
+        _, rtype, open_day, priority, status, closed_day, root_cause = record
+        self.records += sign
+        self.opened[(_month(open_day), rtype)] += sign
+        if rtype == 'Deviation' and root_cause:
+            self.root_causes[root_cause] += sign
+        if status == 'Closed':
+            if closed_day is not None:
+                self.closed[_month(closed_day)] += sign
+        else:
+            self.open_count += sign
+            self.open_day_sum += sign * open_day
+            self.open_by_day[open_day] += sign
+            self.open_escalated += sign * (priority in ESCALATED_PRIORITIES)
+
+class QualityStream:
+    """Quality aggregates per CDMO, seeded from a snapshot and kept current from the drop directory."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._aggregates = {}
+        self._snapshot_ids = pd.Index([])
+        self._snapshot = None
+        self._overrides = {}  # Record ID -> latest state, for records seen on the feed.
+        self._offsets, self._headers = {}, {}
+        self._lock = threading.Lock()
+        self.events = self.rejected = self.version = 0
+
+    def _agg(self, cdmo):
+        agg = self._aggregates.get(cdmo)
+        if agg is None:
+            agg = self._aggregates[cdmo] = _Aggregates()
+        return agg
+
+    # --- Seeding (vectorized over the snapshot) ---
+    def seed(self, df):
+        """Builds the aggregates from a quality frame in grouped passes; the frame itself is not kept."""
+        open_days = pd.to_datetime(df['Open Date']).to_numpy('datetime64[D]')
+        closed_days = pd.to_datetime(df['Closed Date']).to_numpy('datetime64[D]')
+        is_open = (df['Status'] != 'Closed').to_numpy()
+        month_label = lambda m: str(np.datetime64(int(m), 'M'))  # Months are grouped as integers and labelled once per group.
+        df = df.reset_index(drop=True)
+        frame = pd.DataFrame({
+            'CDMO': df['CDMO'], 'Type': df['Type'], 'Open Month': open_days.astype('datetime64[M]').astype(np.int64),
+            'Open Day': open_days.astype(np.int64), 'Escalated': df['Priority'].isin(ESCALATED_PRIORITIES), 'Open': is_open,
+        })
+        with self._lock:
+            for (cdmo, month, rtype), n in frame.groupby(['CDMO', 'Open Month', 'Type'], sort=False).size().items():
+                self._agg(cdmo).opened[(month_label(month), rtype)] += n
+            for cdmo, n in frame.groupby('CDMO', sort=False).size().items():
+                self._agg(cdmo).records += n
+            deviations = df[(df['Type'] == 'Deviation').to_numpy() & df['Root Cause Category'].notna().to_numpy()]
+            for (cdmo, cause), n in deviations.groupby(['CDMO', 'Root Cause Category'], sort=False).size().items():
+                self._agg(cdmo).root_causes[cause] += n
+            closed = ~is_open & ~np.isnat(closed_days)
+            closed_months = pd.DataFrame({'CDMO': frame['CDMO'][closed].reset_index(drop=True), 'Month': closed_days[closed].astype('datetime64[M]').astype(np.int64)})
+            for (cdmo, month), n in closed_months.groupby(['CDMO', 'Month'], sort=False).size().items():
+                self._agg(cdmo).closed[month_label(month)] += n
+            open_frame = frame[is_open]
+            for cdmo, group in open_frame.groupby('CDMO', sort=False):
+                agg = self._agg(cdmo)
+                agg.open_count += len(group)
+                agg.open_day_sum += int(group['Open Day'].sum())
+                agg.open_escalated += int(group['Escalated'].sum())
+                agg.open_by_day.update(group['Open Day'].value_counts().to_dict())
+            # Per-record state, so a feed update can subtract what the snapshot contributed (the columns are shared, not copied).
+            self._snapshot_ids = pd.Index(df['Record ID'])
+            self._snapshot = pd.DataFrame({
+                'CDMO': df['CDMO'], 'Type': df['Type'], 'Open Day': frame['Open Day'], 'Priority': df['Priority'], 'Status': df['Status'],
+                'Closed Day': np.where(np.isnat(closed_days), -1, closed_days.astype(np.int64)), 'Root Cause': df['Root Cause Category'],
+            })
+            self.version += 1
+        return self
+
+    def _snapshot_records(self, locs):
+        """Snapshot state of the given rows as record tuples (one vectorized take for the batch)."""
+        rows = self._snapshot.take(locs)
+        closed = rows['Closed Day'].to_numpy()
+        root_cause = rows['Root Cause'].astype(object).where(rows['Root Cause'].notna(), None)
+        return zip(rows['CDMO'].tolist(), rows['Type'].tolist(), rows['Open Day'].tolist(), rows['Priority'].tolist(), rows['Status'].tolist(),
+                   [None if d < 0 else int(d) for d in closed], root_cause.tolist())
+
+    # --- Ingestion ---
+    def apply(self, events):
+        """Upserts quality record events (dicts with REQUIRED_FIELDS); malformed events are counted in rejected."""
+        parsed = []
+        for event in events:
+            try:
+                if not isinstance(event, dict) or any(not event.get(field) for field in REQUIRED_FIELDS):
+                    raise ValueError("missing field")
+                parsed.append((event['Record ID'], (event['CDMO'], event['Type'], _day(event['Open Date']), event['Priority'], event['Status'],
+                                                    _day(event.get('Closed Date')), event.get('Root Cause Category') or None)))
+            except (ValueError, TypeError):
+                self.rejected += 1
+        if not parsed:
+            return 0
+        with self._lock:
+            # One hash lookup and one row take for the whole batch against the snapshot.
+            ids = [record_id for record_id, _ in parsed]
+            locs = self._snapshot_ids.get_indexer(ids) if len(self._snapshot_ids) else np.full(len(ids), -1)
+            fresh = [i for i, (record_id, loc) in enumerate(zip(ids, locs)) if loc >= 0 and record_id not in self._overrides]
+            from_snapshot = dict(zip(fresh, self._snapshot_records(locs[fresh]))) if fresh else {}
+            for i, (record_id, record) in enumerate(parsed):
+                previous = self._overrides.get(record_id) or from_snapshot.get(i)
+                if previous is not None:
+                    self._agg(previous[0]).add(previous, -1)
+                self._agg(record[0]).add(record, +1)
+                self._overrides[record_id] = record
+            self.events += len(parsed)
+            self.version += 1
+        return len(parsed)
+
+    def _read_new(self, path):
+        """Complete lines appended to path since the last poll (a shrunken file is re-read from the top)."""
+        size = os.path.getsize(path)
+        offset = self._offsets.get(path, 0)
+        if size < offset:
+            offset = 0
+            self._headers.pop(path, None)
+        if size == offset:
+            return []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read(size - offset)
+        end = chunk.rfind(b'\n') + 1  # A partially written last line waits for the next poll.
+        self._offsets[path] = offset + end
+        text = chunk[:end].decode('utf-8')
+        if path.endswith('.jsonl'):
+            events = []
+            for line in text.splitlines():
+                try:
+                    events.append(json.loads(line) if line.strip() else None)
+                except json.JSONDecodeError:
+                    events.append({})
+            return [e for e in events if e is not None]
+        rows = list(csv.reader(io.StringIO(text)))
+        if path not in self._headers and rows:
+            self._headers[path] = rows.pop(0)
+        header = self._headers.get(path, [])
+        return [dict(zip(header, row)) for row in rows if row]
+
+    def poll(self):
+        """Ingests whatever has been appended to the drop directory; returns the number of events applied."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        paths = sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(FEED_PATTERNS))
+        return sum(self.apply(self._read_new(path)) for path in paths)
+
+    # --- Queries (combine the CDMO's aggregates with the network-wide rows) ---
+    def _parts(self, cdmo):
+        return [self._aggregates[c] for c in (cdmo, *NETWORK_WIDE_CDMOS) if c in self._aggregates]
+
+    def summary(self, cdmo, as_of=None):
+        """Record count, open, open critical/high and average days open."""
+        as_of = _day(as_of or pd.Timestamp.today())
+        with self._lock:
+            parts = self._parts(cdmo)
+            open_count = sum(a.open_count for a in parts)
+            day_sum = sum(a.open_day_sum for a in parts)
+            return {
+                'records': sum(a.records for a in parts), 'open': open_count,
+                'open_escalated': sum(a.open_escalated for a in parts),
+                'avg_days_open': (as_of * open_count - day_sum) / open_count if open_count else float('nan'),
+            }
+
+    def pareto(self, cdmo):
+        """Deviation root causes by count, with the cumulative share."""
+        with self._lock:
+            counts = sum((a.root_causes for a in self._parts(cdmo)), Counter())
+        pareto = pd.DataFrame(sorted(((k, v) for k, v in counts.items() if v > 0), key=lambda kv: -kv[1]), columns=['Category', 'Count'])
+        pareto['Cumulative %'] = pareto['Count'].cumsum() / pareto['Count'].sum() * 100 if len(pareto) else []
+        return pareto
+
+    def monthly(self, cdmo):
+        """Records opened per month and type, plus records closed per month ('Type' == 'Closed')."""
+        with self._lock:
+            opened = sum((a.opened for a in self._parts(cdmo)), Counter())
+            closed = sum((a.closed for a in self._parts(cdmo)), Counter())
+        rows = [(month, rtype, n) for (month, rtype), n in opened.items() if n > 0]
+        rows += [(month, 'Closed', n) for month, n in closed.items() if n > 0]
+        return pd.DataFrame(rows, columns=['Month', 'Type', 'Records']).sort_values(['Month', 'Type'], ignore_index=True)
+
+    def ageing(self, cdmo, as_of=None):
+        """Open records per AGE_BUCKETS bucket of days open."""
+        as_of = _day(as_of or pd.Timestamp.today())
+        with self._lock:
+            by_day = sum((a.open_by_day for a in self._parts(cdmo)), Counter())
+        days = np.fromiter(by_day.keys(), dtype=np.int64, count=len(by_day))
+        counts = np.fromiter(by_day.values(), dtype=np.int64, count=len(by_day))
+        age = as_of - days
+        return pd.Series({label: int(counts[(age >= lo) & ((age <= hi) if hi is not None else True)].sum()) for lo, hi, label in AGE_BUCKETS}, name='Open Records')
@@ -0,0 +1,248 @@
+# refresh.py
+"""Stale-while-revalidate refresh of the feed-backed datasets (schedule, quality, budget, governance, OpEx).
+
+    python refresh.py --source-dir DIR [--interval quality=5] [--delay quality=2] [--duration 60]
+
+A RefreshScheduler holds the last good snapshot of every source. A daemon thread refreshes each one
+on its own interval, on a worker pool, so a slow feed never delays the others. snapshot() answers at
+once from memory; when a snapshot is past its interval and no refresh is running, the read also
+starts one in the background. Only a source that has never loaded makes the caller wait.
+
+A refresh that raises keeps the previous snapshot. It records the error and retries with doubling
+back-off, capped at the source's interval. A snapshot older than STALE_AFTER intervals is reported
+as stale. The snapshot version changes only when the data does:
+- a source with a stamp() method (a file's mtime and size, say) is fetched only when the stamp moves;
+- any other source is fetched every time and compared by content fingerprint.
+Caches keyed on version() therefore survive refreshes that bring nothing new.
+
+The default sources are the utils.py generators, which read the Parquet store when one is configured.
+Set AVITY_SOURCE_DIR to a directory of <name>.parquet or <name>.csv files to use local file stand-ins
+for the feeds instead, and AVITY_REFRESH_INTERVALS (e.g. "quality=60,schedule=300") to override
+DEFAULT_INTERVALS.
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+import pandas as pd
+from figure_cache import fingerprint
+from schema import conform
+from storage import data_dir, dataset_path, has_dataset
+from utils import generate_master_schedule, generate_quality_data, generate_budget_data, generate_governance_data, generate_op_ex_data
+
+SOURCE_DIR_ENV = 'AVITY_SOURCE_DIR'
+INTERVALS_ENV = 'AVITY_REFRESH_INTERVALS'
+DEFAULT_INTERVALS = {'schedule': 300, 'quality': 120, 'budget': 3600, 'governance': 1800, 'opex': 3600}  # Seconds.
+GENERATORS = {'schedule': generate_master_schedule, 'quality': generate_quality_data, 'budget': generate_budget_data,
+              'governance': generate_governance_data, 'opex': generate_op_ex_data}
+STALE_AFTER = 3  # Intervals without a successful refresh before a snapshot counts as stale.
+RETRY_SECONDS = 5  # First retry after a failed refresh; doubles per consecutive failure.
+TICK_SECONDS = 1.0
+STATUS_COLUMNS = ['Source', 'State', 'Version', 'Last Checked', 'Last Changed', 'Age (s)', 'Latency (ms)', 'Interval (s)', 'Refreshes', 'Failures', 'Last Error']
+
+def intervals():
+    """DEFAULT_INTERVALS with the AVITY_REFRESH_INTERVALS overrides applied."""
+    result = dict(DEFAULT_INTERVALS)
+    for item in filter(None, (part.strip() for part in os.environ.get(INTERVALS_ENV, '').split(','))):
+        name, _, seconds = item.partition('=')
+        result[name.strip()] = float(seconds)
+    return result
+
+# --- Sources ---
+class GeneratorSource:
+    """A utils.py generator; its stamp is the day (sample data is dated relative to today) and the stored file, if any."""
+
+    def __init__(self, name, generator):
+        self.name, self.generator = name, generator
+
+    def stamp(self):
+        root = data_dir()
+        if root is None or not has_dataset(self.name, root):
+            return date.today()
+        stat = os.stat(dataset_path(self.name, root))
+        return stat.st_mtime_ns, stat.st_size
+
+    def __call__(self):
+        return self.generator()
+
+class FileSource:
+    """Local stand-in for a CDMO feed: <directory>/<name>.parquet or .csv, conformed to the dataset schema.
+
+    delay (seconds) is slept before every read, to stand in for a slow feed.
+    """
+
+    def __init__(self, name, directory, delay=0.0):
+        self.name, self.delay = name, delay
+        parquet, csv = (os.path.join(directory, f'{name}{ext}') for ext in ('.parquet', '.csv'))
+        self.path = parquet if os.path.exists(parquet) or not os.path.exists(csv) else csv
+
+    def stamp(self):
+        stat = os.stat(self.path)  # A missing file fails the refresh, and the last good snapshot is kept.
+        return stat.st_mtime_ns, stat.st_size
+
+    def __call__(self):
+        if self.delay:
+            time.sleep(self.delay)
+        df = pd.read_parquet(self.path) if self.path.endswith('.parquet') else pd.read_csv(self.path)
+        return conform(self.name, df)
+
+def default_sources(source_dir=None, delays=None):
+    """A source per GENERATORS dataset: a FileSource where source_dir (or AVITY_SOURCE_DIR) has a file for it, else the generator."""
+    source_dir = source_dir or os.environ.get(SOURCE_DIR_ENV)
+    sources = {name: GeneratorSource(name, generator) for name, generator in GENERATORS.items()}
+    if source_dir:
+        for name in sources:
+            if any(os.path.exists(os.path.join(source_dir, f'{name}{ext}')) for ext in ('.parquet', '.csv')):
+                sources[name] = FileSource(name, source_dir, (delays or {}).get(name, 0.0))
+    return sources
+
+# --- Scheduler ---
+class _State:
+    """Last good snapshot of one source and its refresh history."""
+
+    def __init__(self, name, fetch, interval):
+        self.name, self.fetch, self.interval = name, fetch, interval
+        self.frame, self.version, self.key = None, 0, None
+        self.checked_at = self.changed_at = None  # Wall-clock times of the last successful refresh / data change.
+        self.latency = None
+        self.error, self.failures, self.refreshes = None, 0, 0
+        self.next_due = 0.0  # Monotonic time.
+        self.running = None  # Future of the refresh in flight.
+        self.loaded = threading.Event()
+
+class RefreshScheduler:
+    """Background refresher and last-good-snapshot store for a set of named sources."""
+
+    def __init__(self, sources, intervals=None, workers=None):
+        intervals = intervals or {}
+        self._states = {name: _State(name, fetch, intervals.get(name, DEFAULT_INTERVALS.get(name, 300))) for name, fetch in sources.items()}
+        self._pool = ThreadPoolExecutor(max_workers=workers or len(self._states) or 1, thread_name_prefix='refresh')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.token = uuid.uuid4().hex  # Versions restart with every scheduler; caches keyed on them include this too.
+
+    def __contains__(self, name):
+        return name in self._states
+
+    def start(self):
+        """Starts the refresh thread (every source is fetched at once, then on its interval); returns self."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for state in self._states.values():
+                if now >= state.next_due:
+                    self._submit(state)
+            self._stop.wait(TICK_SECONDS)
+
+    def _submit(self, state):
+        with self._lock:
+            if state.running is None and not self._stop.is_set():
+                state.running = self._pool.submit(self._refresh, state)
+            return state.running
+
+    def _refresh(self, state):
+        started = time.perf_counter()
+        try:
+            stamp = state.fetch.stamp() if hasattr(state.fetch, 'stamp') else None
+            frame = key = None
+            if stamp is None or stamp != state.key or state.frame is None:
+                frame = state.fetch()
+                key = stamp if stamp is not None else fingerprint(frame)
+        except Exception as exc:  # A failed refresh keeps serving the last good snapshot.
+            with self._lock:
+                state.error, state.failures = f"{type(exc).__name__}: {exc}", state.failures + 1
+                state.latency = (time.perf_counter() - started) * 1e3
+                state.next_due = time.monotonic() + min(state.interval, RETRY_SECONDS * 2 ** (state.failures - 1))
+                state.running = None
+            return False
+        with self._lock:
+            now = datetime.now()
+            if frame is not None and key != state.key:
+                state.frame, state.key, state.version, state.changed_at = frame, key, state.version + 1, now
+            state.checked_at, state.latency = now, (time.perf_counter() - started) * 1e3
+            state.error, state.failures, state.refreshes = None, 0, state.refreshes + 1
+            state.next_due = time.monotonic() + state.interval
+            state.running = None
+        state.loaded.set()
+        return True
+
+    def refresh(self, name, wait=True):
+        """Refreshes a source now (joining a refresh already in flight); with wait, returns whether it succeeded."""
+        future = self._submit(self._states[name])
+        return future.result() if wait and future is not None else None
+
+    def snapshot(self, name):
+        """The source's last good frame, at once; starts a background refresh when it is past its interval.
+
+        Only the very first read of a source waits for its fetch, and raises if that fetch fails.
+        """
+        state = self._states[name]
+        if state.frame is None:
+            while not state.loaded.is_set():
+                if not self.refresh(name) and state.frame is None:
+                    raise RuntimeError(f"Source '{name}' has no snapshot yet: {state.error}")
+        elif time.monotonic() >= state.next_due:
+            self._submit(state)
+        return state.frame
+
+    def versioned(self, name):
+        """(version, frame) of the last good snapshot, read together."""
+        self.snapshot(name)
+        with self._lock:
+            state = self._states[name]
+            return state.version, state.frame
+
+    def version(self, name):
+        """Snapshot version of the source (0 before its first load); changes whenever its data does."""
+        return self._states[name].version
+
+    def status(self):
+        """One row per source (STATUS_COLUMNS). State is 'loading', 'refreshing', 'fresh', 'stale' or 'failing'."""
+        now = datetime.now()
+        rows = []
+        with self._lock:
+            for name, state in self._states.items():
+                age = (now - state.checked_at).total_seconds() if state.checked_at else None
+                if state.frame is None:
+                    label = 'failing' if state.error else 'loading'
+                elif age is not None and age > STALE_AFTER * state.interval:
+                    label = 'stale'
+                elif state.error:
+                    label = 'failing'
+                else:
+                    label = 'refreshing' if state.running is not None else 'fresh'
+                rows.append([name, label, state.version, state.checked_at, state.changed_at, age, state.latency,
+                             state.interval, state.refreshes, state.failures, state.error])
+        return pd.DataFrame(rows, columns=STATUS_COLUMNS)
+
+def _pairs(items):
+    return {name: float(value) for name, _, value in (item.partition('=') for item in items or [])}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the refresh scheduler against local stand-in sources and print its status.")
+    parser.add_argument('--source-dir', help=f"Directory of <name>.parquet / <name>.csv stand-ins (default: ${SOURCE_DIR_ENV}, else the generators).")
+    parser.add_argument('--interval', nargs='*', metavar='NAME=SECONDS', help="Refresh intervals overriding the defaults.")
+    parser.add_argument('--delay', nargs='*', metavar='NAME=SECONDS', help="Seconds each stand-in read sleeps, to simulate a slow feed.")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run.")
+    parser.add_argument('--every', type=float, default=5, help="Seconds between status reports.")
+    args = parser.parse_args()
+    scheduler = RefreshScheduler(default_sources(args.source_dir, _pairs(args.delay)), intervals() | _pairs(args.interval)).start()
+    deadline = time.monotonic() + args.duration
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        while time.monotonic() < deadline:
+            time.sleep(min(args.every, max(deadline - time.monotonic(), 0)))
+            print(scheduler.status().drop(columns=['Last Changed']).to_string(index=False), end='\n\n', flush=True)
+    scheduler.stop()
@@ -0,0 +1,132 @@
+# schema.py
+"""Column types of every utils.py dataset, applied and checked once at load time.
+
+The generators build their frames from Python literals or read them from the store, where strings
+arrive as plain str columns and dates as datetime.date objects. conform() gives every known column
+its declared type:
+
+- enumerations (Status, Priority, Type, ...) become categoricals with a fixed category list, and a
+  value outside the list is an error rather than a silent NaN;
+- free-form low-cardinality labels (CDMO, Program, Product, ...) become categoricals of their own values;
+- dates become datetime64[ns]; a value that does not parse is an error;
+- counts and scores become compact integers, nullable (Int16) where a value can still be missing.
+Categories are kept in sorted order, so sorting a column orders rows as it did for the strings.
+Columns a dataset does not declare are passed through unchanged, and columns already of the
+declared type are not copied; a frame read back from a store written by synthetic.py is already
+conformed.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORY = 'category'
+DATE = 'datetime64[ns]'
+STRING = 'str'
+
+class SchemaError(ValueError):
+    """A dataset column holds values its declared type cannot represent."""
+
+def enum(*values):
+    return pd.CategoricalDtype(sorted(values))
+
+BATCH_STATUSES = enum('At Risk', 'Awaiting Release', 'Failed', 'In Production', 'Planned', 'Shipped')
+QUALITY_TYPES = enum('CAPA', 'Change Request', 'Deviation')
+QUALITY_STATUSES = enum('Closed', 'Effectiveness Check', 'Investigation', 'Pending Approval', 'Planned', 'Root Cause Analysis')
+PRIORITIES = enum('Critical', 'High', 'Low', 'Medium')
+LEVELS = enum('High', 'Low', 'Medium')
+PROJECT_STATUSES = enum('Complete', 'In Progress', 'Planned')
+
+SCHEMAS = {
+    'cdmo': {
+        'CDMO Name': STRING, 'Location': CATEGORY, 'Status': enum('Active', 'Onboarding'), 'Expertise': CATEGORY,
+        'Avg. On-Time Delivery (%)': 'int16', 'Avg. Batch Success Rate (%)': 'int16', 'Quality Score (1-100)': 'int16',
+        'Avg. Yield (%)': 'int16', 'Batches YTD': 'int32', 'BCP Status': enum('Approved', 'Draft', 'Under Review'), 'BCP Last Reviewed': DATE,
+    },
+    'schedule': {
+        'Batch ID': STRING, 'Product': CATEGORY, 'Program': CATEGORY, 'CDMO': CATEGORY, 'Status': BATCH_STATUSES,
+        'Start Date': DATE, 'End Date': DATE, 'Planned Cycle Time (Days)': 'int16', 'Actual Cycle Time (Days)': 'Int16',
+        'Yield (%)': 'float64', 'Deviation ID': STRING, 'Cost per Batch ($K)': 'int32', 'Suite': CATEGORY,
+    },
+    'quality': {
+        'Record ID': STRING, 'CDMO': CATEGORY, 'Type': QUALITY_TYPES, 'Open Date': DATE, 'Priority': PRIORITIES,
+        'Status': QUALITY_STATUSES, 'Closed Date': DATE, 'Root Cause Category': CATEGORY, 'Batch Impacted': STRING,
+    },
+    'risk': {
+        'Risk ID': STRING, 'CDMO': CATEGORY, 'Impact': 'int16', 'Probability': 'int16', 'Owner': CATEGORY,
+        'Mitigation Status': PROJECT_STATUSES, 'Risk Score': 'int16',
+    },
+    'budget': {'CDMO': CATEGORY, 'Program': CATEGORY, 'Category': CATEGORY},
+    'ledger': {
+        'Line ID': STRING, 'Posted': DATE, 'CDMO': CATEGORY, 'Program': CATEGORY, 'Category': CATEGORY,
+        'Kind': enum('Actual', 'Budget', 'Plan'), 'Document': enum('Budget', 'Invoice', 'Plan'), 'Amount ($M)': 'float64',
+    },
+    'governance': {
+        'Meeting ID': STRING, 'Date': DATE, 'CDMO': CATEGORY, 'Meeting Type': CATEGORY,
+        'Actions Generated': 'int16', 'Actions Closed': 'int16',
+    },
+    'actions': {
+        'Action ID': STRING, 'Meeting ID': STRING, 'CDMO': CATEGORY, 'Meeting Type': CATEGORY,
+        'Event': enum('Closed', 'Opened'), 'Date': DATE, 'Due Date': DATE,
+    },
+    'opex': {
+        'Project ID': STRING, 'Lead': CATEGORY, 'CDMO': CATEGORY, 'Status': PROJECT_STATUSES, 'Start Date': DATE, 'Target Completion': DATE,
+        'Financial Impact ($K/yr)': 'int32', 'Technical Feasibility (1-5)': 'int16', 'Implementation Cost ($K)': 'int32',
+    },
+    'tech_transfer': {
+        'Task ID': STRING, 'Lead Team': CATEGORY, 'Planned Duration (Days)': 'int16', 'Actual Duration (Days)': 'Int16',
+        'Start Date': DATE, 'Risk Level': LEVELS, 'Progress (%)': 'int16', 'Finish Date': DATE,
+    },
+}
+
+def _fail(dataset, column, series, bad, expected):
+    examples = ', '.join(map(repr, pd.unique(series[bad])[:5]))
+    raise SchemaError(f"{dataset}.{column}: {int(bad.sum()):,} value(s) not valid as {expected} (e.g. {examples})")
+
+def _cast(dataset, column, series, dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        cast = series.astype(CATEGORY)  # Factorizing first is much faster than casting to fixed categories directly.
+        unknown = cast.cat.categories.difference(dtype.categories)
+        if len(unknown):
+            _fail(dataset, column, series, series.isin(unknown).to_numpy(), f"one of {list(dtype.categories)}")
+        return cast.cat.set_categories(dtype.categories)
+    if dtype == CATEGORY:
+        return series.astype(CATEGORY)
+    if dtype == STRING:
+        return series.astype(STRING)
+    if dtype == DATE:
+        cast = pd.to_datetime(series, errors='coerce')
+        bad = cast.isna().to_numpy() & series.notna().to_numpy()
+        if bad.any():
+            _fail(dataset, column, series, bad, "a date")
+        return cast.astype(DATE)
+    target = pd.api.types.pandas_dtype(dtype)
+    if target.kind in 'iu' and len(series):  # numpy integers wrap on overflow instead of raising.
+        info = np.iinfo(target.numpy_dtype if hasattr(target, 'numpy_dtype') else target)
+        values = pd.to_numeric(series, errors='coerce')
+        bad = (values < info.min).to_numpy(dtype=bool, na_value=False) | (values > info.max).to_numpy(dtype=bool, na_value=False)
+        if bad.any():
+            _fail(dataset, column, series, bad, str(dtype))
+    try:
+        return series.astype(dtype)
+    except (TypeError, ValueError) as err:
+        raise SchemaError(f"{dataset}.{column}: cannot be stored as {dtype} ({err})") from None
+
+def _matches(current, dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return current == dtype
+    if dtype == CATEGORY:
+        return isinstance(current, pd.CategoricalDtype)
+    if dtype == STRING:
+        return isinstance(current, pd.StringDtype)
+    return current == dtype
+
+def conform(dataset, df):
+    """df with every declared column cast to its schema type; raises SchemaError on invalid values."""
+    schema = SCHEMAS[dataset]
+    casts = {column: _cast(dataset, column, df[column], schema[column])
+             for column in df.columns if column in schema and not _matches(df[column].dtype, schema[column])}
+    return df.assign(**casts) if casts else df
+
+def validate(dataset, df):
+    """Names of the declared columns of df whose dtype differs from the schema (empty once conformed)."""
+    schema = SCHEMAS[dataset]
+    return [column for column in df.columns if column in schema and not _matches(df[column].dtype, schema[column])]
@@ -0,0 +1,163 @@
+# scorecard.py
+"""Batch-computed per-CDMO scorecards, written as a versioned snapshot.
+
+    python scorecard.py --out data/snapshots [--workers N]
+
+build() scores every CDMO across a process pool and returns a ScorecardSnapshot:
+- quarterly OTD and deviations-per-batch trend (utils.generate_cdmo_kpis);
+- Cpk per critical parameter (utils.generate_cpk_data);
+- right-first-time and mean yield from the master schedule;
+- a composite quality score.
+Both the CDMO Drilldown and the home-page performance quadrant read the same snapshot, so a
+partner's latest OTD, yield and quality agree between the two views. Switching CDMOs is a lookup,
+not a computation.
+
+A snapshot's version is a digest of its inputs. write_snapshot() stores the three frames under that
+version and then atomically repoints CURRENT, so readers never see a half-written snapshot.
+load_snapshot(root, version) returns None when the stored snapshot is for other inputs.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import generate_cdmo_data, generate_master_schedule, generate_cdmo_kpis, generate_cpk_data
+
+SNAPSHOT_DIR_ENV = 'AVITY_SNAPSHOT_DIR'
+SCHEMA_VERSION = 1  # Bump when the scorecard definition changes, so older snapshots are rebuilt.
+CHUNK_CDMOS = 32
+POOL_MIN_CDMOS = 256  # Below this a pool costs more to start than it saves.
+CPK_TARGET = 1.33
+SCHEDULE_COLUMNS = ['CDMO', 'Status', 'Yield (%)', 'Deviation ID']
+MASTER_COLUMNS = ['CDMO Name', 'Avg. Yield (%)', 'Batches YTD']
+SUMMARY_COLUMNS = ['CDMO', 'On-Time Delivery (%)', 'Deviations per Batch', 'RFT (%)', 'Avg. Yield (%)', 'Min Cpk', 'Cpk Attainment (%)', 'Quality Score', 'Batches YTD']
+
+def snapshot_dir():
+    return os.environ.get(SNAPSHOT_DIR_ENV) or None
+
+def schedule_inputs(schedule_df):
+    """Per-CDMO shipped batches, shipped batches with a deviation, and yield sum / count: all a scorecard needs from the schedule."""
+    shipped = schedule_df['Status'].eq('Shipped')
+    yields = schedule_df['Yield (%)']
+    frame = pd.DataFrame({'Shipped': shipped, 'Shipped With Deviation': shipped & schedule_df['Deviation ID'].notna(),
+                          'Yield Sum': yields.fillna(0.0), 'Yield Count': yields.notna()})
+    return frame.groupby(schedule_df['CDMO'].to_numpy(), sort=False).sum()
+
+def input_version(master, inputs):
+    """Digest of everything a scorecard is computed from."""
+    digest = hashlib.sha1(str(SCHEMA_VERSION).encode())
+    for frame in (master, inputs):
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+# --- Scoring (runs in the worker processes) ---
+def _score_chunk(rows):
+    """Summary rows, quarterly trend and Cpk for one chunk of CDMOs (master columns joined with schedule_inputs)."""
+    trends, cpks, summary = [], [], []
+    for name, fallback_yield, batches, shipped, with_deviation, yield_sum, yield_count in rows.itertuples(index=False):
+        kpis, cpk = generate_cdmo_kpis(name), generate_cpk_data(name)
+        rft = (1 - with_deviation / shipped) * 100 if shipped else 100.0  # As metrics.right_first_time, per CDMO.
+        attainment = min(cpk['Cpk Value'].min() / CPK_TARGET, 1.0) * 100
+        summary.append((name, kpis['On-Time Delivery (%)'].iloc[-1], kpis['Deviations per Batch'].iloc[-1], rft,
+                        yield_sum / yield_count if yield_count else fallback_yield, cpk['Cpk Value'].min(), attainment, (rft + attainment) / 2, batches))
+        trends.append(kpis.assign(CDMO=name))
+        cpks.append(cpk.assign(CDMO=name))
+    return pd.DataFrame(summary, columns=SUMMARY_COLUMNS), pd.concat(trends), pd.concat(cpks)
+
+class ScorecardSnapshot:
+    """Scorecards for every CDMO: summary (one row each), quarterly trend and Cpk per parameter."""
+
+    def __init__(self, version, summary, trend, cpk):
+        self.version = version
+        self.summary = summary.set_index('CDMO', drop=False)
+        self._trend, self._trend_rows = self._partition(trend)
+        self._cpk, self._cpk_rows = self._partition(cpk)
+
+    @staticmethod
+    def _partition(df):
+        """df sorted by CDMO, plus each CDMO's (start, stop) row range."""
+        df = df.sort_values('CDMO', kind='stable', ignore_index=True)
+        names, starts = np.unique(df['CDMO'].to_numpy(dtype=object), return_index=True)
+        stops = np.append(starts[1:], len(df))
+        return df, dict(zip(names, zip(starts, stops)))
+
+    @staticmethod
+    def _slice(df, rows, cdmo):
+        start, stop = rows[cdmo]
+        return df.iloc[start:stop].drop(columns='CDMO').reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.summary)
+
+    def kpis(self, cdmo):
+        """Quarterly On-Time Delivery (%) and Deviations per Batch (the generate_cdmo_kpis layout)."""
+        return self._slice(self._trend, self._trend_rows, cdmo)
+
+    def cpk(self, cdmo):
+        """Cpk Value per Parameter (the generate_cpk_data layout)."""
+        return self._slice(self._cpk, self._cpk_rows, cdmo)
+
+    def frames(self):
+        return {'summary': self.summary.reset_index(drop=True), 'trend': self._trend, 'cpk': self._cpk}
+
+def prepare(cdmo_df, schedule_df):
+    """(input version, rows to score): the CDMO master joined with its schedule_inputs."""
+    master = cdmo_df[MASTER_COLUMNS].reset_index(drop=True)
+    inputs = schedule_inputs(schedule_df).reindex(master['CDMO Name'].to_numpy(), fill_value=0)
+    rows = pd.concat([master, inputs.reset_index(drop=True)], axis=1)
+    return input_version(master, inputs), rows
+
+def build(cdmo_df, schedule_df, workers=None, prepared=None):
+    """Scores every CDMO; workers=None uses a process pool only from POOL_MIN_CDMOS partners (0 or 1 forces one process)."""
+    version, rows = prepared or prepare(cdmo_df, schedule_df)
+    chunks = [rows.iloc[start:start + CHUNK_CDMOS] for start in range(0, len(rows), CHUNK_CDMOS)]
+    if workers is None:
+        workers = os.cpu_count() if len(rows) >= POOL_MIN_CDMOS else 1
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            results = list(pool.map(_score_chunk, chunks))
+    else:
+        results = [_score_chunk(chunk) for chunk in chunks]
+    summary, trend, cpk = (pd.concat(parts, ignore_index=True) for parts in zip(*results))
+    return ScorecardSnapshot(version, summary, trend, cpk)
+
+# --- Versioned snapshot files ---
+def write_snapshot(snapshot, root):
+    """Writes snapshot under root/<version>/ and repoints root/CURRENT at it."""
+    path = os.path.join(root, snapshot.version)
+    os.makedirs(path, exist_ok=True)
+    for name, df in snapshot.frames().items():
+        df.to_parquet(os.path.join(path, f'{name}.parquet'), index=False)
+    pointer = os.path.join(root, 'CURRENT')
+    with open(pointer + '.tmp', 'w') as f:
+        json.dump({'version': snapshot.version, 'schema': SCHEMA_VERSION, 'cdmos': len(snapshot)}, f)
+    os.replace(pointer + '.tmp', pointer)
+    return path
+
+def load_snapshot(root, version=None):
+    """The current snapshot under root (None if there is none, or it is not for the given input version)."""
+    try:
+        with open(os.path.join(root, 'CURRENT')) as f:
+            current = json.load(f)
+        if version is not None and current['version'] != version:
+            return None
+        path = os.path.join(root, current['version'])
+        frames = {name: pd.read_parquet(os.path.join(path, f'{name}.parquet')) for name in ('summary', 'trend', 'cpk')}
+    except (OSError, ValueError, KeyError, ImportError):  # No snapshot yet, a partial one, or no Parquet engine.
+        return None
+    return ScorecardSnapshot(current['version'], **frames)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compute every CDMO scorecard and write a versioned snapshot.")
+    parser.add_argument('--out', default=snapshot_dir(), help="Snapshot directory (use as AVITY_SNAPSHOT_DIR).")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    if not args.out:
+        parser.error(f"--out is required when {SNAPSHOT_DIR_ENV} is not set.")
+    started = time.perf_counter()
+    snapshot = build(generate_cdmo_data(MASTER_COLUMNS), generate_master_schedule(SCHEDULE_COLUMNS), args.workers)
+    path = write_snapshot(snapshot, args.out)
+    print(f"Wrote {len(snapshot):,} scorecards to {path} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,145 @@
+# spc.py
+"""Batched SPC engine: measurements, control limits, Cpk and run-rule detection for many series at once.
+
+A series is one (batch, parameter) pair. Simulated measurements come from a dedicated
+np.random.Generator per series, seeded from a stable CRC32 of its key, so the same batch draws the
+same data in every process and no global RNG state is touched. Real measurements can be passed in
+through from_measurements(). All statistics and rules run on a (series x points) array.
+"""
+import zlib
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+PARAMETER_SPECS = {
+    'Oligo Concentration': {'mean': 10.0, 'std_dev': 0.2, 'lsl': 9.5, 'usl': 10.5},
+    'pH': {'mean': 7.2, 'std_dev': 0.05, 'lsl': 7.0, 'usl': 7.4},
+}
+N_POINTS = 20
+D2 = 1.128  # Bias constant for moving ranges of two.
+
+# Western Electric rules plus the Nelson trend rule; each entry is flagged on the point completing the pattern.
+RULES = {
+    'WE1': 'One point beyond 3σ',
+    'WE2': '2 of 3 consecutive points beyond 2σ on one side',
+    'WE3': '4 of 5 consecutive points beyond 1σ on one side',
+    'WE4': '8 consecutive points on one side of the center line',
+    'N3': '6 points steadily increasing or decreasing',
+}
+
+def spec_for(parameter):
+    """Process target and specification limits for a parameter (unknown parameters use the pH profile)."""
+    return PARAMETER_SPECS.get(parameter, PARAMETER_SPECS['pH'])
+
+def stable_seed(*keys):
+    """Process-independent 32-bit seed for a key (Python's hash() is salted per process)."""
+    return zlib.crc32('|'.join(map(str, keys)).encode('utf-8'))
+
+def series_keys(batch_ids, parameters):
+    """Every (batch, parameter) combination as a two-column frame, batch-major."""
+    return pd.MultiIndex.from_product([list(batch_ids), list(parameters)], names=['Batch ID', 'Parameter']).to_frame(index=False)
+
+def simulate_measurements(keys, n_points=N_POINTS, seed=0):
+    """Draws n_points measurements for every series in keys from its own Generator stream."""
+    specs = keys['Parameter'].map(spec_for)
+    means = specs.map(lambda s: s['mean']).to_numpy(dtype=float)
+    std_devs = specs.map(lambda s: s['std_dev']).to_numpy(dtype=float)
+    z = np.empty((len(keys), n_points))
+    for i, (batch_id, parameter) in enumerate(zip(keys['Batch ID'], keys['Parameter'])):
+        z[i] = np.random.default_rng([seed, stable_seed(batch_id, parameter)]).standard_normal(n_points)
+    values = means[:, None] + std_devs[:, None] * z
+    # Known process excursions kept from the demo data set: a late downward drift and a mid-batch shift.
+    batch_ids = keys['Batch ID'].astype(str)
+    drift = batch_ids.str.contains('CA-B006').to_numpy()
+    if drift.any() and n_points >= 5:
+        values[drift, -5:] -= np.linspace(0, 0.4, 5)
+    shift = batch_ids.str.contains('CA-B007').to_numpy()
+    if shift.any() and n_points > 10:
+        values[shift, 10:] = means[shift, None] - 0.5 + 1.5 * std_devs[shift, None] * z[shift, 10:]
+        if n_points > 18:
+            values[shift, 18] = keys.loc[shift, 'Parameter'].map(lambda p: spec_for(p)['lsl'] - 0.1).to_numpy()
+    return values
+
+def from_measurements(df, value_col='Value'):
+    """Pivots long real measurements (Batch ID, Parameter, Measurement, value) to keys and a NaN-padded array."""
+    wide = df.pivot_table(index=['Batch ID', 'Parameter'], columns='Measurement', values=value_col, aggfunc='first', sort=True)
+    return wide.index.to_frame(index=False), wide.to_numpy(dtype=float)
+
+def control_limits(keys, values, limits='process'):
+    """Center line and sigma per series.
+
+    'process' uses the established process target and standard deviation of each parameter;
+    'data' estimates both from each series (mean and average moving range / d2).
+    """
+    if limits == 'process':
+        specs = keys['Parameter'].map(spec_for)
+        return specs.map(lambda s: s['mean']).to_numpy(dtype=float), specs.map(lambda s: s['std_dev']).to_numpy(dtype=float)
+    if limits == 'data':
+        return np.nanmean(values, axis=1), np.nanmean(np.abs(np.diff(values, axis=1)), axis=1) / D2
+    raise ValueError(f"Unknown limits mode: {limits}")
+
+def cpk(keys, values):
+    """Process capability per series from its own mean and standard deviation."""
+    specs = keys['Parameter'].map(spec_for)
+    lsl = specs.map(lambda s: s['lsl']).to_numpy(dtype=float); usl = specs.map(lambda s: s['usl']).to_numpy(dtype=float)
+    mean = np.nanmean(values, axis=1); std = np.nanstd(values, axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.minimum(usl - mean, mean - lsl) / (3 * std)
+
+def _window_count(flags, window):
+    """Number of True flags in the window ending at each point (partial windows count as fewer points)."""
+    counts = np.cumsum(flags, axis=1, dtype=np.int32)
+    counts[:, window:] -= counts[:, :-window].copy()
+    return counts
+
+def rule_violations(values, center, sigma):
+    """Boolean (series x points x rules) array, one plane per entry of RULES."""
+    z = (values - center[:, None]) / sigma[:, None]
+    above, below = z > 0, z < 0
+    flags = np.zeros(values.shape + (len(RULES),), dtype=bool)
+    flags[..., 0] = np.abs(z) > 3
+    flags[..., 1] = ((_window_count(z > 2, 3) >= 2) & (z > 2)) | ((_window_count(z < -2, 3) >= 2) & (z < -2))
+    flags[..., 2] = ((_window_count(z > 1, 5) >= 4) & (z > 1)) | ((_window_count(z < -1, 5) >= 4) & (z < -1))
+    flags[..., 3] = (_window_count(above, 8) == 8) | (_window_count(below, 8) == 8)
+    if values.shape[1] >= 6:
+        steps = np.diff(values, axis=1)
+        rising = sliding_window_view(steps > 0, 5, axis=1).all(axis=2)
+        falling = sliding_window_view(steps < 0, 5, axis=1).all(axis=2)
+        flags[:, 5:, 4] = rising | falling
+    return flags
+
+def analyze(keys, values, limits='process'):
+    """Runs limits, Cpk, spec checks and run rules over every series.
+
+    Returns (points, summary): points has one row per measurement with the chart columns used by the
+    Drilldown page plus 'Out of Spec' and 'Rule Violations'; summary has one row per series.
+    """
+    n_series, n_points = values.shape
+    center, sigma = control_limits(keys, values, limits)
+    specs = keys['Parameter'].map(spec_for)
+    lsl = specs.map(lambda s: s['lsl']).to_numpy(dtype=float); usl = specs.map(lambda s: s['usl']).to_numpy(dtype=float)
+    flags = rule_violations(values, center, sigma)
+    out_of_spec = (values > usl[:, None]) | (values < lsl[:, None])
+    rule_codes = np.array(list(RULES), dtype=object)
+    flat_flags = flags.reshape(-1, len(RULES))
+    labels = np.full(len(flat_flags), '', dtype=object)
+    for j, code in enumerate(rule_codes):  # One pass per rule, not per point.
+        hit = flat_flags[:, j]
+        labels[hit] = np.where(labels[hit] == '', code, labels[hit] + ', ' + code)
+    points = pd.DataFrame({
+        'Batch ID': np.repeat(keys['Batch ID'].to_numpy(), n_points), 'Parameter': np.repeat(keys['Parameter'].to_numpy(), n_points),
+        'Measurement': np.tile(np.arange(1, n_points + 1), n_series), 'Value': values.ravel(),
+        'Mean': np.repeat(center, n_points), 'UCL': np.repeat(center + 3 * sigma, n_points), 'LCL': np.repeat(center - 3 * sigma, n_points),
+        'USL': np.repeat(usl, n_points), 'LSL': np.repeat(lsl, n_points), 'Out of Spec': out_of_spec.ravel(), 'Rule Violations': labels,
+    })
+    points = points[~np.isnan(points['Value'].to_numpy())].reset_index(drop=True)
+    summary = keys.assign(**{
+        'Mean': np.nanmean(values, axis=1), 'Cpk': cpk(keys, values), 'Out of Spec Points': out_of_spec.sum(axis=1),
+        'Rule Violations': flags.any(axis=2).sum(axis=1), 'Rules Broken': [', '.join(rule_codes[row]) for row in flags.any(axis=1)],
+    })
+    return points, summary
+
+def run_spc(batch_ids, parameters=('Oligo Concentration',), n_points=N_POINTS, seed=0, limits='process'):
+    """Simulates and analyzes every batch x parameter series in one call."""
+    keys = series_keys(batch_ids, parameters)
+    return analyze(keys, simulate_measurements(keys, n_points, seed), limits)
@@ -0,0 +1,136 @@
+# spend_ledger.py
+"""Transaction-level spend ledger with an incrementally maintained rollup cube.
+
+Finance data arrives as line items (budget, plan and invoice / PO lines). SpendLedger folds each
+appended batch into a cube of CDMO x Program x Category x (Year, Quarter) x Kind cells, so the
+Financial Oversight KPIs, waterfall and quarterly cadence read O(cells) aggregates instead of
+scanning raw spend, however many years of lines have been ingested. Line IDs are remembered, so
+re-sending a line (e.g. a re-exported invoice) does not double count it.
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+LEDGER_COLUMNS = ['Line ID', 'Posted', 'CDMO', 'Program', 'Category', 'Kind', 'Document', 'Amount ($M)']
+KINDS = ('Budget', 'Plan', 'Actual')
+DIMENSIONS = ['CDMO', 'Program', 'Category']
+CUBE_COLUMNS = [*DIMENSIONS, 'Year', 'Quarter', 'Kind', 'Amount ($M)', 'Lines']
+POSITION_COLUMNS = ['Annual Budget ($M)', 'YTD Actuals ($M)', 'Remaining Forecast ($M)', 'Estimate at Completion ($M)']
+
+def lines_from_budget(budget_df, year):
+    """Ledger lines equivalent to a quarterly budget frame (see utils.generate_budget_data).
+
+    Each row becomes an annual budget line dated 1 January, invoice lines for its Q1 / Q2 actuals and
+    plan lines for its Q3 / Q4 plan.
+    """
+    quarter_columns = {'Q1 Actuals ($M)': ('Actual', 'Invoice', f'{year}-02-15'), 'Q2 Actuals ($M)': ('Actual', 'Invoice', f'{year}-05-15'),
+                       'Q3 Plan ($M)': ('Plan', 'Plan', f'{year}-07-01'), 'Q4 Plan ($M)': ('Plan', 'Plan', f'{year}-10-01')}
+    frames = [budget_df[DIMENSIONS].assign(**{'Posted': pd.Timestamp(f'{year}-01-01'), 'Kind': 'Budget', 'Document': 'Budget', 'Amount ($M)': budget_df['Annual Budget ($M)']})]
+    for column, (kind, document, posted) in quarter_columns.items():
+        frames.append(budget_df[DIMENSIONS].assign(**{'Posted': pd.Timestamp(posted), 'Kind': kind, 'Document': document, 'Amount ($M)': budget_df[column]}))
+    lines = pd.concat(frames, ignore_index=True)
+    lines['Line ID'] = [f"LN-{year}-{i:06d}" for i in range(1, len(lines) + 1)]
+    return lines[LEDGER_COLUMNS]
+
+class SpendLedger:
+    """Thread-safe rollup cube over appended ledger lines."""
+
+    def __init__(self):
+        self._cells = {}  # (CDMO, Program, Category, Year, Quarter, Kind) -> [amount, lines]
+        self._line_ids = set()
+        self._frame = None
+        self._lock = threading.Lock()
+        self.last_actual = None  # Latest posting date of an actual line: the books are closed up to here.
+        self.version = 0
+
+    @classmethod
+    def from_lines(cls, lines):
+        ledger = cls()
+        ledger.append(lines)
+        return ledger
+
+    def __len__(self):
+        return len(self._line_ids)
+
+    def append(self, lines):
+        """Folds new lines into the cube in one grouped pass over the batch; returns how many were new."""
+        missing = set(LEDGER_COLUMNS) - set(lines.columns)
+        if missing:
+            raise ValueError(f"Ledger lines are missing column(s): {', '.join(sorted(missing))}")
+        unknown = set(lines['Kind'].unique()) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Unknown ledger kind(s): {', '.join(map(str, sorted(unknown)))}")
+        with self._lock:
+            lines = lines[~lines['Line ID'].isin(self._line_ids)].drop_duplicates('Line ID')
+            if lines.empty:
+                return 0
+            posted = pd.to_datetime(lines['Posted'])
+            batch = lines.assign(Year=posted.dt.year, Quarter=posted.dt.quarter)
+            grouped = batch.groupby([*DIMENSIONS, 'Year', 'Quarter', 'Kind'], sort=False, observed=True)['Amount ($M)'].agg(['sum', 'size'])
+            for key, amount, count in zip(grouped.index, grouped['sum'].to_numpy(), grouped['size'].to_numpy()):
+                cell = self._cells.get(key)
+                if cell is None:
+                    self._cells[key] = [float(amount), int(count)]
+                else:
+                    cell[0] += amount
+                    cell[1] += count
+            self._line_ids.update(lines['Line ID'])
+            actuals = posted[batch['Kind'] == 'Actual']
+            if not actuals.empty and (self.last_actual is None or actuals.max() > self.last_actual):
+                self.last_actual = actuals.max()
+            self._frame = None
+            self.version += 1
+            return len(lines)
+
+    def cube(self):
+        """Every non-empty cell as one row (built once per ledger version)."""
+        with self._lock:
+            if self._frame is None:
+                rows = [(*key, amount, count) for key, (amount, count) in self._cells.items()]
+                self._frame = pd.DataFrame(rows, columns=CUBE_COLUMNS).sort_values(CUBE_COLUMNS[:6], ignore_index=True)
+            return self._frame
+
+    def years(self):
+        return sorted(self.cube()['Year'].unique().tolist())
+
+    def closed_through(self, year):
+        """Last quarter of year with posted actuals: 4 for past years, 0 before any actual of that year."""
+        if self.last_actual is None or year > self.last_actual.year:
+            return 0
+        return 4 if year < self.last_actual.year else self.last_actual.quarter
+
+    def rollup(self, by=DIMENSIONS, year=None, kinds=KINDS):
+        """Amount per group of by (any cube dimensions) for one year or all years."""
+        cube = self.cube()
+        cube = cube[cube['Kind'].isin(kinds) & ((cube['Year'] == year) if year is not None else True)]
+        return cube.groupby(list(by), sort=True, observed=True)[['Amount ($M)', 'Lines']].sum().reset_index()
+
+    def position(self, year, by=DIMENSIONS):
+        """Budget, actuals to date, remaining forecast and estimate at completion per group of by.
+
+        Quarters after the last closed one contribute their full plan; the quarter in progress
+        contributes whatever of its plan has not been invoiced yet. Past years are fully closed.
+        """
+        by = list(by)
+        cube = self.cube()
+        cube = cube[cube['Year'] == year]
+        if cube.empty:
+            return pd.DataFrame(columns=[*by, *POSITION_COLUMNS])
+        current = self.closed_through(year)
+        amounts = cube.pivot_table(index=by, columns=['Kind', 'Quarter'], values='Amount ($M)', aggfunc='sum', fill_value=0.0, observed=True)
+        def kind(name, quarters=range(1, 5)):
+            cols = [(name, q) for q in quarters if (name, q) in amounts.columns]
+            return amounts[cols].sum(axis=1) if cols else pd.Series(0.0, index=amounts.index)
+        position = pd.DataFrame({'Annual Budget ($M)': kind('Budget'), 'YTD Actuals ($M)': kind('Actual')})
+        in_progress = np.maximum(kind('Plan', [current]) - kind('Actual', [current]), 0.0) if current and year == self.last_actual.year else 0.0
+        position['Remaining Forecast ($M)'] = kind('Plan', range(current + 1, 5)) + in_progress
+        position['Estimate at Completion ($M)'] = position['YTD Actuals ($M)'] + position['Remaining Forecast ($M)']
+        return position.reset_index()
+
+    def quarterly(self, year):
+        """Per-quarter totals for the cadence chart: actuals for quarters with postings, plan for planned quarters."""
+        cube = self.cube()
+        cube = cube[(cube['Year'] == year) & cube['Kind'].isin(['Actual', 'Plan'])]
+        totals = cube.groupby(['Quarter', 'Kind'], sort=True, observed=True)['Amount ($M)'].sum().reset_index()
+        totals['Quarter'] = 'Q' + totals['Quarter'].astype(str)
+        return totals.rename(columns={'Kind': 'Type'})
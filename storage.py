@@ -0,0 +1,93 @@
+# storage.py
+"""Parquet backing store for the utils.py datasets.
+
+When the AVITY_DATA_DIR environment variable points at a directory written by write_dataset()
+(see synthetic.py), the generate_* functions read from it instead of their built-in literals.
+Rows are sorted on the dataset's CDMO column and written in bounded row groups, so a CDMO
+predicate is pushed down to the row-group statistics and only the matching groups and the
+requested columns are decoded.
+"""
+import os
+import pandas as pd
+
+DATA_DIR_ENV = 'AVITY_DATA_DIR'
+ROW_GROUP_SIZE = 64_000
+
+# Column that identifies the owning CDMO in each dataset (tech transfer plans are not CDMO-scoped).
+CDMO_COLUMNS = {
+    'cdmo': 'CDMO Name', 'schedule': 'CDMO', 'quality': 'CDMO', 'risk': 'CDMO',
+    'budget': 'CDMO', 'governance': 'CDMO', 'opex': 'CDMO', 'tech_transfer': None, 'ledger': 'CDMO',
+    'actions': 'CDMO',
+}
+# Rows that apply to the whole network are returned alongside any single-CDMO selection.
+NETWORK_WIDE_CDMOS = ['All', 'Global']
+
+def data_dir():
+    """Returns the configured store directory, or None when the built-in literals should be used."""
+    return os.environ.get(DATA_DIR_ENV) or None
+
+def dataset_path(name, root=None):
+    if name not in CDMO_COLUMNS:
+        raise KeyError(f"Unknown dataset: {name}")
+    root = root or data_dir()
+    return os.path.join(root, f"{name}.parquet") if root else None
+
+def has_dataset(name, root=None):
+    path = dataset_path(name, root)
+    return path is not None and os.path.exists(path)
+
+def _cdmo_filter(name, cdmo):
+    cdmo_col = CDMO_COLUMNS[name]
+    if cdmo is None:
+        return None
+    if cdmo_col is None:
+        raise ValueError(f"Dataset '{name}' cannot be filtered by CDMO.")
+    return cdmo_col, [cdmo, *NETWORK_WIDE_CDMOS]
+
+def store_version(root=None):
+    """Modification stamp of every stored dataset (None without a store); changes whenever a file is rewritten."""
+    root = root or data_dir()
+    if root is None:
+        return None
+    stamps = []
+    for name in CDMO_COLUMNS:
+        if has_dataset(name, root):
+            stat = os.stat(dataset_path(name, root))
+            stamps.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
+
+def write_dataset(name, df, root=None):
+    """Writes one dataset to the store, sorted on its CDMO column for row-group pruning."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    path = dataset_path(name, root)
+    if path is None:
+        raise ValueError(f"No store directory given and {DATA_DIR_ENV} is not set.")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cdmo_col = CDMO_COLUMNS[name]
+    if cdmo_col is not None:
+        df = df.sort_values(cdmo_col, kind='stable')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)  # Readers never observe a half-written file.
+    return path
+
+def read_dataset(name, columns=None, cdmo=None, root=None):
+    """Reads a dataset with column projection and CDMO predicate pushdown; None if it is not stored."""
+    if not has_dataset(name, root):
+        return None
+    import pyarrow.parquet as pq
+    cdmo_filter = _cdmo_filter(name, cdmo)
+    filters = [(cdmo_filter[0], 'in', cdmo_filter[1])] if cdmo_filter else None
+    table = pq.read_table(dataset_path(name, root), columns=list(columns) if columns else None, filters=filters)
+    return table.to_pandas(date_as_object=False)  # Date columns arrive as datetime64, not datetime.date objects.
+
+def select(df, name, columns=None, cdmo=None):
+    """Applies the same projection and CDMO predicate as read_dataset() to an in-memory frame."""
+    cdmo_filter = _cdmo_filter(name, cdmo)
+    if cdmo_filter:
+        df = df[df[cdmo_filter[0]].isin(cdmo_filter[1])]
+    if columns:
+        df = df[list(columns)]
+    return df.reset_index(drop=True) if cdmo_filter else df
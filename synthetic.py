@@ -0,0 +1,272 @@
+# synthetic.py
+"""Scalable synthetic generator for the utils.py datasets.
+
+Produces frames with exactly the columns and value domains of the built-in generators, at
+configurable network size, and optionally writes them to the Parquet store read by utils.py:
+
+    python synthetic.py --out data/scale --cdmos 200 --batches 500000 --quality 2000000
+    AVITY_DATA_DIR=data/scale streamlit run app.py
+
+Cross references are kept consistent: every 'Batch Impacted' names a batch at the same CDMO,
+and batches carry the ID of their most recent deviation in 'Deviation ID'.
+"""
+import argparse
+import heapq
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+from storage import write_dataset
+from schema import conform
+from action_items import actions_from_meetings
+
+SEED_CDMOS = ['Catalent Pharma', 'WuXi Biologics', 'Lonza Group', 'Fujifilm Diosynth']
+LOCATIONS = ['Bloomington, IN, USA', 'Dundalk, Ireland', 'Visp, Switzerland', 'Hillerød, Denmark', 'Research Triangle Park, NC, USA', 'Singapore', 'Shanghai, China', 'Basel, Switzerland']
+EXPERTISE = ['Antibody Production', 'Oligonucleotide Synthesis', 'AOC Conjugation & Fill-Finish']
+PROGRAMS = {'DM1': 'AOC-1001', 'DMD': 'AOC-1021', 'FSHD': 'AOC-1044'}
+BATCH_STATUSES = ['In Production', 'At Risk', 'Awaiting Release', 'Shipped', 'Planned', 'Failed']
+QUALITY_TYPES = {'Deviation': 'DEV', 'CAPA': 'CAPA', 'Change Request': 'CR'}
+QUALITY_STATUSES = ['Investigation', 'Effectiveness Check', 'Pending Approval', 'Root Cause Analysis', 'Planned', 'Closed']
+PRIORITIES = ['Critical', 'High', 'Medium', 'Low']
+ROOT_CAUSES = ['Human Error', 'Procedure Not Followed', 'Contamination', 'Equipment Failure', 'Raw Material', 'Documentation']
+RISK_TEMPLATES = [
+    ('SUP', 'Single-source for critical raw material faces shipping delays.', 'Supply Chain', 'Qualify second supplier (Project {project}).'),
+    ('TECH', 'New conjugation process shows yield variability at scale.', 'Tech Dev', 'Perform DOE to optimize process parameters.'),
+    ('COMP', 'Upcoming inspection may scrutinize data integrity.', 'Quality', 'Conduct internal audit and data review.'),
+    ('GEO', 'Geopolitical tensions could impact shipping lanes.', 'Manager', 'Increase safety stock at domestic warehouse.'),
+    ('PERS', 'Key technical lead at CDMO has high turnover risk.', 'Manager', 'Establish knowledge transfer plan and identify backup.'),
+]
+MEETING_TYPES = ['Quarterly Business Review', 'Technical Working Group', 'Audit', 'Virtual Plant Team']
+TT_TASKS = ['Define Scope & Assemble VPT', 'Approve Tech Transfer Plan', 'Transfer Process & Analytical Methods', 'Complete Facility Fit & Gap Analysis', 'Qualify Raw Materials', 'Execute Engineering Batch', 'Execute 3x PPQ Batches']
+TT_TEAMS = ['Ops', 'QA', 'Tech Dev', 'Engineering', 'Supply Chain', 'CDMO/Ops', 'CDMO/Ops']
+TT_PREDECESSORS = [[], [1], [2], [3], [3], [4, 5], [6]]  # Phase numbers each step waits for, within its program.
+
+def _dates(as_of, offsets):
+    """Converts integer day offsets from as_of into an object array of datetime.date, as the generators emit."""
+    return pd.Series(np.datetime64(as_of, 'D') + offsets.astype('timedelta64[D]')).dt.date.to_numpy(dtype=object, copy=True)
+
+def _ids(prefix, numbers, width):
+    return prefix + pd.Series(numbers).astype(str).str.zfill(width).to_numpy(dtype=object)
+
+def _cdmo_names(n_cdmos):
+    return np.array(SEED_CDMOS[:n_cdmos] + [f"Partner CDMO {i:03d}" for i in range(len(SEED_CDMOS), n_cdmos)], dtype=object)
+
+def synthetic_cdmo_data(rng, names, batches_ytd):
+    n = len(names)
+    reviewed = _dates(date.today(), -rng.integers(0, 720, n)); reviewed[rng.random(n) < 0.1] = None
+    return pd.DataFrame({
+        'CDMO Name': names, 'Location': rng.choice(LOCATIONS, n), 'Status': rng.choice(['Active', 'Onboarding'], n, p=[0.85, 0.15]),
+        'Expertise': rng.choice(EXPERTISE, n), 'Avg. On-Time Delivery (%)': rng.integers(80, 101, n), 'Avg. Batch Success Rate (%)': rng.integers(85, 101, n),
+        'Quality Score (1-100)': rng.integers(70, 101, n), 'Avg. Yield (%)': rng.integers(70, 96, n), 'Batches YTD': batches_ytd,
+        'BCP Status': rng.choice(['Approved', 'Under Review', 'Draft'], n, p=[0.6, 0.25, 0.15]), 'BCP Last Reviewed': reviewed,
+    })
+
+def synthetic_master_schedule(rng, names, n_batches, as_of):
+    cdmo_idx = rng.integers(0, len(names), n_batches)
+    programs = rng.choice(list(PROGRAMS), n_batches)
+    status = rng.choice(BATCH_STATUSES, n_batches, p=[0.15, 0.05, 0.1, 0.55, 0.1, 0.05])
+    planned = rng.integers(30, 121, n_batches)
+    start = rng.integers(-720, 0, n_batches); start[status == 'Planned'] = rng.integers(1, 120, (status == 'Planned').sum())
+    actual = (planned + np.rint(rng.normal(2, 4, n_batches))).astype(float); actual[status == 'Planned'] = np.nan
+    yields = rng.normal(85, 4, n_batches).round(1); yields[np.isin(status, ['Planned', 'At Risk', 'In Production'])] = np.nan
+    yields[status == 'Failed'] = rng.normal(45, 10, (status == 'Failed').sum()).round(1)
+    codes = pd.Series(names).str.replace(r'[^A-Za-z]', '', regex=True).str[:2].str.upper().to_numpy(dtype=object)
+    return pd.DataFrame({
+        'Batch ID': 'AVC-' + programs.astype(object) + '-' + codes[cdmo_idx] + _ids('-B', np.arange(1, n_batches + 1), 6),
+        'Product': pd.Series(programs).map(PROGRAMS).to_numpy(dtype=object), 'Program': programs, 'CDMO': names[cdmo_idx], 'Status': status,
+        'Start Date': _dates(as_of, start), 'End Date': _dates(as_of, start + np.nan_to_num(actual, nan=planned).astype(int)),
+        'Planned Cycle Time (Days)': planned, 'Actual Cycle Time (Days)': actual, 'Yield (%)': yields,
+        'Deviation ID': np.full(n_batches, None, dtype=object), 'Cost per Batch ($K)': rng.integers(700, 951, n_batches),
+        'Suite': _assign_suites(rng, cdmo_idx, start, start + np.nan_to_num(actual, nan=planned).astype(int)),
+    })
+
+def _assign_suites(rng, cdmos, start, end, double_booked=0.005):
+    """Suite per batch: greedy interval partitioning per CDMO, then a small share moved to a random busy suite."""
+    suites = np.zeros(len(start), dtype=np.int64)
+    order = np.lexsort((start, cdmos))
+    n_suites = {}
+    free_at, cdmo = [], None
+    for i in order:
+        if cdmos[i] != cdmo:
+            if cdmo is not None:
+                n_suites[cdmo] = len(free_at)
+            free_at, cdmo = [], cdmos[i]
+        if free_at and free_at[0][0] <= start[i]:
+            _, suite = heapq.heapreplace(free_at, (end[i], free_at[0][1]))
+        else:
+            suite = len(free_at)
+            heapq.heappush(free_at, (end[i], suite))
+        suites[i] = suite
+    if cdmo is not None:
+        n_suites[cdmo] = len(free_at)
+    moved = np.flatnonzero(rng.random(len(start)) < double_booked)
+    suites[moved] = (rng.random(len(moved)) * pd.Series(cdmos[moved]).map(n_suites).to_numpy()).astype(np.int64)
+    return _ids('Suite ', suites + 1, 1)
+
+def synthetic_quality_data(rng, schedule, n_records, as_of):
+    types = rng.choice(list(QUALITY_TYPES), n_records, p=[0.6, 0.25, 0.15])
+    batch_idx = rng.integers(0, len(schedule), n_records)
+    opened = -rng.integers(0, 730, n_records)
+    status = rng.choice(QUALITY_STATUSES, n_records, p=[0.1, 0.05, 0.05, 0.05, 0.05, 0.7])
+    closed = np.minimum(opened + rng.integers(1, 120, n_records), 0)
+    closed_dates = _dates(as_of, closed); closed_dates[status != 'Closed'] = None
+    root_causes = rng.choice(ROOT_CAUSES, n_records).astype(object); root_causes[types == 'Change Request'] = None
+    batches = schedule['Batch ID'].to_numpy()[batch_idx].astype(object, copy=True); batches[rng.random(n_records) < 0.2] = None
+    years = pd.Series(pd.to_datetime(_dates(as_of, opened)).year % 100).astype(str).to_numpy(dtype=object)
+    record_ids = pd.Series(types).map(QUALITY_TYPES).to_numpy(dtype=object) + '-' + years + _ids('-', np.arange(1, n_records + 1), 7)
+    quality = pd.DataFrame({
+        'Record ID': record_ids, 'CDMO': schedule['CDMO'].to_numpy()[batch_idx], 'Type': types, 'Open Date': _dates(as_of, opened),
+        'Priority': rng.choice(PRIORITIES, n_records, p=[0.05, 0.25, 0.45, 0.25]), 'Status': status, 'Closed Date': closed_dates,
+        'Root Cause Category': root_causes, 'Batch Impacted': batches,
+    })
+    # Link each impacted batch back to its most recent deviation.
+    deviations = quality[(types == 'Deviation') & pd.notna(batches)].sort_values('Open Date').drop_duplicates('Batch Impacted', keep='last')
+    deviation_ids = schedule['Batch ID'].map(deviations.set_index('Batch Impacted')['Record ID'])
+    schedule['Deviation ID'] = deviation_ids.astype(object).where(deviation_ids.notna(), None)
+    return quality
+
+def synthetic_risk_register(rng, names, n_risks, n_projects):
+    templates = rng.integers(0, len(RISK_TEMPLATES), n_risks)
+    cat, desc, owner, strategy = (np.array([t[i] for t in RISK_TEMPLATES], dtype=object) for i in range(4))
+    projects = _ids('OpEx-', rng.integers(1, max(n_projects, 1) + 1, n_risks), 3)
+    cdmos = names[rng.integers(0, len(names), n_risks)]; cdmos[rng.random(n_risks) < 0.02] = 'All'
+    df = pd.DataFrame({
+        'Risk ID': 'RSK-' + cat[templates] + _ids('-', np.arange(1, n_risks + 1), 5), 'CDMO': cdmos, 'Description': desc[templates],
+        'Impact': rng.integers(1, 6, n_risks), 'Probability': rng.integers(1, 6, n_risks), 'Owner': owner[templates],
+        'Mitigation Strategy': [s.format(project=p) for s, p in zip(strategy[templates], projects)],
+        'Mitigation Status': rng.choice(['Planned', 'In Progress', 'Complete'], n_risks),
+    })
+    df['Risk Score'] = df['Impact'] * df['Probability']
+    return df.sort_values(by='Risk Score', ascending=False)
+
+def synthetic_budget_data(rng, names):
+    n = len(names)
+    cdmos = np.concatenate([names, ['Global', 'Global']])
+    quarters = rng.uniform(0.3, 7.0, (n + 2, 4)).round(1)
+    df = pd.DataFrame({
+        'CDMO': cdmos, 'Program': np.concatenate([rng.choice(list(PROGRAMS), n), ['All', 'All']]),
+        'Category': ['External Manufacturing'] * n + ['Supporting Activities'] * 2,
+        'Annual Budget ($M)': (quarters.sum(axis=1) * rng.uniform(0.9, 1.15, n + 2)).round(1),
+        'Q1 Actuals ($M)': quarters[:, 0], 'Q2 Actuals ($M)': quarters[:, 1], 'Q3 Plan ($M)': quarters[:, 2], 'Q4 Plan ($M)': quarters[:, 3],
+    })
+    df['YTD Actuals ($M)'] = df['Q1 Actuals ($M)'] + df['Q2 Actuals ($M)']
+    df['Remaining Forecast ($M)'] = df['Q3 Plan ($M)'] + df['Q4 Plan ($M)']
+    df['Estimate at Completion ($M)'] = df['YTD Actuals ($M)'] + df['Remaining Forecast ($M)']
+    return df
+
+def synthetic_spend_ledger(rng, budget_df, as_of, years=3, invoices_per_quarter=12):
+    """Budget, plan and invoice lines for every budget row over the last years fiscal years (see spend_ledger.py).
+
+    Earlier years are scaled down by 6% a year; closed quarters are invoiced at 85-115% of plan and the
+    quarter in progress pro rata to the days elapsed.
+    """
+    as_of = pd.Timestamp(as_of)
+    dims = budget_df[['CDMO', 'Program', 'Category']].to_numpy(dtype=object)
+    plan = budget_df[['Q1 Actuals ($M)', 'Q2 Actuals ($M)', 'Q3 Plan ($M)', 'Q4 Plan ($M)']].to_numpy(dtype=float)
+    n = len(budget_df)
+    frames = []
+    for year in range(as_of.year - years + 1, as_of.year + 1):
+        scale = 1.06 ** (year - as_of.year)
+        frames.append(pd.DataFrame({'Posted': pd.Timestamp(year, 1, 1), 'Cell': np.arange(n), 'Kind': 'Budget', 'Document': 'Budget', 'Amount ($M)': budget_df['Annual Budget ($M)'].to_numpy() * scale}))
+        starts = pd.PeriodIndex([pd.Period(year=year, quarter=q, freq='Q') for q in range(1, 5)])
+        q_start, q_end = starts.start_time, starts.end_time.normalize() + pd.Timedelta(days=1)
+        frames.append(pd.DataFrame({'Posted': np.tile(q_start, n), 'Cell': np.repeat(np.arange(n), 4), 'Kind': 'Plan', 'Document': 'Plan', 'Amount ($M)': (plan * scale).ravel()}))
+        for q in range(4):
+            if q_start[q] > as_of:
+                break
+            elapsed = min((as_of - q_start[q]) / (q_end[q] - q_start[q]), 1.0)
+            weights = rng.random((n, invoices_per_quarter))
+            amounts = (plan[:, q] * scale * rng.uniform(0.85, 1.15, n) * elapsed)[:, None] * weights / weights.sum(axis=1, keepdims=True)
+            span_days = max((min(q_end[q], as_of + pd.Timedelta(days=1)) - q_start[q]).days, 1)
+            frames.append(pd.DataFrame({
+                'Posted': q_start[q] + pd.to_timedelta(rng.integers(0, span_days, n * invoices_per_quarter), unit='D'),
+                'Cell': np.repeat(np.arange(n), invoices_per_quarter), 'Kind': 'Actual', 'Document': 'Invoice', 'Amount ($M)': amounts.ravel(),
+            }))
+    lines = pd.concat(frames, ignore_index=True)
+    lines[['CDMO', 'Program', 'Category']] = dims[lines.pop('Cell').to_numpy()]
+    lines['Amount ($M)'] = lines['Amount ($M)'].round(4)
+    lines['Line ID'] = _ids('LN-', np.arange(1, len(lines) + 1), 8)
+    return lines[['Line ID', 'Posted', 'CDMO', 'Program', 'Category', 'Kind', 'Document', 'Amount ($M)']]
+
+def synthetic_governance_data(rng, names, n_meetings, as_of):
+    generated = rng.integers(0, 9, n_meetings)
+    return pd.DataFrame({
+        'Meeting ID': _ids('MTG-', np.arange(1, n_meetings + 1), 6), 'Date': _dates(as_of, -rng.integers(0, 730, n_meetings)), 'CDMO': names[rng.integers(0, len(names), n_meetings)],
+        'Meeting Type': rng.choice(MEETING_TYPES, n_meetings), 'Key Topics': 'Review KPIs and open actions.',
+        'Actions Generated': generated, 'Actions Closed': rng.integers(0, generated + 1),
+    })
+
+def synthetic_op_ex_data(rng, names, n_projects, as_of):
+    start = -rng.integers(0, 365, n_projects)
+    df = pd.DataFrame({
+        'Project ID': _ids('OpEx-', np.arange(1, n_projects + 1), 3), 'Title': rng.choice(['Improve Conjugation Yield', 'Reduce Cycle Time for Antibody Prod.', 'Qualify 2nd Supplier for Oligo', 'Automate Deviation Trending'], n_projects),
+        'Lead': rng.choice(['Tech Dev', 'Manager', 'Supply Chain', 'Quality'], n_projects), 'CDMO': names[rng.integers(0, len(names), n_projects)],
+        'Status': rng.choice(['In Progress', 'Complete', 'Planned'], n_projects), 'Start Date': _dates(as_of, start),
+        'Target Completion': _dates(as_of, start + rng.integers(60, 360, n_projects)), 'Financial Impact ($K/yr)': rng.integers(50, 1501, n_projects),
+        'Technical Feasibility (1-5)': rng.integers(1, 6, n_projects), 'Implementation Cost ($K)': rng.integers(20, 301, n_projects),
+    })
+    df['ROI'] = df['Financial Impact ($K/yr)'] / df['Implementation Cost ($K)']
+    return df
+
+def synthetic_tech_transfer_data(rng, n_tasks, as_of):
+    step = np.arange(n_tasks) % len(TT_TASKS)
+    phase = step + 1
+    program = np.arange(n_tasks) // len(TT_TASKS) + 1
+    planned = rng.integers(5, 61, n_tasks)
+    start = pd.Timestamp(as_of) + pd.to_timedelta(rng.integers(-240, 120, n_tasks), unit='D')
+    progress = np.where(start + pd.to_timedelta(planned, unit='D') < pd.Timestamp(as_of), 100, rng.choice([0, 20, 50, 75], n_tasks))
+    actual = np.where(progress == 100, planned + rng.integers(-2, 8, n_tasks), np.nan)
+    df = pd.DataFrame({
+        'Task ID': _ids('TT-', phase, 1) + _ids('.', program, 1), 'Task': np.array(TT_TASKS, dtype=object)[step] + _ids(' #', program, 1),
+        'Lead Team': np.array(TT_TEAMS, dtype=object)[step], 'Planned Duration (Days)': planned, 'Actual Duration (Days)': actual,
+        'Start Date': start, 'Risk Level': rng.choice(['Low', 'Medium', 'High'], n_tasks), 'Progress (%)': progress,
+    })
+    suffix = _ids('.', program, 1)
+    predecessors = np.full(n_tasks, '', dtype=object)
+    for i, phases in enumerate(TT_PREDECESSORS):
+        mask = step == i
+        for j, phase in enumerate(phases):
+            predecessors[mask] = predecessors[mask] + (', ' if j else '') + f'TT-{phase}' + suffix[mask]
+    df['Predecessors'] = predecessors
+    df['Finish Date'] = df['Start Date'] + pd.to_timedelta(df['Planned Duration (Days)'], unit='D')
+    return df
+
+def generate_synthetic_datasets(n_cdmos=200, n_batches=500_000, n_quality=2_000_000, n_tasks=10_000, seed=0, as_of=None):
+    """Builds every utils.py dataset at the requested scale; returns a dict keyed by storage dataset name."""
+    rng = np.random.default_rng(seed)
+    as_of = as_of or date.today()
+    names = _cdmo_names(n_cdmos)
+    n_projects = max(4, n_cdmos // 2)
+    schedule = synthetic_master_schedule(rng, names, n_batches, as_of)
+    quality = synthetic_quality_data(rng, schedule, n_quality, as_of)
+    batches_ytd = schedule['CDMO'].value_counts().reindex(names, fill_value=0).to_numpy()
+    budget = synthetic_budget_data(rng, names)
+    governance = synthetic_governance_data(rng, names, n_cdmos * 24, as_of)
+    return {
+        'cdmo': synthetic_cdmo_data(rng, names, batches_ytd), 'schedule': schedule, 'quality': quality,
+        'risk': synthetic_risk_register(rng, names, n_cdmos * 5, n_projects), 'budget': budget, 'ledger': synthetic_spend_ledger(rng, budget, as_of),
+        'governance': governance, 'actions': actions_from_meetings(governance, as_of, seed), 'opex': synthetic_op_ex_data(rng, names, n_projects, as_of),
+        'tech_transfer': synthetic_tech_transfer_data(rng, n_tasks, as_of),
+    }
+
+def write_synthetic_store(root, **scale):
+    """Generates the synthetic datasets and writes them to the Parquet store at root."""
+    datasets = generate_synthetic_datasets(**scale)
+    for name, df in datasets.items():
+        write_dataset(name, conform(name, df), root)  # Stored typed, so reads need no conversion.
+    return {name: len(df) for name, df in datasets.items()}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic Parquet store for the dashboard.")
+    parser.add_argument('--out', required=True, help="Store directory (use as AVITY_DATA_DIR).")
+    parser.add_argument('--cdmos', type=int, default=200)
+    parser.add_argument('--batches', type=int, default=500_000)
+    parser.add_argument('--quality', type=int, default=2_000_000)
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = write_synthetic_store(args.out, n_cdmos=args.cdmos, n_batches=args.batches, n_quality=args.quality, n_tasks=args.tasks, seed=args.seed)
+    for name, rows in counts.items():
+        print(f"{name:>14}: {rows:>10,} rows")
+    print(f"Wrote {args.out} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,90 @@
+# tests/test_tech_transfer_hub.py
+"""Tests for the Tech Transfer Hub Gantt on the schema-conformed dataset, plus page smoke runs.
+
+    python -m pytest tests
+"""
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+from critical_path import CriticalPath
+from gantt import build_gantt, collapse_phases, task_phases
+from metrics import actual_finish, finish_variance_days
+from utils import generate_tech_transfer_data
+
+PAGE = os.path.join(ROOT, 'pages', 'C_Tech_Transfer_Hub.py')
+logging.disable(logging.WARNING)  # AppTest runs in bare mode and warns on every rerun.
+
+@pytest.fixture(scope='module')
+def tasks():
+    df = generate_tech_transfer_data()  # Conformed: Lead Team and Risk Level are categoricals.
+    finish = actual_finish(df)
+    cpm = CriticalPath.from_frame(df)
+    critical = pd.Series(cpm.critical, index=cpm.task_ids).reindex(df['Task ID']).fillna(False).to_numpy(dtype=bool)
+    return df.assign(**{'Variance (Days)': finish_variance_days(df, finish), 'Critical': critical})
+
+def _segment_bounds(trace):
+    """Starts and ends of a WebGL segment trace (start, end, gap triples), as serialized for the browser.
+
+    Plotly reads numbers on a date axis as epoch milliseconds, so the values must serialize as dates.
+    """
+    x = json.loads(pio.to_json(trace))['x']
+    starts, ends = x[0::3], x[1::3]
+    assert all(isinstance(value, str) for value in starts + ends), starts[:3]
+    return pd.to_datetime(pd.Series(starts)), pd.to_datetime(pd.Series(ends))
+
+@pytest.mark.parametrize('expanded', [None, 'all', ['Phase 3'], ['Phase 1', 'Phase 5'], []])
+def test_collapse_keeps_expanded_tasks_and_one_row_per_collapsed_phase(tasks, expanded):
+    phases = sorted(task_phases(tasks).unique())
+    expanded = phases if expanded == 'all' else expanded
+    gantt_df = collapse_phases(tasks, expanded)
+    collapsed = [] if expanded is None else sorted(set(phases) - set(expanded))
+    kept = task_phases(tasks).isin(phases if expanded is None else expanded)
+    summary = gantt_df[gantt_df['Task'].str.startswith('▸')]
+    assert sorted(summary['Phase']) == collapsed
+    assert len(gantt_df) == int(kept.sum()) + len(collapsed)
+    for phase in collapsed:  # Each summary row spans its phase and is critical when any of its tasks is.
+        members, row = tasks[task_phases(tasks) == phase], summary[summary['Phase'] == phase].iloc[0]
+        assert row['Start Date'] == members['Start Date'].min() and row['Finish Date'] == members['Finish Date'].max()
+        assert row['Critical'] == members['Critical'].any()
+
+@pytest.mark.parametrize('expanded', [None, ['Phase 3'], []])
+def test_webgl_segments_are_dated_inside_the_task_window(tasks, expanded):
+    gantt_df = collapse_phases(tasks, expanded)
+    fig = build_gantt(gantt_df, critical=gantt_df['Critical'], webgl=True)
+    low, high = gantt_df['Start Date'].min(), gantt_df['Finish Date'].max()
+    planned = next(trace for trace in fig.data if trace.name == 'Planned')
+    starts, ends = _segment_bounds(planned)
+    assert starts.tolist() == gantt_df['Start Date'].tolist() and ends.tolist() == gantt_df['Finish Date'].tolist()
+    progress = [trace for trace in fig.data if trace.name.endswith(' Risk')]
+    assert sum(len(trace.x) // 3 for trace in progress) == len(gantt_df)
+    for trace in progress:
+        starts, ends = _segment_bounds(trace)
+        assert starts.between(low, high).all() and ends.between(low, high).all() and (ends >= starts).all()
+
+def test_critical_tasks_are_outlined(tasks):
+    fig = build_gantt(tasks, critical=tasks['Critical'], webgl=False)
+    progress, milestones = fig.data[1], fig.data[2]
+    critical = tasks['Critical'].to_numpy()
+    assert critical.any() and not critical.all()
+    assert (np.asarray(progress.marker.line.width) == np.where(critical, 2, 0)).all()
+    assert (np.asarray(progress.marker.line.color) == critical.astype(int)).all()
+    assert (np.asarray(milestones.marker.size) == np.where(critical, 16, 14)).all()
+
+@pytest.mark.parametrize('expanded', ['all', ['Phase 3'], []])
+def test_page_renders_with_expanded_phases(expanded):
+    at = AppTest.from_file(PAGE, default_timeout=120).run()
+    assert not at.exception, [e.message for e in at.exception]
+    selector = next(m for m in at.multiselect if m.label == "Expand phases")
+    selector.set_value(selector.options if expanded == 'all' else expanded).run()
+    assert not at.exception, [e.message for e in at.exception]
@@ -0,0 +1,154 @@
+# trendlines.py
+"""NumPy trendlines for scatter charts: OLS, rolling mean and LOWESS, plus binned aggregation.
+
+Replaces px.scatter(trendline=...), which imports and fits statsmodels on every rerun just to draw
+a straight line. Datetime x values are fitted in days since the epoch. Only the 'ols_ci' method (a
+linear fit with a confidence band) imports statsmodels, and only when it is requested.
+"""
+import importlib.util
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+TREND_LABELS = {
+    'ols': "Linear (OLS)", 'rolling': "Rolling mean", 'lowess': "LOWESS",
+    'ols_ci': "Linear with 95% CI (statsmodels)",
+}
+MAX_MARKERS = 5_000  # Scatter charts above this size show binned summaries instead of raw markers.
+NS_PER_DAY = 86_400 * 10**9
+
+def available_methods():
+    """Trend methods usable in this environment (ols_ci needs statsmodels, which is not imported here)."""
+    has_statsmodels = importlib.util.find_spec('statsmodels') is not None
+    return [m for m in TREND_LABELS if m != 'ols_ci' or has_statsmodels]
+
+# --- Fitting ---
+def _numeric(x):
+    """Float x values and a function that maps floats back to x's type (datetimes become days)."""
+    if pd.api.types.is_datetime64_any_dtype(x):
+        days = x.astype('datetime64[ns]').astype('int64').to_numpy() / NS_PER_DAY
+        return days, lambda v: pd.to_datetime(np.round(np.asarray(v) * NS_PER_DAY).astype('int64'), unit='ns')
+    return x.to_numpy(dtype=float), np.asarray
+
+def _clean(x, y):
+    """Drops missing pairs and sorts by x; returns float x, float y and the inverse x mapping."""
+    x, y = pd.Series(x).reset_index(drop=True), pd.Series(y).reset_index(drop=True)
+    keep = (x.notna() & y.notna()).to_numpy()
+    xf, to_x = _numeric(x[keep])
+    yf = y[keep].to_numpy(dtype=float)
+    order = np.argsort(xf, kind='stable')
+    return xf[order], yf[order], to_x
+
+def _ols(xf, yf):
+    """(slope, intercept, r_squared) of the least-squares line."""
+    if len(xf) < 2 or np.ptp(xf) == 0:
+        return np.nan, np.nan, np.nan
+    dx, dy = xf - xf.mean(), yf - yf.mean()
+    slope = (dx @ dy) / (dx @ dx)
+    residual = dy - slope * dx
+    ss_total = dy @ dy
+    return slope, yf.mean() - slope * xf.mean(), 1 - (residual @ residual) / ss_total if ss_total else np.nan
+
+def ols(x, y):
+    """Least-squares line of y on x: (slope, intercept, r_squared); the slope is per day for datetime x."""
+    xf, yf, _ = _clean(x, y)
+    return _ols(xf, yf)
+
+def _rolling(xf, yf, window, n_eval):
+    """Trailing mean over window points, sampled at up to n_eval positions along x."""
+    window = min(window, len(yf))
+    sums = np.concatenate([[0.0], np.cumsum(yf)])
+    idx = np.unique(np.linspace(window - 1, len(yf) - 1, min(n_eval, len(yf) - window + 1)).round().astype(int))
+    return xf[idx], (sums[idx + 1] - sums[idx + 1 - window]) / window
+
+def _lowess(xf, yf, frac, n_eval):
+    """Locally weighted linear fit (tricube weights over the nearest frac of points) on an even x grid."""
+    n = len(xf)
+    k = min(max(int(np.ceil(frac * n)), 2), n)
+    x_eval = np.linspace(xf[0], xf[-1], min(n_eval, n))
+    # The k nearest neighbours of x0 are a contiguous window [lo, lo + k) of the sorted x; the best lo is
+    # where the window's two ends are equidistant, i.e. where xf[lo] + xf[lo + k - 1] crosses 2 * x0.
+    ends = xf[:n - k + 1] + xf[k - 1:]
+    lo = np.clip(np.searchsorted(ends, 2 * x_eval), 0, n - k)
+    prev = np.maximum(lo - 1, 0)
+    reach = lambda s: np.maximum(x_eval - xf[s], xf[s + k - 1] - x_eval)
+    lo = np.where(reach(prev) < reach(lo), prev, lo)
+    y_eval = np.empty_like(x_eval)
+    for i, (x0, start) in enumerate(zip(x_eval, lo)):
+        xs, ys = xf[start:start + k], yf[start:start + k]
+        distance = np.abs(xs - x0)
+        w = (1 - (distance / (distance.max() * 1.001 or 1.0)) ** 3) ** 3
+        x_mean, y_mean = (w @ xs) / w.sum(), (w @ ys) / w.sum()
+        dx = xs - x_mean
+        spread = w @ (dx * dx)
+        y_eval[i] = y_mean + ((w @ (dx * (ys - y_mean))) / spread * (x0 - x_mean) if spread > 0 else 0.0)
+    return x_eval, y_eval
+
+def ols_interval(xf, yf, x_eval, alpha=0.05):
+    """OLS fit with a (1 - alpha) confidence band for the mean, via statsmodels (imported on demand)."""
+    import statsmodels.api as sm
+    model = sm.OLS(yf, sm.add_constant(xf)).fit()
+    band = model.get_prediction(sm.add_constant(x_eval, has_constant='add')).summary_frame(alpha=alpha)
+    return band['mean'].to_numpy(), band['mean_ci_lower'].to_numpy(), band['mean_ci_upper'].to_numpy(), model.rsquared
+
+def trend(x, y, method='ols', window=None, frac=2/3, n_eval=100):
+    """Trend of y over x as (line, label).
+
+    line has columns x and y (plus lower and upper for 'ols_ci'), in x's original type; label
+    describes the fit for the legend and hover. Fewer than two points give an empty line.
+    """
+    if method not in TREND_LABELS:
+        raise ValueError(f"Unknown trend method '{method}'; expected one of {list(TREND_LABELS)}.")
+    xf, yf, to_x = _clean(x, y)
+    if len(xf) < 2 or np.ptp(xf) == 0:
+        return pd.DataFrame(columns=['x', 'y']), TREND_LABELS[method]
+    columns = {}
+    if method == 'ols':
+        slope, intercept, r2 = _ols(xf, yf)
+        x_line = xf[[0, -1]]
+        y_line = intercept + slope * x_line
+        label = f"OLS trend (R²={r2:.2f})"
+    elif method == 'rolling':
+        window = window or max(len(xf) // 20, 2)
+        x_line, y_line = _rolling(xf, yf, window, n_eval)
+        label = f"Rolling mean ({window} points)"
+    elif method == 'lowess':
+        x_line, y_line = _lowess(xf, yf, frac, n_eval)
+        label = f"LOWESS (frac={frac:.2f})"
+    else:
+        x_line = np.linspace(xf[0], xf[-1], n_eval)
+        y_line, columns['lower'], columns['upper'], r2 = ols_interval(xf, yf, x_line)
+        label = f"OLS trend, 95% CI (R²={r2:.2f})"
+    return pd.DataFrame({'x': to_x(x_line), 'y': y_line, **columns}), label
+
+def add_trend(fig, x, y, method='ols', **options):
+    """Adds the trend of y over x to fig as a black dashed line (with a shaded band for 'ols_ci')."""
+    line, label = trend(x, y, method, **options)
+    if line.empty:
+        return fig
+    if 'lower' in line:
+        fig.add_trace(go.Scatter(x=line['x'], y=line['upper'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=line['x'], y=line['lower'], mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0,0,0,0.1)', name='95% CI', hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=line['x'], y=line['y'], mode='lines', line=dict(color='black', dash='dash'), name=label, hovertemplate=f"{label}<br>%{{y:.1f}}<extra></extra>"))
+    return fig
+
+# --- Binned aggregation ---
+def bin_points(df, x, y, bins=200, by=None, extra=()):
+    """Summarizes a large scatter into equal-width x bins (per group of by).
+
+    Each row is one bin: x at the bin centre, the mean of y and of the extra columns, and the bin's
+    Points count and y range (Min / Max).
+    """
+    df = df.dropna(subset=[x, y])
+    if df.empty:
+        return pd.DataFrame(columns=[*([by] if by else []), x, y, *extra, 'Points', 'Min', 'Max'])
+    xf, to_x = _numeric(df[x])
+    edges = np.linspace(xf.min(), xf.max(), bins + 1)
+    codes = np.clip(np.searchsorted(edges, xf, side='right') - 1, 0, bins - 1)
+    keys = [pd.Series(codes, index=df.index, name='_bin'), *([df[by]] if by else [])]
+    summary = df.groupby(keys, sort=True, observed=True).agg(
+        **{y: (y, 'mean')}, **{c: (c, 'mean') for c in extra}, Points=(y, 'size'), Min=(y, 'min'), Max=(y, 'max')
+    ).reset_index()
+    centres = (edges[:-1] + edges[1:]) / 2
+    summary[x] = to_x(centres[summary.pop('_bin').to_numpy()])
+    return summary[[*([by] if by else []), x, y, *extra, 'Points', 'Min', 'Max']]
@@ -1,34 +1,45 @@
 # utils.py
 import pandas as pd
 import numpy as np
+import zlib
 from datetime import date, timedelta
+from storage import read_dataset, select
+from schema import conform
+from spc import run_spc
+from spend_ledger import lines_from_budget
+from action_items import actions_from_meetings
 
-def generate_cdmo_data():
+def generate_cdmo_data(columns=None, cdmo=None):
     """Generates a list of mock CDMO partners with enriched performance and BCP metrics."""
+    stored = read_dataset('cdmo', columns, cdmo)
+    if stored is not None: return conform('cdmo', stored)
     data = {'CDMO Name': ['Catalent Pharma', 'WuXi Biologics', 'Lonza Group', 'Fujifilm Diosynth'],'Location': ['Bloomington, IN, USA', 'Dundalk, Ireland', 'Visp, Switzerland', 'Hillerød, Denmark'],'Status': ['Active', 'Active', 'Onboarding', 'Active'],'Expertise': ['Antibody Production', 'Oligonucleotide Synthesis', 'AOC Conjugation & Fill-Finish', 'Antibody Production'],'Avg. On-Time Delivery (%)': [98, 85, 99, 92],'Avg. Batch Success Rate (%)': [95, 100, 100, 98],'Quality Score (1-100)': [88, 95, 99, 92],'Avg. Yield (%)': [82, 88, 85, 84],'Batches YTD': [12, 25, 4, 15],'BCP Status': ['Approved', 'Under Review', 'Draft', 'Approved'],'BCP Last Reviewed': [date(2023, 12, 1), date(2024, 6, 5), None, date(2024, 1, 15)]}
-    return pd.DataFrame(data)
+    return select(conform('cdmo', pd.DataFrame(data)), 'cdmo', columns, cdmo)
 
-def generate_master_schedule():
+def generate_master_schedule(columns=None, cdmo=None):
     """Generates a comprehensive master production schedule with enriched technical details."""
+    stored = read_dataset('schedule', columns, cdmo)
+    if stored is not None: return conform('schedule', stored)
     today = date.today()
-    data = {'Batch ID': ['AVC-DM1-WU-B005', 'AVC-DM1-CA-B006', 'AVC-DMD-FU-B003', 'AVC-FSHD-WU-B002', 'AVC-DMD-LO-B004', 'AVC-DM1-CA-B007'],'Product': ['AOC-1001', 'AOC-1001', 'AOC-1021', 'AOC-1044', 'AOC-1021', 'AOC-1001'],'Program': ['DM1', 'DM1', 'DMD', 'FSHD', 'DMD', 'DM1'],'CDMO': ['WuXi Biologics', 'Catalent Pharma', 'Fujifilm Diosynth', 'WuXi Biologics', 'Lonza Group', 'Catalent Pharma'],'Status': ['In Production', 'At Risk', 'Awaiting Release', 'Shipped', 'Planned', 'Failed'],'Start Date': [today - timedelta(days=30), today - timedelta(days=20), today - timedelta(days=60), today - timedelta(days=90), today + timedelta(days=10), today - timedelta(days=45)],'End Date': [today + timedelta(days=60), today + timedelta(days=45), today - timedelta(days=10), today - timedelta(days=30), today + timedelta(days=90), today - timedelta(days=15)],'Planned Cycle Time (Days)': [90, 65, 50, 60, 80, 30],'Actual Cycle Time (Days)': [92, 68, 51, 60, np.nan, 30],'Yield (%)': [88.1, np.nan, 84.5, 90.2, np.nan, 45.0],'Deviation ID': [None, 'DEV-24-015', None, None, None, 'DEV-24-018'], 'Cost per Batch ($K)': [850, 875, 750, 780, 900, 890]}
-    return pd.DataFrame(data)
+    data = {'Batch ID': ['AVC-DM1-WU-B005', 'AVC-DM1-CA-B006', 'AVC-DMD-FU-B003', 'AVC-FSHD-WU-B002', 'AVC-DMD-LO-B004', 'AVC-DM1-CA-B007'],'Product': ['AOC-1001', 'AOC-1001', 'AOC-1021', 'AOC-1044', 'AOC-1021', 'AOC-1001'],'Program': ['DM1', 'DM1', 'DMD', 'FSHD', 'DMD', 'DM1'],'CDMO': ['WuXi Biologics', 'Catalent Pharma', 'Fujifilm Diosynth', 'WuXi Biologics', 'Lonza Group', 'Catalent Pharma'],'Status': ['In Production', 'At Risk', 'Awaiting Release', 'Shipped', 'Planned', 'Failed'],'Start Date': [today - timedelta(days=30), today - timedelta(days=20), today - timedelta(days=60), today - timedelta(days=90), today + timedelta(days=10), today - timedelta(days=45)],'End Date': [today + timedelta(days=60), today + timedelta(days=45), today - timedelta(days=10), today - timedelta(days=30), today + timedelta(days=90), today - timedelta(days=15)],'Planned Cycle Time (Days)': [90, 65, 50, 60, 80, 30],'Actual Cycle Time (Days)': [92, 68, 51, 60, np.nan, 30],'Yield (%)': [88.1, np.nan, 84.5, 90.2, np.nan, 45.0],'Deviation ID': [None, 'DEV-24-015', None, None, None, 'DEV-24-018'], 'Cost per Batch ($K)': [850, 875, 750, 780, 900, 890], 'Suite': ['Suite 2', 'Suite 1', 'Suite 1', 'Suite 2', 'Suite 3', 'Suite 1']}
+    return select(conform('schedule', pd.DataFrame(data)), 'schedule', columns, cdmo)
 
-def generate_risk_register():
+def generate_risk_register(columns=None, cdmo=None):
+    stored = read_dataset('risk', columns, cdmo)
+    if stored is not None: return conform('risk', stored.sort_values(by='Risk Score', ascending=False) if 'Risk Score' in stored else stored)
     data = {'Risk ID': ['RSK-SUP-01', 'RSK-TECH-01', 'RSK-COMP-01', 'RSK-GEO-01', 'RSK-PERS-01'],'CDMO': ['WuXi Biologics', 'Lonza Group', 'All', 'Catalent Pharma', 'Fujifilm Diosynth'],'Description': ['Single-source for critical raw material faces shipping delays.', 'New conjugation process shows yield variability at scale.', 'Upcoming EMA inspection may scrutinize data integrity.', 'Geopolitical tensions could impact shipping lanes from US facility.', 'Key technical lead at CDMO has high turnover risk.'],'Impact': [4, 4, 5, 3, 4], 'Probability': [3, 4, 2, 2, 3], 'Owner': ['Supply Chain', 'Tech Dev', 'Quality', 'Manager', 'Manager'],'Mitigation Strategy': ['Qualify second supplier (Project OpEx-003).', 'Perform DOE to optimize process parameters.', 'Conduct internal audit and data review.', 'Increase safety stock at domestic warehouse.', 'Establish knowledge transfer plan and identify backup.'],'Mitigation Status': ['In Progress', 'Planned', 'In Progress', 'Complete', 'Planned']}
     df = pd.DataFrame(data); df['Risk Score'] = df['Impact'] * df['Probability']
-    return df.sort_values(by='Risk Score', ascending=False)
+    return select(conform('risk', df.sort_values(by='Risk Score', ascending=False)), 'risk', columns, cdmo)
 
 def generate_spc_data(batch_id, parameter='Oligo Concentration'):
-    np.random.seed(hash(batch_id) % (2**32 - 1)); n_points = 20; mean = 10.0 if parameter == 'Oligo Concentration' else 7.2; std_dev = 0.2 if parameter == 'Oligo Concentration' else 0.05; lsl = 9.5 if parameter == 'Oligo Concentration' else 7.0; usl = 10.5 if parameter == 'Oligo Concentration' else 7.4
-    data = np.random.normal(mean, std_dev, n_points)
-    if 'CA-B006' in batch_id: data[15:] -= np.linspace(0, 0.4, 5)
-    if 'CA-B007' in batch_id: data[10:] = np.random.normal(mean - 0.5, std_dev*1.5, 10); data[18] = lsl - 0.1
-    df = pd.DataFrame({'Measurement': range(1, n_points + 1), 'Value': data}); df['Mean'] = mean; df['UCL'] = mean + 3 * std_dev; df['LCL'] = mean - 3 * std_dev; df['USL'] = usl; df['LSL'] = lsl
-    return df
+    """Generates one batch's SPC chart data; deterministic across processes (see spc.py)."""
+    points, _ = run_spc([batch_id], [parameter])
+    return points[['Measurement', 'Value', 'Mean', 'UCL', 'LCL', 'USL', 'LSL']]
 
-def generate_quality_data():
+def generate_quality_data(columns=None, cdmo=None):
     """Generates enriched quality records data."""
+    stored = read_dataset('quality', columns, cdmo)
+    if stored is not None: return conform('quality', stored)
     data = {
         'Record ID': ['DEV-24-015', 'CAPA-23-008', 'CR-24-031', 'DEV-24-018', 'CAPA-24-001', 'DEV-24-019', 'DEV-24-020'],
         'CDMO': ['Catalent Pharma', 'WuXi Biologics', 'Fujifilm Diosynth', 'Catalent Pharma', 'Lonza Group', 'Catalent Pharma', 'WuXi Biologics'],
@@ -40,10 +51,12 @@ def generate_quality_data():
         'Root Cause Category': ['Human Error', 'Procedure Not Followed', None, 'Contamination', None, 'Equipment Failure', 'Human Error'],
         'Batch Impacted': ['AVC-DM1-CA-B006', None, None, 'AVC-DM1-CA-B007', 'AVC-DMD-LO-B004', 'AVC-DM1-CA-B006', 'AVC-DM1-WU-B005']
     }
-    return pd.DataFrame(data)
+    return select(conform('quality', pd.DataFrame(data)), 'quality', columns, cdmo)
 
-def generate_budget_data():
+def generate_budget_data(columns=None, cdmo=None):
     """Generates granular, quarterly financial data."""
+    stored = read_dataset('budget', columns, cdmo)
+    if stored is not None: return conform('budget', stored)
     q1_actuals = [3.0, 4.0, 1.1, 6.0, 0.8, 0.9]
     q2_actuals = [3.5, 3.0, 1.0, 7.0, 0.5, 0.5]
     q3_plan = [4.0, 2.5, 3.0, 6.0, 0.8, 0.3]
@@ -62,22 +75,44 @@ def generate_budget_data():
     df['YTD Actuals ($M)'] = df['Q1 Actuals ($M)'] + df['Q2 Actuals ($M)'] # Assuming we are in Q3
     df['Remaining Forecast ($M)'] = df['Q3 Plan ($M)'] + df['Q4 Plan ($M)']
     df['Estimate at Completion ($M)'] = df['YTD Actuals ($M)'] + df['Remaining Forecast ($M)']
-    return df
+    return select(conform('budget', df), 'budget', columns, cdmo)
 
+def generate_spend_ledger(columns=None, cdmo=None, budget_df=None):
+    """Generates spend line items (budget, plan and invoice lines) for the spend ledger, from budget_df when given."""
+    stored = read_dataset('ledger', columns, cdmo)
+    if stored is not None: return conform('ledger', stored)
+    budget_df = generate_budget_data() if budget_df is None else budget_df
+    return select(conform('ledger', lines_from_budget(budget_df, date.today().year)), 'ledger', columns, cdmo)
+
+def _name_rng(name):
+    """Generator seeded from a stable digest of name (hash() of a str differs between processes)."""
+    return np.random.default_rng(zlib.crc32(name.encode('utf-8')))
 def generate_cdmo_kpis(cdmo_name):
-    np.random.seed(hash(cdmo_name) % (2**32 - 1)); qtrs = pd.to_datetime(['2023-03-31', '2023-06-30', '2023-09-30', '2023-12-31', '2024-03-31']); base_otd = 90 + np.random.randint(-5, 5); base_dev = 0.8 + np.random.uniform(-0.5, 0.5)
-    otd = np.random.normal(base_otd, 2, 5).clip(80, 100); devs = np.random.normal(base_dev, 0.2, 5).clip(0, 2)
+    rng = _name_rng(cdmo_name); qtrs = pd.to_datetime(['2023-03-31', '2023-06-30', '2023-09-30', '2023-12-31', '2024-03-31']); base_otd = 90 + rng.integers(-5, 5); base_dev = 0.8 + rng.uniform(-0.5, 0.5)
+    otd = rng.normal(base_otd, 2, 5).clip(80, 100); devs = rng.normal(base_dev, 0.2, 5).clip(0, 2)
     return pd.DataFrame({'Quarter': qtrs, 'On-Time Delivery (%)': otd, 'Deviations per Batch': devs})
 def generate_cpk_data(cdmo_name):
-    np.random.seed(hash(cdmo_name) % (2**32 - 1)); base_cpk = np.random.uniform(0.9, 1.5)
+    rng = _name_rng(cdmo_name); base_cpk = rng.uniform(0.9, 1.5)
     return pd.DataFrame({'Parameter': ['Oligo Concentration', 'pH', 'Antibody Titer', 'Conjugation Efficiency'], 'Cpk Value': [base_cpk, base_cpk + 0.3, base_cpk - 0.2, base_cpk - 0.1]})
-def generate_tech_transfer_data():
-    data = {'Task ID': ['TT-1.1', 'TT-1.2', 'TT-2.1', 'TT-3.1', 'TT-3.2', 'TT-4.1', 'TT-5.1'],'Task': ['Define Scope & Assemble VPT', 'Approve Tech Transfer Plan', 'Transfer Process & Analytical Methods', 'Complete Facility Fit & Gap Analysis', 'Qualify Raw Materials', 'Execute Engineering Batch', 'Execute 3x PPQ Batches'],'Lead Team': ['Ops', 'QA', 'Tech Dev', 'Engineering', 'Supply Chain', 'CDMO/Ops', 'CDMO/Ops'],'Planned Duration (Days)': [10, 5, 45, 20, 30, 15, 60],'Actual Duration (Days)': [10, 6, 50, 22, np.nan, np.nan, np.nan],'Start Date': pd.to_datetime(['2024-04-01', '2024-04-11', '2024-04-16', '2024-06-05', '2024-06-05', '2024-07-08', '2024-07-23']),'Risk Level': ['Low', 'Low', 'High', 'Medium', 'High', 'Medium', 'High'],'Progress (%)': [100, 100, 100, 100, 75, 20, 0]}
+def generate_tech_transfer_data(columns=None):
+    stored = read_dataset('tech_transfer', columns)
+    if stored is not None: return conform('tech_transfer', stored)
+    data = {'Task ID': ['TT-1.1', 'TT-1.2', 'TT-2.1', 'TT-3.1', 'TT-3.2', 'TT-4.1', 'TT-5.1'],'Task': ['Define Scope & Assemble VPT', 'Approve Tech Transfer Plan', 'Transfer Process & Analytical Methods', 'Complete Facility Fit & Gap Analysis', 'Qualify Raw Materials', 'Execute Engineering Batch', 'Execute 3x PPQ Batches'],'Lead Team': ['Ops', 'QA', 'Tech Dev', 'Engineering', 'Supply Chain', 'CDMO/Ops', 'CDMO/Ops'],'Planned Duration (Days)': [10, 5, 45, 20, 30, 15, 60],'Actual Duration (Days)': [10, 6, 50, 22, np.nan, np.nan, np.nan],'Start Date': pd.to_datetime(['2024-04-01', '2024-04-11', '2024-04-16', '2024-06-05', '2024-06-05', '2024-07-08', '2024-07-23']),'Risk Level': ['Low', 'Low', 'High', 'Medium', 'High', 'Medium', 'High'],'Progress (%)': [100, 100, 100, 100, 75, 20, 0],'Predecessors': ['', 'TT-1.1', 'TT-1.2', 'TT-2.1', 'TT-2.1', 'TT-3.1, TT-3.2', 'TT-4.1']}
     df = pd.DataFrame(data); df['Finish Date'] = df['Start Date'] + pd.to_timedelta(df['Planned Duration (Days)'], unit='D')
-    return df
-def generate_governance_data():
-    return pd.DataFrame({'Date': [date(2024, 2, 20), date(2024, 4, 15), date(2024, 5, 20)],'CDMO': ['WuXi Biologics', 'Catalent Pharma', 'WuXi Biologics'],'Meeting Type': ['Quarterly Business Review', 'Technical Working Group', 'Quarterly Business Review'],'Key Topics': ['Review Q4 KPIs, discuss 2024 forecast.', 'Investigate yield drop in B004.', 'Review Q1 KPIs, address DEV-24-015.'],'Actions Generated': [5, 2, 3],'Actions Closed': [5, 1, 1]})
-def generate_op_ex_data():
+    return select(conform('tech_transfer', df), 'tech_transfer', columns)
+def generate_governance_data(columns=None, cdmo=None):
+    stored = read_dataset('governance', columns, cdmo)
+    if stored is not None: return conform('governance', stored)
+    return select(conform('governance', pd.DataFrame({'Meeting ID': ['MTG-000001', 'MTG-000002', 'MTG-000003'],'Date': [date(2024, 2, 20), date(2024, 4, 15), date(2024, 5, 20)],'CDMO': ['WuXi Biologics', 'Catalent Pharma', 'WuXi Biologics'],'Meeting Type': ['Quarterly Business Review', 'Technical Working Group', 'Quarterly Business Review'],'Key Topics': ['Review Q4 KPIs, discuss 2024 forecast.', 'Investigate yield drop in B004.', 'Review Q1 KPIs, address DEV-24-015.'],'Actions Generated': [5, 2, 3],'Actions Closed': [5, 1, 1]})), 'governance', columns, cdmo)
+def generate_action_items(columns=None, cdmo=None, gov_df=None):
+    """Generates action item Opened / Closed events linked to the governance meetings (gov_df when given)."""
+    stored = read_dataset('actions', columns, cdmo)
+    if stored is not None: return conform('actions', stored)
+    gov_df = generate_governance_data() if gov_df is None else gov_df
+    return select(conform('actions', actions_from_meetings(gov_df, date.today())), 'actions', columns, cdmo)
+def generate_op_ex_data(columns=None, cdmo=None):
+    stored = read_dataset('opex', columns, cdmo)
+    if stored is not None: return conform('opex', stored)
     data = {'Project ID': ['OpEx-001', 'OpEx-002', 'OpEx-003', 'OpEx-004'],'Title': ['Improve Conjugation Yield', 'Reduce Cycle Time for Antibody Prod.', 'Qualify 2nd Supplier for Oligo', 'Automate Deviation Trending'],'Lead': ['Tech Dev', 'Manager', 'Supply Chain', 'Quality'],'CDMO': ['Lonza Group', 'Catalent Pharma', 'WuXi Biologics', 'All'],'Status': ['In Progress', 'Complete', 'In Progress', 'Planned'],'Start Date': [date(2024, 6, 1), date(2024, 1, 15), date(2024, 5, 1), date(2024, 8, 1)],'Target Completion': [date(2024, 12, 1), date(2024, 4, 30), date(2025, 2, 1), date(2024, 11, 30)],'Financial Impact ($K/yr)': [500, 250, 1500, 50],'Technical Feasibility (1-5)': [3, 5, 4, 5],'Implementation Cost ($K)': [75, 20, 300, 40]}
     df = pd.DataFrame(data); df['ROI'] = df['Financial Impact ($K/yr)'] / df['Implementation Cost ($K)']
-    return df
+    return select(conform('opex', df), 'opex', columns, cdmo)
@@ -0,0 +1,106 @@
+# warmup.py
+"""Background warm-up of imports, Plotly figure machinery and the shared datasets.
+
+    python warmup.py [streamlit run options]
+
+starts the Streamlit server for app.py with the warm-up running in a daemon thread, so the first
+visitor after a deploy or worker restart finds the heavy modules imported, Plotly's trace validators
+and default template built, and the shared cached datasets filled. app.py also calls start(), so a
+plain `streamlit run app.py` warms the other pages in the background on the first visit. Each step's
+duration is kept in `report` and shown in the perf panel (see perf.py).
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+HEAVY_MODULES = ('numpy', 'pandas', 'pyarrow.parquet', 'plotly.graph_objects', 'plotly.express', 'data_access', 'gantt', 'trendlines', 'metrics')
+RUNTIME_WAIT_SECONDS = 120  # Cached loaders need the server's runtime, which starts after this module.
+
+report = {}  # Step name -> seconds taken (or the error that stopped it).
+_thread = None
+_lock = threading.Lock()
+
+def warm_imports():
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:  # Optional dependency (pyarrow) not installed.
+            pass
+
+def warm_figures():
+    """Builds and serializes one tiny figure per trace type the pages use."""
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    df = pd.DataFrame({'x': [1, 2], 'y': [3, 4], 'g': ['a', 'b'], 'd': pd.to_datetime(['2024-01-01', '2024-02-01'])})
+    scatter = px.scatter(df, x='d', y='y', color='g', size='x', hover_name='g', text='g')
+    scatter.add_hline(y=3, line_dash="dash", annotation_text="Mean")
+    scatter.add_vline(x=1, line_dash="dash")
+    scatter.add_annotation(x=1, y=3, text="<b>Quadrant</b>", showarrow=False)
+    figures = [
+        scatter, px.bar(df, x='x', y='g', orientation='h', text='x'), px.histogram(df, x='g', color='g', barmode='stack'),
+        px.treemap(df, path=[px.Constant("All"), 'g'], color_discrete_map={'a': 'red'}),
+        px.density_heatmap(df, x='g', y='g', z='y', histfunc='sum'),
+        go.Figure(go.Funnel(y=['a', 'b'], x=[2, 1])),
+        go.Figure(go.Waterfall(x=['a', 'b'], y=[1, -1], measure=['absolute', 'relative'])),
+        go.Figure([go.Bar(x=[1], y=['a'], base=[0], orientation='h'), go.Scattergl(x=[1], y=[1], mode='markers')]),
+    ]
+    for fig in figures:
+        fig.update_layout(height=400, legend=dict(orientation="h"))
+        fig.to_json()
+
+def warm_datasets():
+    """Fills the caches shared by every session: the CDMO index, cycle-time limits, spend ledger, schedule indexes, quality aggregates, action items, scorecards, the impact graph, the unprojected loads and the projections the pages request."""
+    import data_access
+    for loader in (data_access.get_cdmo_index, data_access.get_cycle_time_limits, data_access.load_cdmo_data,
+                   data_access.load_budget_data, data_access.load_governance_data, data_access.load_op_ex_data,
+                   data_access.load_tech_transfer_data, data_access.get_spend_ledger,
+                   data_access.get_critical_path, data_access.get_capacity_index, data_access.get_quality_stream,
+                   data_access.get_action_store, data_access.get_scorecard, data_access.get_impact_graph):
+        loader()
+    for loader, columns in data_access.PAGE_PROJECTIONS:
+        getattr(data_access, loader)(columns=columns)
+
+def _step(name, func):
+    started = time.perf_counter()
+    try:
+        func()
+        report[name] = time.perf_counter() - started
+    except Exception as exc:  # A failed warm-up must never take the server down; the page will load it itself.
+        report[name] = f"failed: {exc!r}"
+
+def warm(datasets=True, wait_for_runtime=False):
+    """Runs every warm-up step in the calling thread."""
+    _step('imports', warm_imports)
+    _step('figures', warm_figures)
+    if not datasets:
+        return report
+    if wait_for_runtime:
+        from streamlit import runtime
+        deadline = time.monotonic() + RUNTIME_WAIT_SECONDS
+        while not runtime.exists() and time.monotonic() < deadline:
+            time.sleep(0.1)
+    _step('datasets', warm_datasets)
+    return report
+
+def start():
+    """Starts the warm-up in a daemon thread, once per process."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm, kwargs={'wait_for_runtime': True}, name='avity-warmup', daemon=True)
+            _thread.start()
+    return _thread
+
+def main():
+    from streamlit.web import cli  # Before the thread starts: Plotly probes sys.modules for a half-imported pandas.
+    start()
+    sys.argv = ['streamlit', 'run', APP_PATH, *sys.argv[1:]]
+    return cli.main()
+
+if __name__ == '__main__':
+    import warmup  # The same module object app.py will import, so start() stays once per process.
+    sys.exit(warmup.main())